@@ -1,4 +1,3 @@
-import pandas as pd
 import os
 import numpy as np
 import logging
@@ -8,6 +7,8 @@ from pathlib import Path
 import hashlib
 from collections import namedtuple
 
+from ..utils.lazy import pd
+
 AMPLIGRAPH_ENV_NAME = 'AMPLIGRAPH_DATA_HOME'
 
 DatasetMetadata = namedtuple('DatasetMetadata',['dataset_name','filename','url','train_name','valid_name','test_name','train_checksum','valid_checksum','test_checksum'])
@@ -4,8 +4,14 @@
 from .metrics import mrr_score, mr_score, hits_at_n_score, rank_score
 from .protocol import generate_corruptions_for_fit, evaluate_performance, to_idx, \
     generate_corruptions_for_eval, create_mappings, select_best_model_ranking, train_test_split_no_unseen, \
-    filter_unseen_entities
+    filter_unseen_entities, create_positives_index, create_alias_table, extend_mappings, \
+    compute_corrupt_subj_probs, generate_shared_corruptions, \
+    is_positive
+from .samplers import Sampler, GridSampler, RandomSampler, TPESampler, Uniform, LogUniform, SAMPLER_REGISTRY
 
 __all__ = ['mrr_score', 'hits_at_n_score', 'rank_score', 'generate_corruptions_for_fit',
            'evaluate_performance', 'to_idx', 'generate_corruptions_for_eval', 'create_mappings',
-           'select_best_model_ranking', 'train_test_split_no_unseen', 'filter_unseen_entities']
+           'select_best_model_ranking', 'train_test_split_no_unseen', 'filter_unseen_entities',
+           'create_positives_index', 'create_alias_table', 'extend_mappings', 'compute_corrupt_subj_probs',
+           'generate_shared_corruptions', 'is_positive', 'Sampler', 'GridSampler', 'RandomSampler', 'TPESampler',
+           'Uniform', 'LogUniform', 'SAMPLER_REGISTRY']
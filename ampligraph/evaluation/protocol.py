@@ -2,13 +2,42 @@ import numpy as np
 from tqdm import tqdm
 
 from ..evaluation import mrr_score, hits_at_n_score, mr_score
+from .samplers import SAMPLER_REGISTRY
 import itertools
-import tensorflow as tf
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
 import logging
 
+from ..utils.lazy import tf
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Number of distinct random draws that can be derived from a single seed
+SEED_STRIDE = 1024
+
+# Default number of times corruptions which collide with positive triples are resampled
+DEFAULT_RESAMPLE_ROUNDS = 3
+
+# Default number of model selection trials run in parallel
+DEFAULT_N_JOBS = 1
+
+# Default factor by which successive halving reduces the number of candidates (and increases their budget)
+DEFAULT_HALVING_REDUCTION_FACTOR = 3
+
+# Default number of selection triples used to rank the candidates of the intermediate rungs of successive halving
+DEFAULT_HALVING_SUBSAMPLE = 1000
+
+# Default number of epochs the best model is fine-tuned for by a warm start retraining, relative to its epochs
+DEFAULT_WARM_START_EPOCHS_RATIO = 0.1
+
+# Arguments shared by all the trials of a model selection, set once in each worker process
+_trial_context = {}
+
 
 def train_test_split_no_unseen(X, test_size=5000, seed=0, allow_duplication=False):
     """Split into train and test sets.
@@ -163,6 +192,140 @@ def create_mappings(X):
     return _create_unique_mappings(unique_ent, unique_rel)
 
 
+def extend_mappings(X, rel_to_idx, ent_to_idx):
+    """Extend string-IDs mappings with the entities and relations of new triples.
+
+        Existing entities and relations keep their IDs. New ones are assigned incremental IDs,
+        following the existing ones.
+
+    Parameters
+    ----------
+    X : ndarray, shape [n, 3]
+        The triples to extract new mappings.
+    rel_to_idx : dict
+        The existing relation-to-internal-id associations.
+    ent_to_idx: dict
+        The existing entity-to-internal-id associations.
+
+    Returns
+    -------
+    rel_to_idx : dict
+        The extended relation-to-internal-id associations.
+    ent_to_idx: dict
+        The extended entity-to-internal-id associations.
+
+    """
+    logger.debug('Extending mappings for entities and relations.')
+    new_ent = [ent for ent in np.unique(np.concatenate((X[:, 0], X[:, 2]))) if ent not in ent_to_idx]
+    new_rel = [rel for rel in np.unique(X[:, 1]) if rel not in rel_to_idx]
+    rel_to_idx = dict(rel_to_idx)
+    rel_to_idx.update(zip(new_rel, range(len(rel_to_idx), len(rel_to_idx) + len(new_rel))))
+    ent_to_idx = dict(ent_to_idx)
+    ent_to_idx.update(zip(new_ent, range(len(ent_to_idx), len(ent_to_idx) + len(new_ent))))
+    return rel_to_idx, ent_to_idx
+
+
+def create_positives_index(X, num_entities, num_relations):
+    """Create a compact index of positive triples, used to filter the corruptions generated for training.
+
+        Each triple is encoded as a single int64 composite key ``(s * num_relations + p) * num_entities + o``.
+        The index is the sorted array of the unique keys: checking whether a batch of triples are positives
+        is a vectorized binary search, and the index only takes 8 bytes per triple.
+
+    Parameters
+    ----------
+    X : ndarray, shape [n, 3]
+        The positive triples (internal IDs).
+    num_entities : int
+        The number of distinct entities.
+    num_relations : int
+        The number of distinct relations.
+
+    Returns
+    -------
+    positives_index : dict
+        The sorted composite keys (``'keys'``) and the sizes used to build them
+        (``'num_entities'``, ``'num_relations'``).
+
+    """
+    if num_entities * num_entities * num_relations > np.iinfo(np.int64).max:
+        msg = 'Too many entities and relations ({}, {}) to build int64 composite keys.'.format(num_entities,
+                                                                                                num_relations)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    X = X.astype(np.int64)
+    keys = (X[:, 0] * num_relations + X[:, 1]) * num_entities + X[:, 2]
+    return {'keys': np.unique(keys), 'num_entities': num_entities, 'num_relations': num_relations}
+
+
+def is_positive(X, positives_index):
+    """Check which triples of a Tensor are in an index created with :meth:`create_positives_index`.
+
+    Parameters
+    ----------
+    X : Tensor, shape [n, 3]
+        The triples to look up.
+    positives_index : dict
+        The index of the positive triples.
+
+    Returns
+    -------
+    out : Tensor, shape [n]
+        True for the triples found in the index.
+    """
+    keys = tf.constant(positives_index['keys'], dtype=tf.int64)
+    num_keys = positives_index['keys'].shape[0]
+    X = tf.cast(X, tf.int64)
+    queries = (X[:, 0] * positives_index['num_relations'] + X[:, 1]) * positives_index['num_entities'] + X[:, 2]
+
+    # vectorized lower bound search
+    low = tf.zeros_like(queries)
+    high = tf.fill(tf.shape(queries), tf.constant(num_keys, dtype=tf.int64))
+    for _ in range(int(np.ceil(np.log2(num_keys + 1)))):
+        mid = (low + high) // 2
+        go_right = tf.gather(keys, tf.minimum(mid, num_keys - 1)) < queries
+        low = tf.where(go_right, mid + 1, low)
+        high = tf.where(go_right, high, mid)
+
+    return tf.logical_and(low < num_keys, tf.equal(tf.gather(keys, tf.minimum(low, num_keys - 1)), queries))
+
+
+def compute_corrupt_subj_probs(X, num_relations):
+    """Compute the per-relation probabilities of corrupting the subject of a triple ("Bernoulli" sampling).
+
+        As described in :cite:`wang2014knowledge`, the subject of the triples of relation ``r`` is corrupted
+        with probability ``tph / (tph + hpt)``, where ``tph`` is the average number of objects per subject and
+        ``hpt`` the average number of subjects per object of ``r``. On one-to-many relations the subject is
+        then corrupted more often, which is less likely to generate false negatives.
+
+    Parameters
+    ----------
+    X : ndarray, shape [n, 3]
+        The training triples (internal IDs).
+    num_relations : int
+        The number of distinct relations.
+
+    Returns
+    -------
+    probs : ndarray, shape [num_relations]
+        The probability of corrupting the subject of the triples of each relation
+        (0.5 for relations without triples).
+
+    """
+    X = np.unique(X, axis=0)
+    triples_count = np.bincount(X[:, 1], minlength=num_relations)
+    subjects_count = np.bincount(np.unique(X[:, [0, 1]], axis=0)[:, 1], minlength=num_relations)
+    objects_count = np.bincount(np.unique(X[:, [1, 2]], axis=0)[:, 0], minlength=num_relations)
+
+    probs = np.full(num_relations, 0.5)
+    seen = triples_count > 0
+    tph = triples_count[seen] / subjects_count[seen]
+    hpt = triples_count[seen] / objects_count[seen]
+    probs[seen] = tph / (tph + hpt)
+    return probs
+
+
 def generate_corruptions_for_eval(X, entities_for_corruption, corrupt_side='s+o', table_entity_lookup_left=None,
                                   table_entity_lookup_right=None, table_reln_lookup=None):
     """Generate corruptions for evaluation.
@@ -304,15 +467,120 @@ def generate_corruptions_for_eval(X, entities_for_corruption, corrupt_side='s+o'
     return out, out_prime
 
 
-def generate_corruptions_for_fit(X, entities_list=None, eta=1, corrupt_side='s+o', entities_size=0, rnd=None):
+def _random_uniform_int(shape, maxval, rnd, offset=0):
+    """Draw integers uniformly at random in [0, maxval).
+
+    Parameters
+    ----------
+    shape : Tensor
+        Shape of the output.
+    maxval : int or Tensor
+        Upper bound (excluded) of the integers.
+    rnd : int or Tensor, shape [2]
+        The seed of the random op. If a Tensor is passed, a stateless random op is used:
+        the draws only depend on the seed and on the offset, and not on the order in which the ops are run.
+    offset : int
+        Offset used to derive different seeds for the draws that share the same ``rnd``.
+
+    Returns
+    -------
+    out : Tensor
+        The random integers.
+    """
+    if isinstance(rnd, tf.Tensor):
+        uniform = _random_uniform(shape, rnd, offset)
+        return tf.cast(tf.floor(uniform * tf.cast(maxval, tf.float64)), tf.int32)
+    if rnd is not None:
+        rnd = rnd + offset
+    return tf.random_uniform(shape, 0, maxval, dtype=tf.int32, seed=rnd)
+
+
+def _random_uniform(shape, rnd, offset=0):
+    """Draw floats uniformly at random in [0, 1).
+
+        See :meth:`_random_uniform_int` for the parameters.
+    """
+    if isinstance(rnd, tf.Tensor):
+        seed = tf.stack([rnd[0], rnd[1] * SEED_STRIDE + offset])
+        return tf.contrib.stateless.stateless_random_uniform(shape, seed, dtype=tf.float64)
+    if rnd is not None:
+        # float and integer random ops with the same seed would generate correlated numbers
+        rnd = rnd + SEED_STRIDE + offset
+    return tf.random_uniform(shape, dtype=tf.float64, seed=rnd)
+
+
+def create_alias_table(weights):
+    """Create an alias table, to sample from a discrete distribution in constant time.
+
+        The table is built with the linear algorithm described in :cite:`vose1991linear`.
+        A sample is drawn by picking a column ``i`` uniformly at random and returning ``i`` with probability
+        ``prob[i]``, or ``alias[i]`` otherwise.
+
+    Parameters
+    ----------
+    weights : ndarray, shape [n]
+        The non-negative (unnormalized) weights of the outcomes.
+
+    Returns
+    -------
+    prob : ndarray, shape [n]
+        The probability of keeping each column.
+    alias : ndarray, shape [n]
+        The alias outcome of each column.
+
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.ndim != 1 or len(weights) == 0 or np.any(weights < 0) or np.sum(weights) <= 0:
+        msg = 'Invalid weights: expected a non-empty 1-D array of non-negative values with positive sum.'
+        logger.error(msg)
+        raise ValueError(msg)
+
+    n = len(weights)
+    scaled = weights * n / np.sum(weights)
+    prob = np.ones(n, dtype=np.float64)
+    alias = np.arange(n, dtype=np.int32)
+    small = list(np.flatnonzero(scaled < 1))
+    large = list(np.flatnonzero(scaled >= 1))
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+    # the remaining columns (if any, because of rounding errors) are kept with probability 1
+    return prob, alias
+
+
+def _sample_alias_table(alias_table, shape, rnd, offset=0):
+    """Draw samples from an alias table created with :meth:`create_alias_table`.
+
+        The columns and the acceptance coins are drawn with the offsets ``offset`` and ``offset + 1``
+        (i.e. a stateless seed would otherwise make them perfectly correlated).
+        See :meth:`_random_uniform_int` for the parameters.
+    """
+    prob = tf.constant(alias_table[0], dtype=tf.float64)
+    alias = tf.constant(alias_table[1], dtype=tf.int32)
+    columns = _random_uniform_int(shape, len(alias_table[0]), rnd, offset)
+    keep = _random_uniform(shape, rnd, offset + 1) < tf.gather(prob, columns)
+    return tf.where(keep, columns, tf.gather(alias, columns))
+
+
+def generate_corruptions_for_fit(X, entities_list=None, eta=1, corrupt_side='s+o', entities_size=0, rnd=None,
+                                 positives_index=None, resample_rounds=DEFAULT_RESAMPLE_ROUNDS, alias_table=None,
+                                 corrupt_subj_probs=None):
     """Generate corruptions for training.
 
         Creates corrupted triples for each statement in an array of statements,
         as described by :cite:`trouillon2016complex`.
 
         .. note::
-            Collisions are not checked, as this will be computationally expensive :cite:`trouillon2016complex`.
-            That means that some corruptions *may* result in being positive statements (i.e. *unfiltered* settings).
+            By default collisions are not checked, as this will be computationally expensive
+            :cite:`trouillon2016complex`. That means that some corruptions *may* result in being positive
+            statements (i.e. *unfiltered* settings).
+            Pass a ``positives_index`` to resample the corruptions which are positive triples (*filtered* settings).
 
         .. note::
             When processing large knowledge graphs, it may be useful to generate corruptions only using entities from
@@ -348,8 +616,25 @@ def generate_corruptions_for_fit(X, entities_list=None, eta=1, corrupt_side='s+o
         The function can be configured to generate corruptions *only* using the entities from the current batch.
         You can enable such behaviour be setting ``entities_size==-1``. In such case, if ``entities_list=None``
         all entities from the *current batch* will be used to generate corruptions.
-    rnd: numpy.random.RandomState
-        A random number generator.
+    rnd: int or Tensor, shape [2]
+        The seed of the random ops. Pass a Tensor of two int64 (e.g. a global seed and a batch number) to use
+        stateless random ops: corruptions are then reproducible even when batches are generated in parallel
+        (i.e. in a ``tf.data`` map stage).
+    positives_index: dict
+        Index of the positive triples, created with :meth:`create_positives_index` (default: None).
+        If set, the corruptions which are positive triples are replaced by new random corruptions.
+    resample_rounds: int
+        The maximum number of times colliding corruptions are resampled (default: 3).
+        Corruptions which are still positive triples after the last round are kept.
+    alias_table: tuple
+        Alias table created with :meth:`create_alias_table` (default: None), to draw the replacement entities
+        from a non-uniform distribution (e.g. proportional to the entity degrees). The outcomes of the table
+        are the entity IDs in ``[0, entities_size)`` or, if ``entities_size=0``, the positions in
+        ``entities_list``. If None, entities are drawn uniformly.
+    corrupt_subj_probs: ndarray, shape [n_relations]
+        Probability of corrupting the subject (rather than the object) of the triples of each relation,
+        used if ``corrupt_side='s+o'`` (default: None, i.e. a fair coin is flipped).
+        See :meth:`compute_corrupt_subj_probs`.
 
     Returns
     -------
@@ -357,6 +642,12 @@ def generate_corruptions_for_fit(X, entities_list=None, eta=1, corrupt_side='s+o
     out : Tensor, shape [n * eta, 3]
         An array of corruptions for a list of positive triples x. For each row in X the corresponding corruption
         indexes can be found at [index+i*n for i in range(eta)]
+    rejected : Tensor
+        Only returned if ``positives_index`` is set. The number of sampled corruptions which were
+        positive triples, and were therefore resampled.
+    unresolved : Tensor
+        Only returned if ``positives_index`` is set. The number of corruptions in ``out`` which are still
+        positive triples after resampling.
 
     """
     logger.debug('Generating corruptions for fit.')
@@ -367,9 +658,12 @@ def generate_corruptions_for_fit(X, entities_list=None, eta=1, corrupt_side='s+o
 
     dataset = tf.reshape(tf.tile(tf.reshape(X, [-1]), [eta]), [tf.shape(X)[0] * eta, 3])
 
-    if corrupt_side == 's+o':
-        keep_subj_mask = tf.tile(tf.cast(tf.random_uniform([tf.shape(X)[0]], 0, 2, dtype=tf.int32, seed=rnd), tf.bool),
-                                 [eta])
+    if corrupt_side == 's+o' and corrupt_subj_probs is not None:
+        # corrupt the subject with a per-relation probability
+        subj_probs = tf.gather(tf.constant(corrupt_subj_probs, dtype=tf.float64), X[:, 1])
+        keep_subj_mask = tf.tile(_random_uniform([tf.shape(X)[0]], rnd) >= subj_probs, [eta])
+    elif corrupt_side == 's+o':
+        keep_subj_mask = tf.tile(tf.cast(_random_uniform_int([tf.shape(X)[0]], 2, rnd), tf.bool), [eta])
     else:
         keep_subj_mask = tf.cast(tf.ones(tf.shape(X)[0] * eta, tf.int32), tf.bool)
         if corrupt_side == 's':
@@ -381,37 +675,123 @@ def generate_corruptions_for_fit(X, entities_list=None, eta=1, corrupt_side='s+o
 
     logger.debug('Created corruption masks.')
 
-    if entities_size != 0:
-        replacements = tf.random_uniform([tf.shape(dataset)[0]], 0, entities_size, dtype=tf.int32, seed=rnd)
-    else:
-        if entities_list is None:
-            # use entities in the batch
-            entities_list, _ = tf.unique(tf.squeeze(
-                tf.concat([tf.slice(X, [0, 0], [tf.shape(X)[0], 1]),
-                           tf.slice(X, [0, 2], [tf.shape(X)[0], 1])],
-                          0)))
-
-        random_indices = tf.squeeze(tf.multinomial(tf.expand_dims(tf.zeros(tf.shape(entities_list)[0]), 0),
-                                                   num_samples=tf.shape(dataset)[0],
-                                                   seed=rnd))
-
-        replacements = tf.gather(entities_list, random_indices)
-
-    subjects = tf.math.add(tf.math.multiply(keep_subj_mask, dataset[:, 0]),
-                           tf.math.multiply(keep_obj_mask, replacements))
-    logger.debug('Created corrupted subjects.')
-    relationships = dataset[:, 1]
-    logger.debug('Retained relationships.')
-    objects = tf.math.add(tf.math.multiply(keep_obj_mask, dataset[:, 2]),
-                          tf.math.multiply(keep_subj_mask, replacements))
-    logger.debug('Created corrupted objects.')
-
-    out = tf.transpose(tf.stack([subjects, relationships, objects]))
+    if entities_size == 0 and entities_list is None:
+        # use entities in the batch
+        entities_list, _ = tf.unique(tf.squeeze(
+            tf.concat([tf.slice(X, [0, 0], [tf.shape(X)[0], 1]),
+                       tf.slice(X, [0, 2], [tf.shape(X)[0], 1])],
+                      0)))
+
+    def corrupt(draw):
+        # offset 0 is used by the corruption masks, and each draw uses two offsets (see _sample_alias_table)
+        offset = 2 * draw + 1
+        if alias_table is not None:
+            random_indices = _sample_alias_table(alias_table, [tf.shape(dataset)[0]], rnd, offset=offset)
+        elif entities_size != 0:
+            random_indices = _random_uniform_int([tf.shape(dataset)[0]], entities_size, rnd, offset=offset)
+        else:
+            random_indices = _random_uniform_int([tf.shape(dataset)[0]], tf.shape(entities_list)[0], rnd,
+                                                 offset=offset)
+
+        if entities_size != 0:
+            replacements = random_indices
+        else:
+            replacements = tf.gather(entities_list, random_indices)
+
+        subjects = tf.math.add(tf.math.multiply(keep_subj_mask, dataset[:, 0]),
+                               tf.math.multiply(keep_obj_mask, replacements))
+        relationships = dataset[:, 1]
+        objects = tf.math.add(tf.math.multiply(keep_obj_mask, dataset[:, 2]),
+                              tf.math.multiply(keep_subj_mask, replacements))
+
+        return tf.transpose(tf.stack([subjects, relationships, objects]))
+
+    out = corrupt(0)
+    logger.debug('Created corruptions.')
+
+    if positives_index is not None:
+        collisions = is_positive(out, positives_index)
+        rejected = tf.reduce_sum(tf.cast(collisions, tf.int32))
+        for draw in range(1, resample_rounds + 1):
+            # only the colliding corruptions are replaced
+            out = tf.where(collisions, corrupt(draw), out)
+            collisions = tf.logical_and(collisions, is_positive(out, positives_index))
+        unresolved = tf.reduce_sum(tf.cast(collisions, tf.int32))
+        logger.debug('Resampled corruptions which are positive triples.')
+        return out, rejected, unresolved
 
     logger.debug('Returning corruptions for fit.')
     return out
 
 
+def generate_shared_corruptions(X, pool_size, entities_list=None, corrupt_side='s+o', entities_size=0, rnd=None,
+                                alias_table=None, corrupt_subj_probs=None):
+    """Generate a pool of negative entities shared by a batch of triples, for training.
+
+        Rather than generating ``eta`` corruptions for each triple, a single pool of ``pool_size`` entities is
+        sampled for the whole batch: each triple is then corrupted with every entity of the pool, on the side
+        given by ``corrupt_subj``. Entities are sampled as in :meth:`generate_corruptions_for_fit`.
+
+    Parameters
+    ----------
+    X : Tensor, shape [n, 3]
+        An array of positive triples that will be used to create corruptions.
+    pool_size : int
+        The number of negative entities in the pool.
+    entities_list : Tensor
+        List of entities to be used for generating corruptions (default: None).
+    corrupt_side: string
+        Specifies which side of the triples to corrupt: 's', 'o' or 's+o'.
+    entities_size: int
+        If not 0, the entity IDs in ``[0, entities_size)`` are used to generate corruptions. If 0 and
+        ``entities_list=None``, the entities of the batch are used (default: 0).
+    rnd: int or Tensor, shape [2]
+        The seed of the random ops (see :meth:`generate_corruptions_for_fit`).
+    alias_table: tuple
+        Alias table created with :meth:`create_alias_table`, to sample from a non-uniform distribution.
+    corrupt_subj_probs: ndarray, shape [n_relations]
+        Per-relation probability of corrupting the subject with ``corrupt_side='s+o'``.
+
+    Returns
+    -------
+    pool : Tensor, shape [pool_size]
+        The negative entities.
+    corrupt_subj : Tensor, shape [n]
+        True for the triples whose subject must be corrupted, False for those whose object must be corrupted.
+
+    """
+    if corrupt_side not in ['s+o', 's', 'o']:
+        msg = 'Invalid argument value {} for corruption side passed for evaluation.'.format(corrupt_side)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    if corrupt_side == 's+o' and corrupt_subj_probs is not None:
+        subj_probs = tf.gather(tf.constant(corrupt_subj_probs, dtype=tf.float64), X[:, 1])
+        corrupt_subj = _random_uniform([tf.shape(X)[0]], rnd) < subj_probs
+    elif corrupt_side == 's+o':
+        corrupt_subj = tf.cast(_random_uniform_int([tf.shape(X)[0]], 2, rnd), tf.bool)
+    else:
+        corrupt_subj = tf.fill([tf.shape(X)[0]], corrupt_side == 's')
+
+    if entities_size == 0 and entities_list is None:
+        # use entities in the batch
+        entities_list, _ = tf.unique(tf.concat([X[:, 0], X[:, 2]], 0))
+
+    if alias_table is not None:
+        random_indices = _sample_alias_table(alias_table, [pool_size], rnd, offset=1)
+    elif entities_size != 0:
+        random_indices = _random_uniform_int([pool_size], entities_size, rnd, offset=1)
+    else:
+        random_indices = _random_uniform_int([pool_size], tf.shape(entities_list)[0], rnd, offset=1)
+
+    if entities_size != 0:
+        pool = random_indices
+    else:
+        pool = tf.gather(entities_list, random_indices)
+
+    return pool, corrupt_subj
+
+
 def _convert_to_idx(X, ent_to_idx, rel_to_idx, obj_to_idx):
     x_idx_s = np.vectorize(ent_to_idx.get)(X[:, 0])
     x_idx_p = np.vectorize(rel_to_idx.get)(X[:, 1])
@@ -457,7 +837,7 @@ def to_idx(X, ent_to_idx, rel_to_idx):
 
 
 def evaluate_performance(X, model, filter_triples=None, verbose=False, strict=True, rank_against_ent=None,
-                         corrupt_side='s+o', use_default_protocol=True):
+                         corrupt_side='s+o', use_default_protocol=True, from_idx=False):
     """Evaluate the performance of an embedding model.
 
         Run the relational learning evaluation protocol defined in :cite:`bordes2013translating`.
@@ -529,6 +909,9 @@ def evaluate_performance(X, model, filter_triples=None, verbose=False, strict=Tr
         Flag to indicate whether to evaluate head and tail corruptions separately (default: True).
         If this is set to true, it will also ignore the ``corrupt_side`` argument and corrupt both head and tail
         separately and rank triples.
+    from_idx: bool
+        If True, ``X`` and ``filter_triples`` are already converted to the internal IDs of the model
+        (default: False). Triples are then not checked for unseen entities.
     Returns
     -------
     ranks : ndarray, shape [n]
@@ -558,11 +941,13 @@ def evaluate_performance(X, model, filter_triples=None, verbose=False, strict=Tr
     """
 
     logger.debug('Evaluating the performance of the embedding model.')
-    X_test = filter_unseen_entities(X, model, verbose=verbose, strict=strict)
-
-    X_test = to_idx(X_test, ent_to_idx=model.ent_to_idx, rel_to_idx=model.rel_to_idx)
+    if from_idx:
+        X_test = X
+    else:
+        X_test = filter_unseen_entities(X, model, verbose=verbose, strict=strict)
+        X_test = to_idx(X_test, ent_to_idx=model.ent_to_idx, rel_to_idx=model.rel_to_idx)
 
-    if filter_triples is not None:
+    if filter_triples is not None and not from_idx:
         logger.debug('Getting filtered triples.')
         filter_triples = to_idx(filter_triples, ent_to_idx=model.ent_to_idx, rel_to_idx=model.rel_to_idx)
         
@@ -763,9 +1148,524 @@ def gridsearch_next_hyperparam(model_name, in_dict):
         print(str(e))
 
 
+def _run_trial(trials, context):
+    """Train a model with a combination of hyperparameters, and rank the triples of the selection dataset.
+
+        Trials which only differ in their number of epochs share a single training, to the largest number of
+        epochs: the triples are ranked with a snapshot of the parameters at the end of the epochs of each trial.
+
+    Parameters
+    ----------
+    trials : list
+        The trials sharing the training. A trial is a tuple of the index of the trial, the hyperparameters of
+        the model, the directory where the training is checkpointed and resumed (None to train from scratch
+        without checkpoints), and a flag to rank the subsample of the selection dataset rather than the whole
+        of it.
+    context : dict
+        The arguments shared by all the trials of the model selection. The triples are already converted to
+        the internal IDs of the ``ent_to_idx`` and ``rel_to_idx`` mappings (see :func:`_prepare_trial_context`).
+
+    Returns
+    -------
+    results : list
+        For each trial:
+
+        - index : int, the index of the trial.
+        - model : EmbeddingModel, the trained model (None if the trial failed). A trial sharing the training
+          of a trial with more epochs gets the list of its trained parameters instead
+          (see :func:`_restore_trial_model`).
+        - metrics : dict, the ranking metrics of the selection dataset (None if the trial failed),
+          see :func:`_ranking_metrics`.
+        - error : str, the exception raised by the trial (None if the trial succeeded).
+        - duration : float, the wall-clock time of the trial, in seconds (including the shared training).
+    """
+    from ..latent_features import ModelCheckpoint, ModelSnapshot
+    # the longest training serves all the trials
+    trials = sorted(trials, key=lambda trial: trial[1]['epochs'])
+    index, model_params, checkpoint_dir, use_subsample = trials[-1]
+    start_time = time.time()
+    try:
+        model = context['model_class'](**model_params)
+        if context['tf_threads'] is not None:
+            model.tf_config.intra_op_parallelism_threads = context['tf_threads']
+            model.tf_config.inter_op_parallelism_threads = context['tf_threads']
+
+        snapshot = ModelSnapshot([trial[1]['epochs'] for trial in trials[:-1]])
+        callbacks = [snapshot]
+        resume_from = None
+        if checkpoint_dir is not None:
+            # only the state at the end of the budget is needed to resume the training in the next rung
+            callbacks.append(ModelCheckpoint(checkpoint_dir, interval=model_params['epochs'], max_to_keep=1))
+            if tf.train.latest_checkpoint(checkpoint_dir) is not None:
+                resume_from = checkpoint_dir
+        model.rel_to_idx, model.ent_to_idx = context['rel_to_idx'], context['ent_to_idx']
+        model.fit(context['X_train'], context['early_stopping'], context['early_stopping_params'],
+                  callbacks=callbacks, resume_from=resume_from, from_idx=True)
+    except Exception as e:
+        return [(trial[0], None, None, str(e), time.time() - start_time) for trial in trials]
+
+    results = []
+    trained_model_params = model.trained_model_params
+    for trial in trials:
+        try:
+            # without a snapshot, the training stopped early before the epochs of the trial
+            model.trained_model_params = snapshot.snapshots.get(trial[1]['epochs'], trained_model_params)
+            if context['X_filter'] is not None:
+                # the filter index is the same for all the trials
+                model.set_filter_for_eval(context['X_filter'], context['filter_index'])
+            selection_dataset = context['selection_subsample'] if trial[3] else context['selection_dataset']
+            ranks = evaluate_performance(selection_dataset, model=model, verbose=context['verbose'],
+                                         rank_against_ent=context['rank_against_ent'],
+                                         use_default_protocol=context['use_default_protocol'],
+                                         corrupt_side=context['corrupt_side'], from_idx=True)
+            results.append((trial[0], model if trial is trials[-1] else list(model.trained_model_params),
+                            _ranking_metrics(ranks), None, time.time() - start_time))
+        except Exception as e:
+            results.append((trial[0], None, None, str(e), time.time() - start_time))
+    model.trained_model_params = trained_model_params
+    return results
+
+
+def _group_trials(trials):
+    """Group the trials which only differ in their number of epochs, so that they share a single training.
+
+        Trials which are checkpointed (i.e. the rungs of successive halving) are not grouped.
+
+    Parameters
+    ----------
+    trials : list
+        The trials to run (see :func:`_run_trial`).
+
+    Returns
+    -------
+    groups : list
+        The lists of trials sharing a training, in the order of their first trial.
+    """
+    groups = {}
+    for trial in trials:
+        index, model_params, checkpoint_dir, use_subsample = trial
+        if checkpoint_dir is not None:
+            key = index
+        else:
+            key = json.dumps({'params': dict(model_params, epochs=None), 'subsample': use_subsample},
+                             sort_keys=True, default=str)
+        groups.setdefault(key, []).append(trial)
+    return sorted(groups.values(), key=lambda group: trials.index(group[0]))
+
+
+def _ranking_metrics(ranks):
+    """Compute the ranking metrics reported by the model selection.
+
+    Parameters
+    ----------
+    ranks : ndarray, shape [n]
+        The ranks of the triples of the selection dataset.
+
+    Returns
+    -------
+    metrics : dict
+        The ``'mrr'``, ``'mr'``, ``'hits_1'``, ``'hits_3'`` and ``'hits_10'`` scores of the ranks.
+    """
+    return {'mrr': float(mrr_score(ranks)), 'mr': float(mr_score(ranks)),
+            'hits_1': float(hits_at_n_score(ranks, n=1)), 'hits_3': float(hits_at_n_score(ranks, n=3)),
+            'hits_10': float(hits_at_n_score(ranks, n=10))}
+
+
+def _prepare_trial_context(context):
+    """Convert the triples shared by all the trials to internal IDs, and build the evaluation filter index.
+
+        The mappings are created from the training triples once, rather than by each trial.
+
+    Parameters
+    ----------
+    context : dict
+        The arguments shared by all the trials of the model selection, with the triples as strings.
+
+    Returns
+    -------
+    context : dict
+        The arguments shared by all the trials, with the triples converted to internal IDs, the
+        ``ent_to_idx`` and ``rel_to_idx`` mappings and the ``filter_index`` of ``X_filter``.
+    """
+    from ..latent_features.models import create_filter_index
+    context = dict(context)
+    rel_to_idx, ent_to_idx = create_mappings(context['X_train'])
+    context['rel_to_idx'], context['ent_to_idx'] = rel_to_idx, ent_to_idx
+    for key in ['X_train', 'selection_dataset', 'selection_subsample', 'X_filter']:
+        if context.get(key) is not None:
+            context[key] = to_idx(context[key], ent_to_idx=ent_to_idx, rel_to_idx=rel_to_idx)
+
+    context['filter_index'] = None
+    if context['X_filter'] is not None:
+        context['filter_index'] = create_filter_index(context['X_filter'], len(ent_to_idx), len(rel_to_idx))
+
+    early_stopping_params = dict(context['early_stopping_params'])
+    for key in ['x_valid', 'x_filter']:
+        if early_stopping_params.get(key) is not None:
+            early_stopping_params[key] = to_idx(early_stopping_params[key], ent_to_idx=ent_to_idx,
+                                                rel_to_idx=rel_to_idx)
+    context['early_stopping_params'] = early_stopping_params
+    return context
+
+
+def _init_trial_worker(context):
+    """Store the arguments shared by all the trials run by a worker process.
+
+    Parameters
+    ----------
+    context : dict
+        The arguments shared by all the trials of the model selection.
+    """
+    _trial_context.update(context)
+
+
+def _run_trial_in_worker(trials):
+    """Run trials sharing a training in a worker process.
+
+        Models cannot be sent back to the parent process: only their trained parameters are, if
+        ``keep_trained_params`` is set in the context of the trials.
+
+    Parameters
+    ----------
+    trials : list
+        See :func:`_run_trial`.
+
+    Returns
+    -------
+    results : list
+        The index, trained parameters, metrics, error and duration of each trial (see :func:`_run_trial`).
+    """
+    results = []
+    for index, model, metrics, error, duration in _run_trial(trials, _trial_context):
+        if model is not None and not isinstance(model, list):
+            model = model.trained_model_params
+        results.append((index, model if _trial_context['keep_trained_params'] else None, metrics, error,
+                        duration))
+    return results
+
+
+class _TrialJournal(object):
+    """Append-only record of the trials of a model selection, stored as a JSON Lines file.
+
+        Each line records a trial once it completes: its hyperparameters, whether the selection dataset was
+        subsampled (``'subsample'``), its ``'status'`` (``'completed'`` or ``'failed'``), its ranking
+        ``'metrics'`` or its ``'error'``, its ``'duration'`` in seconds and the ``'time'`` it completed at.
+        Trials recorded by a previous run with the same path are not run again.
+    """
+
+    def __init__(self, path):
+        """Initialize the journal, loading the trials recorded by a previous run.
+
+        Parameters
+        ----------
+        path : str
+            The path of the JSON Lines file.
+        """
+        self.path = path
+        self.records = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                lines = f.readlines()
+            for line in lines:
+                # a run interrupted while writing leaves a truncated last line
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning('Skipping a malformed line of the trial journal {}.'.format(path))
+                    continue
+                self.records[self._key(record['params'], record['subsample'])] = record
+            if lines and not lines[-1].endswith('\n'):
+                # new records must not be appended to the truncated line
+                with open(path, 'a') as f:
+                    f.write('\n')
+            logger.debug('Loaded {} trials from the journal {}.'.format(len(self.records), path))
+
+    @staticmethod
+    def _key(model_params, use_subsample):
+        return json.dumps({'params': model_params, 'subsample': use_subsample}, sort_keys=True, default=str)
+
+    def get(self, model_params, use_subsample):
+        """Return the record of a trial, or None if it was not run yet.
+
+        Parameters
+        ----------
+        model_params : dict
+            The hyperparameters of the trial.
+        use_subsample : bool
+            Whether the trial ranks the subsample of the selection dataset.
+
+        Returns
+        -------
+        record : dict
+            The record of the trial.
+        """
+        return self.records.get(self._key(model_params, use_subsample))
+
+    def record(self, model_name, model_params, use_subsample, metrics, error, duration):
+        """Append the outcome of a trial to the journal.
+
+        Parameters
+        ----------
+        model_name : str
+            The name of the model class.
+        model_params : dict
+            The hyperparameters of the trial.
+        use_subsample : bool
+            Whether the trial ranked the subsample of the selection dataset.
+        metrics : dict
+            The ranking metrics of the trial (None if it failed).
+        error : str
+            The exception raised by the trial (None if it succeeded).
+        duration : float
+            The wall-clock time of the trial, in seconds.
+        """
+        record = {'model': model_name, 'params': model_params, 'subsample': use_subsample,
+                  'status': 'completed' if error is None else 'failed', 'metrics': metrics, 'error': error,
+                  'duration': duration, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, sort_keys=True, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[self._key(model_params, use_subsample)] = record
+
+
+def _run_trials(trials, context, pool=None, journal=None):
+    """Run trials, sequentially or in a pool of worker processes.
+
+    Parameters
+    ----------
+    trials : list
+        The trials to run (see :func:`_run_trial`).
+    context : dict
+        The arguments shared by all the trials of the model selection.
+    pool : multiprocessing.Pool
+        The pool of worker processes (None to run the trials in the current process).
+    journal : _TrialJournal
+        The journal where the trials are recorded (None not to record them). The trials already recorded are
+        not run again: their recorded outcome is returned first.
+
+        The other trials which only differ in their number of epochs share a single training
+        (see :func:`_group_trials`).
+
+    Returns
+    -------
+    results : iterator
+        The index, model, metrics, error and duration of each trial, in the order trials complete.
+        Models trained by worker processes are returned as their trained parameters (see :func:`_run_trial`),
+        and models recorded by a previous run are not returned (None).
+    """
+    pending = []
+    for trial in trials:
+        index, model_params, _, use_subsample = trial
+        record = journal.get(model_params, use_subsample) if journal is not None else None
+        if record is None:
+            pending.append(trial)
+            continue
+        logger.debug('Trial {} was recorded by a previous run: {}.'.format(index, record['status']))
+        yield index, None, record['metrics'], record['error'], record['duration']
+
+    groups = _group_trials(pending)
+    if pool is None:
+        results = (result for group in groups for result in _run_trial(group, context))
+    else:
+        results = (result for group_results in pool.imap_unordered(_run_trial_in_worker, groups)
+                   for result in group_results)
+
+    params = {index: (model_params, use_subsample) for index, model_params, _, use_subsample in pending}
+    for index, model, metrics, error, duration in results:
+        if journal is not None:
+            journal.record(context['model_class'].name, params[index][0], params[index][1], metrics, error,
+                           duration)
+        yield index, model, metrics, error, duration
+
+
+def _run_sampler_trials(sampler, model_params_list, context, pool, batch_size, journal=None):
+    """Run the trials of the configurations drawn by a sampler, and report their scores to the sampler.
+
+        Adaptive samplers draw ``batch_size`` configurations at a time, using the scores of all the previous
+        ones. Other samplers draw all their configurations at once.
+
+    Parameters
+    ----------
+    sampler : Sampler
+        The hyperparameter sampler.
+    model_params_list : list
+        The drawn configurations are appended to this list, so that trial indices refer to it.
+    context : dict
+        The arguments shared by all the trials of the model selection.
+    pool : multiprocessing.Pool
+        The pool of worker processes (None to run the trials in the current process).
+    batch_size : int
+        The number of configurations drawn at a time by adaptive samplers.
+    journal : _TrialJournal
+        The journal where the trials are recorded (None not to record them).
+
+    Returns
+    -------
+    results : iterator
+        The index, model, metrics, error and duration of each trial, in the order trials complete.
+    """
+    while True:
+        trials = []
+        while not sampler.adaptive or len(trials) < batch_size:
+            model_params = sampler.ask()
+            if model_params is None:
+                break
+            trials.append((len(model_params_list), model_params, None, False))
+            model_params_list.append(model_params)
+        if not trials:
+            return
+
+        for index, model, metrics, error, duration in _run_trials(trials, context, pool, journal):
+            sampler.tell(index, metrics['mrr'] if error is None else None)
+            yield index, model, metrics, error, duration
+
+
+def _successive_halving(model_params_list, context, pool, checkpoint_dir, reduction_factor, verbose,
+                        journal=None):
+    """Run the trials of a successive halving search.
+
+        All the candidates are first trained with a small budget of epochs, and ranked on a subsample of the
+        selection dataset. Only the best ``1 / reduction_factor`` of them are promoted to the next rung, where
+        their budget is multiplied by ``reduction_factor``. The training of the promoted candidates is resumed
+        from the checkpoint of the previous rung. In the last rung, candidates are trained for their full
+        ``epochs`` and ranked on the whole selection dataset.
+
+    Parameters
+    ----------
+    model_params_list : list
+        The hyperparameters of each candidate.
+    context : dict
+        The arguments shared by all the trials of the model selection.
+    pool : multiprocessing.Pool
+        The pool of worker processes (None to run the trials in the current process).
+    checkpoint_dir : str
+        The directory where the trainings of the candidates are checkpointed.
+    reduction_factor : int
+        The factor by which the number of candidates is reduced at each rung.
+    verbose : bool
+        Verbose mode.
+    journal : _TrialJournal
+        The journal where the trials of all the rungs are recorded (None not to record them).
+
+    Returns
+    -------
+    results : iterator
+        The index, model, metrics, error and duration of the trials of the last rung.
+    """
+    rung_sizes = [len(model_params_list)]
+    while rung_sizes[-1] >= reduction_factor:
+        rung_sizes.append(int(np.ceil(rung_sizes[-1] / reduction_factor)))
+
+    candidates = list(range(len(model_params_list)))
+    for rung, rung_size in enumerate(rung_sizes):
+        last_rung = rung == len(rung_sizes) - 1
+        trials = []
+        for index in candidates[:rung_size]:
+            model_params = dict(model_params_list[index])
+            model_params['epochs'] = max(1, int(np.ceil(model_params['epochs'] *
+                                                        reduction_factor ** (rung - len(rung_sizes) + 1))))
+            trials.append((index, model_params, os.path.join(checkpoint_dir, 'trial-{}'.format(index)),
+                           not last_rung))
+        logger.debug('Successive halving rung {}: {} candidates.'.format(rung, len(trials)))
+
+        if last_rung:
+            return _run_trials(trials, context, pool, journal)
+
+        scores = []
+        for index, _, metrics, error, _ in tqdm(_run_trials(trials, context, pool, journal), total=len(trials),
+                                                disable=(not verbose)):
+            if error is not None:
+                if verbose:
+                    logger.error('Exception occured for parameters:{}'.format(model_params_list[index]))
+                    logger.error(error)
+                continue
+            scores.append((-metrics['mrr'], index))
+        # ties are broken by the order of the grid, whatever the order in which trials complete
+        candidates = [index for _, index in sorted(scores)]
+
+
+def _restore_trial_model(model_class, model_params, trained_model_params, context):
+    """Restore the model of a trial from its trained parameters.
+
+    Parameters
+    ----------
+    model_class : class
+        The class of the EmbeddingModel.
+    model_params : dict
+        The hyperparameters of the model.
+    trained_model_params : list
+        The trained parameters of the model.
+    context : dict
+        The arguments shared by all the trials of the model selection, with the mappings of the trials.
+
+    Returns
+    -------
+    model : EmbeddingModel
+        The trained model.
+    """
+    model = model_class(**model_params)
+    model.rel_to_idx, model.ent_to_idx = context['rel_to_idx'], context['ent_to_idx']
+    model.restore_model_params({'model_params': trained_model_params})
+    model.is_fitted = True
+    return model
+
+
+def _retrain_best_model(model_class, model, model_params, X, strategy, retrain_params):
+    """Train the best model of a model selection on the concatenation of the training and validation sets.
+
+    Parameters
+    ----------
+    model_class : class
+        The class of the EmbeddingModel.
+    model : EmbeddingModel
+        The model of the best trial, trained on the training set (None if it was recorded by a previous run).
+    model_params : dict
+        The hyperparameters of the best model.
+    X : dict
+        The triples of the model selection.
+    strategy : string
+        The retraining strategy: ``full``, ``warm_start`` or ``none``.
+    retrain_params : dict
+        The parameters of the retraining.
+
+    Returns
+    -------
+    model : EmbeddingModel
+        The retrained model, with its ``retraining`` attribute set.
+    """
+    if model is None and strategy == 'warm_start':
+        # training the model of the best trial again would cost more than a full retraining
+        logger.debug('The model of the best trial is not available: retraining it from scratch.')
+        strategy = 'full'
+
+    if strategy == 'full':
+        model = model_class(**model_params)
+        model.fit(np.concatenate((X['train'], X['valid'])))
+        epochs = model.epochs
+    elif strategy == 'warm_start':
+        epochs = retrain_params.get('epochs', max(1, int(np.ceil(model.epochs * DEFAULT_WARM_START_EPOCHS_RATIO))))
+        model.partial_fit(np.concatenate((X['train'], X['valid'])), epochs=epochs)
+    elif model is None:
+        # the model of a trial recorded by a previous run is not available: its training is run again
+        strategy = 'trial'
+        model = model_class(**model_params)
+        model.fit(X['train'])
+        epochs = model.epochs
+    else:
+        epochs = 0
+
+    logger.debug('Best model retrained with strategy {} for {} epochs.'.format(strategy, epochs))
+    model.retraining = {'strategy': strategy, 'epochs': epochs}
+    return model
+
+
 def select_best_model_ranking(model_class, X, param_grid, use_filter=False, early_stopping=False,
                               early_stopping_params={}, use_test_for_selection=True, rank_against_ent=None,
-                              corrupt_side='s+o', use_default_protocol=False, verbose=False):
+                              corrupt_side='s+o', use_default_protocol=False, verbose=False,
+                              n_jobs=DEFAULT_N_JOBS, tf_threads_per_job=None, sampler='grid', sampler_params={},
+                              search_strategy='full', halving_params={}, journal=None, retrain='full',
+                              retrain_params={}):
     """Model selection routine for embedding models.
 
         .. note::
@@ -773,6 +1673,10 @@ def select_best_model_ranking(model_class, X, param_grid, use_filter=False, earl
 
         The function also retrains the best performing model on the concatenation of training and validation sets.
 
+        The triples are converted to internal IDs, and the evaluation filter is indexed, once for all the trials:
+        the selection triples (and the early stopping ones) must only include entities and relations of
+        ``X['train']``.
+
         Note we generate negatives at runtime according to the strategy described in ::cite:`bordes2013translating`).
 
     Parameters
@@ -785,6 +1689,10 @@ def select_best_model_ranking(model_class, X, param_grid, use_filter=False, earl
     param_grid : dict
         A grid of hyperparameters to use in model selection. The routine will train a model for each combination
         of these hyperparameters.
+
+        Combinations which only differ in their number of ``epochs`` share a single training, to the largest
+        number of epochs: each combination is evaluated with a snapshot of the parameters at the end of its
+        epochs. Listing several values in ``epochs`` thus costs the training of the largest one.
     use_filter : bool
         If True, will use the entire input dataset X to compute filtered MRR
     early_stopping: bool
@@ -849,11 +1757,82 @@ def select_best_model_ranking(model_class, X, param_grid, use_filter=False, earl
         If this is set to true, it will ignore corrupt_side argument and corrupt both head and tail separately and rank triples.
     verbose : bool
         Verbose mode during evaluation of trained model
+    n_jobs : int
+        The number of hyperparameter combinations trained and evaluated in parallel, each in its own process
+        (default: 1, all the combinations are evaluated sequentially in the current process).
+        Results are gathered as trials complete. When two combinations reach the same MRR, the first one in
+        the grid order is selected, so the outcome does not depend on the order in which trials complete.
+
+        .. note::
+            Worker processes are started with the ``spawn`` method: scripts calling this function with
+            ``n_jobs > 1`` must protect their entry point with ``if __name__ == '__main__':``.
+
+    tf_threads_per_job : int
+        The number of threads used by the TensorFlow sessions of each trial, when ``n_jobs > 1``
+        (default: the number of CPUs divided by ``n_jobs``).
+    sampler : string
+        The strategy to draw the configurations of hyperparameters from ``param_grid``:
+
+        - ``grid`` (default): every combination of the hyperparameter values (:class:`GridSampler`).
+        - ``random``: random search with a fixed number of trials (:class:`RandomSampler`).
+        - ``tpe``: Tree-structured Parzen Estimator, which draws the next configurations according to the
+          scores of the previous ones (:class:`TPESampler`).
+
+        With ``random`` and ``tpe``, continuous ranges (:class:`Uniform`, :class:`LogUniform`) can be used in
+        place of lists of values, e.g. ``'optimizer_params': {'lr': LogUniform(1e-4, 1e-1)}``.
+    sampler_params : dict
+        The parameters of the sampler (e.g. ``{'n_trials': 20, 'seed': 0}``), see the sampler documentation.
+    search_strategy : string
+        ``full`` (default) trains every configuration for its full number of epochs.
+        ``halving`` runs successive halving :cite:`jamieson2016non`: all the configurations are trained for a few
+        epochs and ranked on a subsample of the selection dataset, and only the best ``1 / reduction_factor``
+        of them are promoted to a ``reduction_factor`` times larger budget, until the last candidates are
+        trained for their full number of epochs and ranked on the whole selection dataset.
+        Promoted candidates resume their training from a checkpoint of the previous budget.
+    halving_params : dict
+        Parameters of successive halving. The following keys are supported:
+
+            reduction_factor: the factor by which the number of candidates is reduced at each rung (default: 3).
+
+            subsample: the number of selection triples used to rank the candidates of intermediate rungs
+            (default: 1000).
+    journal : string
+        Path of a JSON Lines file where each trial is recorded as soon as it completes (default: ``None``, the
+        trials are not recorded). A record holds the hyperparameters of the trial, its status (``completed``
+        or ``failed``), its ranking metrics or its error, and its duration.
+
+        If the file already exists, the trials it records are not run again, so that an interrupted model
+        selection can be resumed by calling the function again with the same arguments: the configurations
+        are drawn in the same order, and samplers are told the recorded scores. Failed trials are not retried.
+        The best model is trained again if its trial was recorded by a previous run. With ``halving``, the
+        checkpoints of the candidates are kept next to the journal until the search completes.
+    retrain : string
+        How the best model is trained on the concatenation of the training and validation sets before being
+        evaluated on the test set:
+
+        - ``full`` (default): train it from scratch.
+        - ``warm_start``: fine-tune the model of the best trial for a few epochs, with
+          :meth:`EmbeddingModel.partial_fit`. The entities and relations of the validation set not seen in
+          training are added to the model. If the model of the best trial is not available (i.e. its trial
+          was recorded in the ``journal`` by a previous run), it is trained from scratch instead.
+        - ``none``: keep the model of the best trial, trained on the training set only. If it is not
+          available, the training of its trial is run again on the training set.
+
+        With ``n_jobs > 1`` and a ``warm_start`` or ``none`` retraining, worker processes send the trained
+        parameters of the models back to the current process.
+    retrain_params : dict
+        Parameters of the retraining. The following keys are supported:
+
+            epochs: the number of epochs of a ``warm_start`` retraining
+            (default: 10% of the epochs of the best model, at least 1).
 
     Returns
     -------
     best_model : EmbeddingModel
         The best trained embedding model obtained in model selection.
+        Its ``retraining`` attribute records how it was retrained: the ``'strategy'`` actually applied
+        (``full``, ``warm_start``, ``none``, or ``trial`` if the training of the best trial was run again)
+        and the number of ``'epochs'`` of the retraining.
 
     best_params : dict
         The hyperparameters of the best embedding model `best_model`.
@@ -923,11 +1902,21 @@ def select_best_model_ranking(model_class, X, param_grid, use_filter=False, earl
         logger.debug('Hypermater key {} is missing'.format(key))
         raise ValueError('Please pass values for optimizer parameter - lr')
 
-    model_params_combinations = gridsearch_next_hyperparam(model_class.name, param_grid)
+    if retrain not in ['full', 'warm_start', 'none']:
+        msg = 'Unsupported retraining strategy {}.'.format(retrain)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    if sampler not in SAMPLER_REGISTRY:
+        msg = 'Unsupported sampler {}. Choose one of {}.'.format(sampler, list(SAMPLER_REGISTRY))
+        logger.error(msg)
+        raise ValueError(msg)
+    sampler = SAMPLER_REGISTRY[sampler](model_class.name, param_grid, sampler_params)
 
     best_mrr_train = 0
     best_model = None
     best_params = None
+    best_index = None
 
     if early_stopping:
         try:
@@ -946,46 +1935,106 @@ def select_best_model_ranking(model_class, X, param_grid, use_filter=False, earl
     else:
         selection_dataset = X['valid']
 
-    for model_params in tqdm(model_params_combinations, disable=(not verbose)):
-        try:
-            model = model_class(**model_params)
-            model.fit(X['train'], early_stopping, early_stopping_params)
-
-            ranks = evaluate_performance(selection_dataset, model=model,
-                                         filter_triples=X_filter, verbose=verbose,
-                                         rank_against_ent=rank_against_ent,
-                                         use_default_protocol=use_default_protocol,
-                                         corrupt_side=corrupt_side)
-
-            curr_mrr = mrr_score(ranks)
-            mr = mr_score(ranks)
-            hits_1 = hits_at_n_score(ranks, n=1)
-            hits_3 = hits_at_n_score(ranks, n=3)
-            hits_10 = hits_at_n_score(ranks, n=10)
+    context = {'model_class': model_class, 'X_train': X['train'], 'selection_dataset': selection_dataset,
+               'X_filter': X_filter, 'early_stopping': early_stopping, 'early_stopping_params': early_stopping_params,
+               'rank_against_ent': rank_against_ent, 'use_default_protocol': use_default_protocol,
+               'corrupt_side': corrupt_side, 'verbose': verbose, 'tf_threads': None,
+               'keep_trained_params': retrain != 'full'}
+
+    model_params_list = []
+    if search_strategy not in ['full', 'halving']:
+        msg = 'Unsupported search strategy {}.'.format(search_strategy)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    reduction_factor = halving_params.get('reduction_factor', DEFAULT_HALVING_REDUCTION_FACTOR)
+    if search_strategy == 'halving':
+        if reduction_factor < 2:
+            msg = 'The reduction factor of successive halving must be at least 2, got {}.'.format(reduction_factor)
+            logger.error(msg)
+            raise ValueError(msg)
+        subsample_size = min(len(selection_dataset), halving_params.get('subsample', DEFAULT_HALVING_SUBSAMPLE))
+        context['selection_subsample'] = selection_dataset[
+            np.sort(np.random.RandomState(0).choice(len(selection_dataset), subsample_size, replace=False))]
+
+    # the triples are converted to internal IDs once for all the trials
+    context = _prepare_trial_context(context)
+
+    pool = None
+    checkpoint_dir = None
+    if n_jobs > 1:
+        if tf_threads_per_job is None:
+            tf_threads_per_job = max(1, multiprocessing.cpu_count() // n_jobs)
+        context['tf_threads'] = tf_threads_per_job
+        logger.debug('Running {} trials in parallel, with {} TensorFlow threads each.'.format(n_jobs,
+                                                                                           tf_threads_per_job))
+        # fork is unsafe once TensorFlow has been initialized in the parent process
+        pool = multiprocessing.get_context('spawn').Pool(n_jobs, _init_trial_worker, (context,))
+
+    if journal is not None:
+        journal = _TrialJournal(journal)
+
+    try:
+        if search_strategy == 'halving':
+            # the configurations are drawn upfront: adaptive samplers draw them at random
+            model_params_list.extend(iter(sampler.ask, None))
+            if journal is not None:
+                # keep the checkpoints of an interrupted search, to resume the training of its candidates
+                checkpoint_dir = '{}.checkpoints'.format(journal.path)
+                os.makedirs(checkpoint_dir, exist_ok=True)
+            else:
+                checkpoint_dir = tempfile.mkdtemp()
+            results = list(_successive_halving(model_params_list, context, pool, checkpoint_dir, reduction_factor,
+                                               verbose, journal))
+        else:
+            results = tqdm(_run_sampler_trials(sampler, model_params_list, context, pool, max(1, n_jobs), journal),
+                           total=sampler.n_trials, disable=(not verbose))
+
+        for index, model, metrics, error, duration in results:
+            model_params = model_params_list[index]
+            if error is not None:
+                if verbose:
+                    logger.error('Exception occured for parameters:{}'.format(model_params))
+                    logger.error(error)
+                continue
+
+            curr_mrr = metrics['mrr']
+            mr = metrics['mr']
+            hits_1 = metrics['hits_1']
+            hits_3 = metrics['hits_3']
+            hits_10 = metrics['hits_10']
             info = 'mr:{} mrr: {} hits 1: {} hits 3: {} hits 10: {}, model: {}, params: {}'.format(mr, curr_mrr, hits_1,
                                                                                                    hits_3, hits_10,
-                                                                                                   type(model).__name__,
+                                                                                                   model_class.__name__,
                                                                                                    model_params)
             logger.debug(info)
             if verbose:
                 logger.info(info)
 
-            if curr_mrr > best_mrr_train:
+            # ties are broken by the order of the grid, whatever the order in which trials complete
+            if curr_mrr > best_mrr_train or (curr_mrr == best_mrr_train and best_index is not None
+                                             and index < best_index):
                 best_mrr_train = curr_mrr
                 best_model = model
                 best_params = model_params
-        except Exception as e:
-            if verbose:
-                logger.error('Exception occured for parameters:{}'.format(model_params))
-                logger.error(str(e))
-            else:
-                pass
-    
+                best_index = index
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if checkpoint_dir is not None and journal is None:
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    if checkpoint_dir is not None and journal is not None:
+        # the search is complete: the checkpoints kept to resume it are no longer needed
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
     ranks_test =[]
     mrr_test = 0
-    if best_model is not None:
-        # Retraining
-        best_model.fit(np.concatenate((X['train'], X['valid'])))
+    if best_params is not None:
+        if isinstance(best_model, list):
+            # the best trial ran in a worker process, or shared the training of a trial with more epochs
+            best_model = _restore_trial_model(model_class, best_params, best_model, context)
+        best_model = _retrain_best_model(model_class, best_model, best_params, X, retrain, retrain_params)
 
         ranks_test = evaluate_performance(X['test'], model=best_model,
                                           filter_triples=X_filter, verbose=verbose,
@@ -0,0 +1,393 @@
+import numpy as np
+import logging
+
+SAMPLER_REGISTRY = {}
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Default number of configurations drawn by the random and TPE samplers
+DEFAULT_N_TRIALS = 20
+
+# Default seed of the random and TPE samplers
+DEFAULT_SAMPLER_SEED = 0
+
+# Default number of random configurations drawn by TPE before fitting its density estimators
+DEFAULT_TPE_STARTUP_TRIALS = 10
+
+# Default fraction of the observed configurations considered good by TPE
+DEFAULT_TPE_GAMMA = 0.25
+
+# Default number of candidate values among which TPE picks the most promising one
+DEFAULT_TPE_CANDIDATES = 24
+
+# Hyperparameters drawn for every configuration, in order
+SAMPLED_KEYS = ['batches_count', 'epochs', 'k', 'eta', 'loss', 'regularizer', 'optimizer']
+
+
+def register_sampler(name):
+    def insert_in_registry(class_handle):
+        SAMPLER_REGISTRY[name] = class_handle
+        class_handle.name = name
+        return class_handle
+
+    return insert_in_registry
+
+
+class Uniform(object):
+    """Uniform distribution over a continuous range of hyperparameter values.
+
+        Can be used in place of a list of values in the ``param_grid`` of the random and TPE samplers.
+
+    Example
+    -------
+    >>> param_grid = {..., 'regularizer_params': {'lambda': Uniform(0, 1e-3)}}
+    """
+
+    def __init__(self, low, high, integer=False):
+        """Initialize the distribution.
+
+        Parameters
+        ----------
+        low : float
+            The lower bound of the range.
+        high : float
+            The upper bound of the range.
+        integer : bool
+            If True, sampled values are rounded to the nearest integer (default: False).
+        """
+        if high < low:
+            msg = 'Invalid range [{}, {}].'.format(low, high)
+            logger.error(msg)
+            raise ValueError(msg)
+        self.low = low
+        self.high = high
+        self.integer = integer
+
+    def _to_range(self, value):
+        return value
+
+    def _from_range(self, value):
+        return value
+
+    def to_unit(self, value):
+        """Map a value of the range to [0, 1]."""
+        low, high = self._to_range(self.low), self._to_range(self.high)
+        if high == low:
+            return 0.
+        return (self._to_range(value) - low) / (high - low)
+
+    def from_unit(self, u):
+        """Map a number of [0, 1] to a value of the range."""
+        low, high = self._to_range(self.low), self._to_range(self.high)
+        value = self._from_range(low + u * (high - low))
+        if self.integer:
+            return int(np.round(value))
+        return float(value)
+
+    def sample(self, rnd):
+        """Draw a value.
+
+        Parameters
+        ----------
+        rnd : numpy.random.RandomState
+            The random generator.
+
+        Returns
+        -------
+        value : float or int
+            The sampled value.
+        """
+        return self.from_unit(rnd.uniform())
+
+    def __repr__(self):
+        return '{}({}, {})'.format(self.__class__.__name__, self.low, self.high)
+
+
+class LogUniform(Uniform):
+    """Log-uniform distribution over a continuous range of positive hyperparameter values.
+
+        Suited to scale hyperparameters such as learning rates and regularization weights.
+
+    Example
+    -------
+    >>> param_grid = {..., 'optimizer_params': {'lr': LogUniform(1e-4, 1e-1)}}
+    """
+
+    def __init__(self, low, high, integer=False):
+        if low <= 0:
+            msg = 'The range of a log-uniform distribution must be positive, got [{}, {}].'.format(low, high)
+            logger.error(msg)
+            raise ValueError(msg)
+        super().__init__(low, high, integer)
+
+    def _to_range(self, value):
+        return np.log(value)
+
+    def _from_range(self, value):
+        return np.exp(value)
+
+
+class Sampler(object):
+    """Abstract class of the hyperparameter samplers used in model selection.
+
+        A sampler draws configurations from a ``param_grid`` (see :func:`select_best_model_ranking`),
+        with the ask-and-tell interface: :meth:`ask` returns the next configuration, and :meth:`tell` reports
+        the score it obtained. Adaptive samplers use the reported scores to draw the next configurations.
+    """
+
+    name = ""
+
+    # True if the sampler uses the scores of the previous configurations
+    adaptive = False
+
+    def __init__(self, model_name, param_grid, sampler_params={}):
+        """Initialize the sampler.
+
+        Parameters
+        ----------
+        model_name : string
+            The registry name of the model.
+        param_grid : dict
+            The hyperparameters to search.
+        sampler_params : dict
+            The parameters of the sampler (see the sampler documentation).
+        """
+        self.model_name = model_name
+        self.param_grid = param_grid
+        self.sampler_params = sampler_params
+        self.n_trials = sampler_params.get('n_trials', DEFAULT_N_TRIALS)
+        self.rnd = np.random.RandomState(sampler_params.get('seed', DEFAULT_SAMPLER_SEED))
+        # the values drawn for each configuration, by hyperparameter path
+        self.draws = []
+        self.scores = []
+
+    def ask(self):
+        """Draw the next configuration.
+
+        Returns
+        -------
+        params : dict
+            The hyperparameters of the model, or None when the budget of configurations is exhausted.
+        """
+        if len(self.draws) >= self.n_trials:
+            return None
+        draws = {}
+
+        def draw(path, space):
+            draws[path] = self._draw(path, space)
+            return draws[path]
+
+        params = self._draw_params(draw)
+        self.draws.append(draws)
+        self.scores.append(None)
+        return params
+
+    def tell(self, trial, score):
+        """Report the score of a configuration.
+
+        Parameters
+        ----------
+        trial : int
+            The index of the configuration, in the order configurations were drawn.
+        score : float
+            The score of the configuration (higher is better), or None if its evaluation failed.
+        """
+        self.scores[trial] = score
+
+    def _draw(self, path, space):
+        """Draw a value of a hyperparameter.
+
+        Parameters
+        ----------
+        path : tuple
+            The path of the hyperparameter in the ``param_grid``.
+        space : list or Uniform
+            The values of the hyperparameter.
+
+        Returns
+        -------
+        value :
+            The drawn value.
+        """
+        msg = 'This function is a placeholder in an abstract class'
+        logger.error(msg)
+        raise NotImplementedError(msg)
+
+    def _draw_params(self, draw):
+        """Build a configuration, with the same structure as :func:`gridsearch_next_hyperparam`.
+
+            The parameters of the loss, of the regularizer and of the model are only drawn if they are
+            supported by the drawn loss, regularizer and model.
+
+        Parameters
+        ----------
+        draw : function
+            Draws the value of a hyperparameter, given its path and its values.
+
+        Returns
+        -------
+        params : dict
+            The hyperparameters of the model.
+        """
+        from ..latent_features import LOSS_REGISTRY, REGULARIZER_REGISTRY, MODEL_REGISTRY
+        params = {'verbose': self.param_grid.get('verbose', False)}
+        for key in SAMPLED_KEYS:
+            params[key] = draw((key,), self.param_grid[key])
+        params['optimizer_params'] = {'lr': draw(('optimizer_params', 'lr'),
+                                                 self.param_grid['optimizer_params']['lr'])}
+        for key, registry, name in [('loss_params', LOSS_REGISTRY, params['loss']),
+                                    ('regularizer_params', REGULARIZER_REGISTRY, params['regularizer']),
+                                    ('embedding_model_params', MODEL_REGISTRY, self.model_name)]:
+            params[key] = {}
+            if name is None:
+                continue
+            for param in registry[name].external_params:
+                if param in self.param_grid.get(key, {}):
+                    params[key][param] = draw((key, param), self.param_grid[key][param])
+
+        seed = self.param_grid.get('seed', -1)
+        if seed >= 0:
+            params['seed'] = seed
+        return params
+
+
+@register_sampler('grid')
+class GridSampler(Sampler):
+    """Exhaustive grid search: every combination of the hyperparameter values, in order.
+
+        This is the default sampler of :func:`select_best_model_ranking`. It does not support continuous ranges
+        and has no parameters: the number of configurations is the size of the grid.
+    """
+
+    def __init__(self, model_name, param_grid, sampler_params={}):
+        from .protocol import gridsearch_next_hyperparam
+        super().__init__(model_name, param_grid, sampler_params)
+        for space in self._spaces():
+            if isinstance(space, Uniform):
+                msg = 'The grid sampler does not support continuous ranges. Use the random or TPE sampler.'
+                logger.error(msg)
+                raise ValueError(msg)
+        self.n_trials = None
+        self.grid = gridsearch_next_hyperparam(model_name, param_grid)
+
+    def _spaces(self):
+        for key, space in self.param_grid.items():
+            if isinstance(space, dict):
+                for nested_space in space.values():
+                    yield nested_space
+            else:
+                yield space
+
+    def ask(self):
+        params = next(self.grid, None)
+        if params is not None:
+            self.scores.append(None)
+        return params
+
+
+@register_sampler('random')
+class RandomSampler(Sampler):
+    """Random search :cite:`bergstra2012random`.
+
+        Each hyperparameter is drawn independently: uniformly among its values if they are a list,
+        from its distribution if it is a continuous range (:class:`Uniform` or :class:`LogUniform`).
+
+        Hyperparameters:
+
+        - **'n_trials'**: (int) The number of configurations to draw (default: 20).
+        - **'seed'**: (int) The seed of the sampler (default: 0).
+    """
+
+    def _draw(self, path, space):
+        return _draw_random(space, self.rnd)
+
+
+@register_sampler('tpe')
+class TPESampler(Sampler):
+    """Tree-structured Parzen Estimator :cite:`bergstra2011algorithms`.
+
+        The first configurations are drawn at random. Then, the scored configurations are split in a good and
+        a bad group, and the value of each hyperparameter is the one which maximises the ratio of its
+        density in the good group to its density in the bad group, among candidates drawn from the good group.
+        Densities are estimated independently for each hyperparameter, with Parzen windows over continuous
+        ranges and smoothed frequencies over lists of values.
+
+        TPE needs the scores of the previous configurations: when trials run in parallel, configurations are
+        drawn by batches of ``n_jobs``.
+
+        Hyperparameters:
+
+        - **'n_trials'**: (int) The number of configurations to draw (default: 20).
+        - **'seed'**: (int) The seed of the sampler (default: 0).
+        - **'n_startup_trials'**: (int) The number of random configurations drawn first (default: 10).
+        - **'gamma'**: (float) The fraction of the scored configurations in the good group (default: 0.25).
+        - **'n_candidates'**: (int) The number of candidate values drawn for each hyperparameter (default: 24).
+    """
+
+    adaptive = True
+
+    def _draw(self, path, space):
+        if not isinstance(space, (list, Uniform)):
+            return space
+
+        # the scored configurations where the hyperparameter was drawn, best first
+        observed = sorted([(-score, i) for i, score in enumerate(self.scores)
+                           if score is not None and path in self.draws[i]])
+        if len(observed) < self.sampler_params.get('n_startup_trials', DEFAULT_TPE_STARTUP_TRIALS):
+            return _draw_random(space, self.rnd)
+
+        n_good = max(1, int(np.ceil(self.sampler_params.get('gamma', DEFAULT_TPE_GAMMA) * len(observed))))
+        values = [self.draws[i][path] for _, i in observed]
+        n_candidates = self.sampler_params.get('n_candidates', DEFAULT_TPE_CANDIDATES)
+
+        if isinstance(space, list):
+            indices = [space.index(value) for value in values]
+            l = _categorical_density(indices[:n_good], len(space))
+            g = _categorical_density(indices[n_good:], len(space))
+            candidates = self.rnd.choice(len(space), n_candidates, p=l)
+            return space[candidates[np.argmax(np.log(l[candidates]) - np.log(g[candidates]))]]
+
+        units = np.array([space.to_unit(value) for value in values])
+        candidates = _sample_parzen(units[:n_good], n_candidates, self.rnd)
+        scores = _log_parzen_density(candidates, units[:n_good]) - _log_parzen_density(candidates, units[n_good:])
+        return space.from_unit(candidates[np.argmax(scores)])
+
+
+def _draw_random(space, rnd):
+    """Draw a hyperparameter value uniformly among a list, from a distribution, or return a constant."""
+    if isinstance(space, Uniform):
+        return space.sample(rnd)
+    if isinstance(space, list):
+        return space[rnd.randint(len(space))]
+    return space
+
+
+def _categorical_density(indices, size):
+    """Frequencies of a list of indices, smoothed with a uniform prior."""
+    return (np.bincount(indices, minlength=size) + 1) / (len(indices) + size)
+
+
+def _parzen_bandwidth(points):
+    """Bandwidth of the Parzen window estimator of a list of points of [0, 1]."""
+    if len(points) < 2:
+        return 0.5
+    return max(1.06 * np.std(points) * len(points) ** -0.2, 0.05)
+
+
+def _sample_parzen(points, size, rnd):
+    """Draw from a Parzen window estimator over [0, 1], mixed with a uniform prior."""
+    component = rnd.randint(len(points) + 1, size=size)
+    centers = np.append(points, 0.5)[component]
+    samples = rnd.normal(centers, _parzen_bandwidth(points))
+    prior = component == len(points)
+    samples[prior] = rnd.uniform(size=np.sum(prior))
+    return np.clip(samples, 0, 1)
+
+
+def _log_parzen_density(x, points):
+    """Log density of a Parzen window estimator over [0, 1], mixed with a uniform prior."""
+    bandwidth = _parzen_bandwidth(points)
+    kernels = np.exp(-0.5 * ((x[:, None] - np.asarray(points)[None, :]) / bandwidth) ** 2) \
+        / (bandwidth * np.sqrt(2 * np.pi))
+    return np.log((np.sum(kernels, axis=1) + 1) / (len(points) + 1))
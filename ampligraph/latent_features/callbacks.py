@@ -0,0 +1,311 @@
+import os
+import glob
+import pickle
+import logging
+
+from ..utils.lazy import tf
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Default number of checkpoints kept on disk
+DEFAULT_MAX_TO_KEEP = 5
+
+
+class Callback(object):
+    """Base class of the callbacks invoked by :meth:`EmbeddingModel.fit`.
+
+    Subclasses override the hooks they need. Each hook receives the model being trained:
+    the training session is still open, so the hooks can query its state (e.g. ``model.sess_train``).
+    Setting ``model.stop_training = True`` from a hook ends the training after the current epoch.
+
+    Example
+    -------
+    >>> import numpy as np
+    >>> from ampligraph.latent_features import TransE, Callback
+    >>> class LossLogger(Callback):
+    >>>     def on_epoch_end(self, model, epoch, logs):
+    >>>         print(epoch, logs['loss'])
+    >>> model = TransE(batches_count=1, seed=555, epochs=5, k=10)
+    >>> X = np.array([['a', 'y', 'b'],
+    >>>               ['b', 'y', 'a'],
+    >>>               ['a', 'y', 'c']])
+    >>> model.fit(X, callbacks=[LossLogger()])
+    """
+
+    def on_train_begin(self, model):
+        """Called before the first training epoch, once the model parameters are initialized.
+
+        Parameters
+        ----------
+        model : EmbeddingModel
+            The model being trained.
+        """
+        pass
+
+    def on_epoch_begin(self, model, epoch):
+        """Called at the beginning of each training epoch.
+
+        Parameters
+        ----------
+        model : EmbeddingModel
+            The model being trained.
+        epoch : int
+            The current epoch (starting from 1).
+        """
+        pass
+
+    def on_epoch_end(self, model, epoch, logs):
+        """Called at the end of each training epoch, after the early stopping check.
+
+        Parameters
+        ----------
+        model : EmbeddingModel
+            The model being trained.
+        epoch : int
+            The current epoch (starting from 1).
+        logs : dict
+            The statistics of the epoch, as recorded by :class:`History`.
+        """
+        pass
+
+    def on_batch_end(self, model, batch, logs):
+        """Called after each session run of the training op.
+
+        Parameters
+        ----------
+        model : EmbeddingModel
+            The model being trained.
+        batch : int
+            Index of the last batch of the epoch processed by the run (starting from 1).
+        logs : dict
+            ``'loss'``: the loss of the run, ``'steps'``: the number of batches processed by the run
+            (more than one with ``steps_per_run``).
+        """
+        pass
+
+    def on_early_stopping_check(self, model, epoch, logs):
+        """Called each time the early stopping criteria is evaluated on the validation set.
+
+        Parameters
+        ----------
+        model : EmbeddingModel
+            The model being trained.
+        epoch : int
+            The current epoch (starting from 1).
+        logs : dict
+            ``'criteria'``: the early stopping criteria, ``'value'``: its current value,
+            ``'best'``: its best value so far, ``'stop_counter'``: the number of consecutive checks without
+            improvement, ``'stop'``: whether the training stops.
+        """
+        pass
+
+
+class History(Callback):
+    """Records the statistics of each training epoch.
+
+    A ``History`` is created by each call of :meth:`EmbeddingModel.fit` and stored in ``model.history``.
+
+    The logs of an epoch hold the following keys:
+
+        - **'epoch'**: the epoch (starting from 1).
+        - **'loss'**: the average loss of the epoch.
+        - **'steps_per_sec'**: the number of training batches processed per second.
+        - **'triples_per_sec'**: the number of training triples (or 1-N queries) processed per second.
+        - **'time_epoch'**: the wall-clock time of the epoch, in seconds.
+        - **'time_session_run'**: the time spent running the training op. Batches are generated in the
+          TensorFlow graph, so this includes the time of the input pipeline.
+        - **'time_normalization'**: the time spent normalizing the entity embeddings after each batch.
+        - **'time_early_stopping'**: the time spent evaluating the early stopping criteria.
+        - **'time_callbacks'**: the time spent in the ``on_epoch_begin`` and ``on_batch_end`` hooks.
+        - **'reject_rate'**, **'unresolved_rate'**: the corruption filtering statistics
+          (only with ``filter_corruptions``).
+
+    Attributes
+    ----------
+    epoch : list
+        The epochs recorded so far.
+    history : dict
+        Maps each log key to the list of its values, one per epoch.
+    early_stopping_checks : list
+        The logs of each early stopping check, with the epoch under the ``'epoch'`` key.
+    """
+
+    def __init__(self):
+        self.epoch = []
+        self.history = {}
+        self.early_stopping_checks = []
+
+    def on_epoch_end(self, model, epoch, logs):
+        self.epoch.append(epoch)
+        for key, value in logs.items():
+            self.history.setdefault(key, []).append(value)
+
+    def on_early_stopping_check(self, model, epoch, logs):
+        check = {'epoch': epoch}
+        check.update(logs)
+        self.early_stopping_checks.append(check)
+
+    def get(self, key):
+        """Return the values of a log key across the recorded epochs.
+
+        Parameters
+        ----------
+        key : str
+            The log key (e.g. ``'triples_per_sec'``).
+
+        Returns
+        -------
+        values : list
+            The value of each epoch.
+        """
+        try:
+            return self.history[key]
+        except KeyError:
+            msg = 'No {} in the training history.'.format(key)
+            logger.error(msg)
+            raise KeyError(msg)
+
+
+class ModelCheckpoint(Callback):
+    """Periodically saves a checkpoint of the training state.
+
+    Each checkpoint holds the model parameters and every other TensorFlow variable of the training graph
+    (e.g. the optimizer slots), along with the epoch, the early stopping state and the training history.
+    Only the ``max_to_keep`` most recent checkpoints are kept on disk.
+
+    A training can be resumed from the latest checkpoint of a directory with
+    ``model.fit(X, resume_from=checkpoint_dir)``: the model must have the same hyperparameters and be trained
+    on the same triples. Batches and corruptions are generated from the model seed and the batch number,
+    so the resumed training processes the same batches as an uninterrupted one.
+
+    Example
+    -------
+    >>> import numpy as np
+    >>> from ampligraph.latent_features import TransE, ModelCheckpoint
+    >>> X = np.array([['a', 'y', 'b'],
+    >>>               ['b', 'y', 'a'],
+    >>>               ['a', 'y', 'c']])
+    >>> model = TransE(batches_count=1, seed=555, epochs=100, k=10)
+    >>> model.fit(X, callbacks=[ModelCheckpoint('checkpoints', interval=10)])
+    >>> # after an interruption
+    >>> model = TransE(batches_count=1, seed=555, epochs=100, k=10)
+    >>> model.fit(X, callbacks=[ModelCheckpoint('checkpoints', interval=10)], resume_from='checkpoints')
+    """
+
+    def __init__(self, checkpoint_dir, interval=1, max_to_keep=DEFAULT_MAX_TO_KEEP):
+        """Initialize the callback.
+
+        Parameters
+        ----------
+        checkpoint_dir : str
+            The directory where the checkpoints are saved.
+        interval : int
+            Save a checkpoint every ``interval`` epochs (default: 1).
+        max_to_keep : int
+            The number of most recent checkpoints kept on disk (default: 5).
+        """
+        if interval < 1 or max_to_keep < 1:
+            msg = 'Checkpoint interval and max_to_keep must be positive, got {} and {}.'.format(interval,
+                                                                                              max_to_keep)
+            logger.error(msg)
+            raise ValueError(msg)
+        self.checkpoint_dir = checkpoint_dir
+        self.interval = interval
+        self.max_to_keep = max_to_keep
+        self.saver = None
+
+    def on_train_begin(self, model):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self.saver = tf.train.Saver(max_to_keep=self.max_to_keep)
+        checkpoint_state = tf.train.get_checkpoint_state(self.checkpoint_dir)
+        if checkpoint_state is not None:
+            # rotate the checkpoints of a previous run too
+            self.saver.recover_last_checkpoints(checkpoint_state.all_model_checkpoint_paths)
+
+    def on_epoch_end(self, model, epoch, logs):
+        if epoch % self.interval != 0:
+            return
+        checkpoint_path = self.saver.save(model.sess_train, os.path.join(self.checkpoint_dir, 'model'),
+                                          global_step=epoch)
+        with open(get_training_state_path(checkpoint_path), 'wb') as f:
+            pickle.dump(model._get_training_state(epoch), f)
+
+        kept = set(get_training_state_path(path) for path in self.saver.last_checkpoints)
+        for path in glob.glob(get_training_state_path(os.path.join(self.checkpoint_dir, 'model-*'))):
+            if path not in kept:
+                os.remove(path)
+        logger.debug('Saved checkpoint {}.'.format(checkpoint_path))
+
+
+class ModelSnapshot(Callback):
+    """Keeps in memory a copy of the model parameters at given epochs.
+
+    The snapshot of an epoch holds the parameters a training stopped at that epoch would end with, so that
+    a single training evaluates several numbers of epochs. If early stopping ends the training before an
+    epoch, that epoch has no snapshot: the final parameters of the model apply.
+
+    Example
+    -------
+    >>> import numpy as np
+    >>> from ampligraph.latent_features import TransE, ModelSnapshot
+    >>> X = np.array([['a', 'y', 'b'],
+    >>>               ['b', 'y', 'a'],
+    >>>               ['a', 'y', 'c']])
+    >>> snapshot = ModelSnapshot([10, 50])
+    >>> model = TransE(batches_count=1, seed=555, epochs=100, k=10)
+    >>> model.fit(X, callbacks=[snapshot])
+    >>> model.trained_model_params = snapshot.snapshots[50]
+    >>> model.predict(X)
+
+    Attributes
+    ----------
+    snapshots : dict
+        Maps each epoch to the parameters of the model at its end, in the format of
+        ``model.trained_model_params``.
+    """
+
+    def __init__(self, epochs):
+        """Initialize the callback.
+
+        Parameters
+        ----------
+        epochs : list
+            The epochs at the end of which the parameters are copied.
+        """
+        self.epochs = set(epochs)
+        self.snapshots = {}
+        self.early_stopped = False
+
+    def on_train_begin(self, model):
+        self.snapshots = {}
+        self.early_stopped = False
+
+    def on_early_stopping_check(self, model, epoch, logs):
+        self.early_stopped = logs['stop']
+
+    def on_epoch_end(self, model, epoch, logs):
+        # the training ends with the parameters saved by early stopping rather than the current ones
+        if epoch not in self.epochs or self.early_stopped:
+            return
+        # do not overwrite the parameters saved by early stopping
+        trained_model_params = model.trained_model_params
+        model._save_trained_params()
+        self.snapshots[epoch] = model.trained_model_params
+        model.trained_model_params = trained_model_params
+
+
+def get_training_state_path(checkpoint_path):
+    """Return the path of the file holding the training state saved along a checkpoint.
+
+    Parameters
+    ----------
+    checkpoint_path : str
+        The checkpoint prefix, as returned by ``tf.train.Saver.save``.
+
+    Returns
+    -------
+    path : str
+        The path of the training state.
+    """
+    return '{}.state.pkl'.format(checkpoint_path)
@@ -1,7 +1,8 @@
-import tensorflow as tf
 import abc
 import logging
 
+from ..utils.lazy import tf
+
 LOSS_REGISTRY = {}
 
 logger = logging.getLogger(__name__)
@@ -1,21 +1,26 @@
 import numpy as np
-import tensorflow as tf
-from sklearn.utils import check_random_state
 import abc
 from tqdm import tqdm
 import logging
+import time
+import os
+import pickle
+
+from .loss_functions import LOSS_REGISTRY
+from .regularizers import REGULARIZER_REGISTRY
+from .callbacks import History, get_training_state_path
+from .pool_functions import POOLING_FUNCTIONS
+from ..evaluation import generate_corruptions_for_fit, to_idx, create_mappings, generate_corruptions_for_eval, \
+    hits_at_n_score, mrr_score, create_positives_index, create_alias_table, compute_corrupt_subj_probs, \
+    generate_shared_corruptions, extend_mappings
+from ..evaluation.protocol import _random_uniform, _random_uniform_int
+from ..utils.lazy import tf, sklearn_utils
 
 MODEL_REGISTRY = {}
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-from .loss_functions import LOSS_REGISTRY
-from .regularizers import REGULARIZER_REGISTRY
-from ..evaluation import generate_corruptions_for_fit, to_idx, create_mappings, generate_corruptions_for_eval, \
-    hits_at_n_score, mrr_score
-import os
-
 #######################################################################################################
 # If not specified, following defaults will be used at respective locations
 
@@ -69,12 +74,18 @@ DEFAULT_EPOCH = 100
 # Default value for batch count
 DEFAULT_BATCH_COUNT = 100
 
+# Default value for batch size (if None, it is derived from the batch count)
+DEFAULT_BATCH_SIZE = None
+
 # Default value for seed
 DEFAULT_SEED = 0
 
 # Default value for optimizer
 DEFAULT_OPTIM = "adam"
 
+# Optimizers which only update the embedding rows looked up in the current batch
+ROW_SPARSE_OPTIMIZERS = ['sgd', 'adagrad', 'momentum', 'lazy_adam']
+
 # Default value for loss type
 DEFAULT_LOSS = "nll"
 
@@ -89,6 +100,54 @@ DEFAULT_PROTOCOL_EVAL = False
 
 # Specifies how to generate corruptions for training - default does s and o together and applies the loss
 DEFAULT_CORRUPT_SIDE_TRAIN = ['s+o']
+
+# Default number of optimizer steps executed by each session call during training
+DEFAULT_STEPS_PER_RUN = 1
+
+# default value which indicates whether to resample the training corruptions which are positive triples
+DEFAULT_FILTER_CORRUPTIONS = False
+
+# Default number of times the training corruptions which are positive triples are resampled
+DEFAULT_FILTER_RESAMPLE_ROUNDS = 3
+
+# Number of runs used to measure the overhead of filtering the training corruptions
+FILTER_OVERHEAD_RUNS = 10
+
+# Default exponent of the entity degrees when sampling the corruptions proportionally to the degrees
+DEFAULT_DEGREE_ALPHA = 0.75
+
+# default value which indicates whether to pick the side to corrupt with per-relation probabilities
+DEFAULT_BERNOULLI_CORRUPTION = False
+
+# Default size of the pool of negative entities shared by the triples of a batch (0: no shared negatives)
+DEFAULT_SHARED_NEGATIVES = 0
+
+# default value which indicates whether to draw the training corruptions from a cache of hard negatives
+DEFAULT_NSCACHING = False
+
+# Default number of negative entities cached for each (s, p) and (p, o) pair
+DEFAULT_CACHE_SIZE = 50
+
+# Default number of random entities scored together with the cached ones when refreshing the cache
+DEFAULT_CACHE_CANDIDATES = 50
+
+# Default interval (in epochs) between the epochs in which the cache is refreshed
+DEFAULT_CACHE_REFRESH_INTERVAL = 1
+
+# default value which indicates whether to train scoring each query against all the entities (1-N)
+DEFAULT_ONE_TO_N = False
+
+# Default number of random entities each query is scored against in 1-N training (0: all the entities)
+DEFAULT_ONE_TO_N_BLOCK = 0
+
+# Losses supported by 1-N training
+ONE_TO_N_LOSSES = ['nll', 'multiclass_nll']
+
+# Default number of training epochs of partial_fit
+DEFAULT_PARTIAL_FIT_EPOCHS = 10
+
+# Default number of old triples replayed by partial_fit, relative to the number of new triples
+DEFAULT_REPLAY_RATIO = 1
 #######################################################################################################
 
 
@@ -103,6 +162,60 @@ def register_model(name, external_params=[], class_params={}):
     return insert_in_registry
 
 
+def create_filter_index(x_filter, num_entities, num_relations):
+    """Build the index used to filter the corruptions generated during evaluation.
+
+        A unique prime number is assigned to each subject entity, object entity and relation. The key of a triple
+        is the product of the primes of its subject, relation and object (see
+        :meth:`EmbeddingModel.set_filter_for_eval`). The index only depends on the internal IDs, so it can be
+        built once and shared by the models trained with the same mappings.
+
+    Parameters
+    ----------
+    x_filter : ndarray, shape [n, 3]
+        The filter triples, converted to internal IDs.
+    num_entities : int
+        The number of distinct entities.
+    num_relations : int
+        The number of distinct relations.
+
+    Returns
+    -------
+    filter_index : dict
+        The primes of the relations (``'relation_primes'``), of the subjects (``'entity_primes_left'``) and
+        of the objects (``'entity_primes_right'``), and the keys of the filter triples (``'filter_keys'``).
+    """
+    first_million_primes_list = []
+    curr_dir, _ = os.path.split(__file__)
+    with open(os.path.join(curr_dir, "prime_number_list.txt"), "r") as f:
+        logger.debug('Reading from prime_number_list.txt.')
+        line = f.readline()
+        for line in f:
+            p_nums_line = line.split(' ')
+            first_million_primes_list.extend([np.int64(x) for x in p_nums_line if x != '' and x != '\n'])
+            if len(first_million_primes_list) > (2 * num_entities + num_relations):
+                break
+    # Assign first to relations - as these are dense - it would reduce the overflows in the product computation
+    relation_primes = np.array(first_million_primes_list[:num_relations], dtype=np.int64)
+    entity_primes_left = np.array(first_million_primes_list[num_relations:(num_entities + num_relations)],
+                                  dtype=np.int64)
+    entity_primes_right = np.array(first_million_primes_list[(num_entities + num_relations):
+                                                             (2 * num_entities + num_relations)], dtype=np.int64)
+    try:
+        x_filter = np.asarray(x_filter, dtype=np.int64).reshape(-1, 3)
+        filter_keys = entity_primes_left[x_filter[:, 0]] * entity_primes_right[x_filter[:, 2]] * \
+            relation_primes[x_filter[:, 1]]
+    except IndexError:
+        msg = 'The graph has too many distinct entities. ' \
+              'Please extend the prime numbers list to have at least {} primes.'.format(2 * num_entities +
+                                                                                        num_relations)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    return {'relation_primes': relation_primes, 'entity_primes_left': entity_primes_left,
+            'entity_primes_right': entity_primes_right, 'filter_keys': filter_keys}
+
+
 class EmbeddingModel(abc.ABC):
     """Abstract class for embedding models
 
@@ -123,7 +236,8 @@ class EmbeddingModel(abc.ABC):
                  loss_params={},
                  regularizer=DEFAULT_REGULARIZER, 
                  regularizer_params={},
-                 verbose=DEFAULT_VERBOSE):
+                 verbose=DEFAULT_VERBOSE,
+                 batch_size=DEFAULT_BATCH_SIZE):
         """Initialize an EmbeddingModel
 
             Also creates a new Tensorflow session for training.
@@ -144,9 +258,44 @@ class EmbeddingModel(abc.ABC):
             Model-specific hyperparams, passed to the model as a dictionary.
             Refer to model-specific documentation for details.
 
+            The following keys are supported by all models:
+
+            - **'steps_per_run'** (int): number of optimizer steps executed by each session call, with an
+              in-graph training loop. Values greater than 1 reduce the Python overhead when training with
+              small batches (default: 1).
+            - **'filter_corruptions'** (bool): flag to resample the training corruptions which are positive
+              triples of the training set (default: False). With ``verbose=True``, the time filtering adds to
+              each batch is measured before training and stored in ``filter_overhead_per_batch``.
+            - **'filter_resample_rounds'** (int): maximum number of times a colliding corruption is
+              resampled (default: 3).
+            - **'shared_negatives'** (int): if greater than 0, the triples of each batch share a pool of
+              ``shared_negatives`` negative entities, and each triple is corrupted with all of them
+              (``eta`` is then ignored). DistMult, ComplEx and HolE score the pool with a single matrix
+              product (default: 0).
+            - **'nscaching'** (bool): draw the training corruptions from caches of hard negatives for each
+              (s, p) and (p, o) pair, refreshed with importance sampling :cite:`zhang2019nscaching`
+              (default: False). The cache memory is set by **'cache_size'** (entities per pair, default: 50),
+              the refresh cost by **'cache_candidates'** (random entities scored with the cached ones at each
+              refresh, default: 50) and **'cache_refresh_interval'** (the cache is refreshed every
+              ``cache_refresh_interval`` epochs, default: 1).
+            - **'one_to_n'** (bool): 1-N training (DistMult, ComplEx and HolE only). Each (s, p) and (p, o)
+              query is scored against all the entities with a single matrix product, and trained with the
+              binary cross-entropy (``loss='nll'``) or softmax (``loss='multiclass_nll'``) of the labels of
+              all the training triples :cite:`DettmersMS018`. ``batches_count`` and ``batch_size`` then refer
+              to queries rather than triples, and ``eta`` is ignored (default: False).
+            - **'one_to_n_block'** (int): with ``one_to_n``, score each query against a block of
+              ``one_to_n_block`` random entities (and the entities of the batch) instead of all the entities
+              (default: 0, i.e. all the entities).
+
         optimizer : string
             The optimizer used to minimize the loss function. Choose between 'sgd',
-            'adagrad', 'adam', 'momentum'.
+            'adagrad', 'adam', 'lazy_adam', 'momentum'.
+
+            'sgd', 'adagrad' and 'momentum' only update the embedding rows looked up in the current batch.
+            'lazy_adam' is the row-sparse variant of 'adam': the moment estimates and the embeddings are
+            updated only for the rows gathered in the current batch, which is much faster on graphs with
+            a large number of distinct entities. Note that a regularizer computed over the whole embedding
+            matrices makes the updates dense again.
         optimizer_params : dict
             Arguments specific to the optimizer, passed as a dictionary.
 
@@ -183,9 +332,13 @@ class EmbeddingModel(abc.ABC):
             documentation for additional details.
 
             Example: ``regularizer_params={'lambda': 1e-5, 'p': 2}`` if ``regularizer='LP'``.
+            Pass ``'batch_local': True`` to only regularize the embeddings looked up in each batch.
 
         verbose : bool
             Verbose mode
+        batch_size : int
+            The number of triples in each batch. If set, it is used instead of ``batches_count``.
+            The last batch of each epoch may be smaller (default: None).
         """
         # Store for restoring later.
         self.all_params = \
@@ -202,8 +355,8 @@ class EmbeddingModel(abc.ABC):
                 'loss_params': loss_params,
                 'regularizer': regularizer,
                 'regularizer_params': regularizer_params,
-                'verbose': verbose
-
+                'verbose': verbose,
+                'batch_size': batch_size
             }
         tf.reset_default_graph()
 
@@ -218,14 +371,48 @@ class EmbeddingModel(abc.ABC):
         self.eta = eta
         self.regularizer_params = regularizer_params
         self.batches_count = batches_count
-        if batches_count == 1:
+        self.batch_size = batch_size
+        if batches_count == 1 and batch_size is None:
             logger.warning(
                 'All triples will be processed in the same batch (batches_count=1). '
                 'When processing large graphs it is recommended to batch the input knowledge graph instead.')
 
 
+        self.shared_negatives = self.embedding_model_params.get('shared_negatives', DEFAULT_SHARED_NEGATIVES)
+        if self.shared_negatives > 0 and self.embedding_model_params.get('filter_corruptions',
+                                                                         DEFAULT_FILTER_CORRUPTIONS):
+            msg = 'Filtered corruptions are not supported with shared negatives.'
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.nscaching = self.embedding_model_params.get('nscaching', DEFAULT_NSCACHING)
+        if self.nscaching and (self.shared_negatives > 0 or
+                               self.embedding_model_params.get('filter_corruptions', DEFAULT_FILTER_CORRUPTIONS)):
+            msg = 'The negatives cache is not supported with shared negatives or filtered corruptions.'
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.one_to_n = self.embedding_model_params.get('one_to_n', DEFAULT_ONE_TO_N)
+        if self.one_to_n:
+            if type(self)._fn_candidates is EmbeddingModel._fn_candidates:
+                msg = '1-N training is only supported by models with a multiplicative scoring function.'
+                logger.error(msg)
+                raise ValueError(msg)
+            if loss not in ONE_TO_N_LOSSES:
+                msg = 'Unsupported loss for 1-N training: {}. Choose between {}.'.format(loss, ONE_TO_N_LOSSES)
+                logger.error(msg)
+                raise ValueError(msg)
+            if self.nscaching or self.shared_negatives > 0 or \
+                    self.embedding_model_params.get('filter_corruptions', DEFAULT_FILTER_CORRUPTIONS):
+                msg = '1-N training does not generate corruptions: ' \
+                      'disable nscaching, shared_negatives and filter_corruptions.'
+                logger.error(msg)
+                raise ValueError(msg)
+
         try:
-            self.loss = LOSS_REGISTRY[loss](self.eta, self.loss_params, verbose=verbose)
+            # with shared negatives each positive is compared to all the entities of the pool
+            loss_eta = self.shared_negatives if self.shared_negatives > 0 else self.eta
+            self.loss = LOSS_REGISTRY[loss](loss_eta, self.loss_params, verbose=verbose)
         except KeyError:
             msg = 'Unsupported loss function: {}'.format(loss)
             logger.error(msg)
@@ -252,6 +439,9 @@ class EmbeddingModel(abc.ABC):
             self.optimizer = tf.train.AdagradOptimizer(learning_rate=self.optimizer_params.get('lr', DEFAULT_LR))
         elif optimizer == "adam":
             self.optimizer = tf.train.AdamOptimizer(learning_rate=self.optimizer_params.get('lr', DEFAULT_LR))
+        elif optimizer == "lazy_adam":
+            self.optimizer = tf.contrib.opt.LazyAdamOptimizer(learning_rate=self.optimizer_params.get('lr',
+                                                                                                     DEFAULT_LR))
         elif optimizer == "sgd":
             self.optimizer = tf.train.GradientDescentOptimizer(
                 learning_rate=self.optimizer_params.get('lr', DEFAULT_LR))
@@ -265,17 +455,22 @@ class EmbeddingModel(abc.ABC):
             logger.error(msg)
             raise ValueError(msg)
 
+        self.optimizer_name = optimizer
         self.verbose = verbose
 
-        self.rnd = check_random_state(self.seed)
+        self.rnd = sklearn_utils.check_random_state(self.seed)
 
         self.initializer = tf.contrib.layers.xavier_initializer(uniform=False, seed=self.seed)
         self.tf_config = tf.ConfigProto(allow_soft_placement=True)
         self.tf_config.gpu_options.allow_growth = True
         self.sess_train = None
         self.sess_predict = None
+        self.sess_shards_predict = None
         self.trained_model_params = []
         self.is_fitted = False
+        self.history = None
+        self.optimizer_state = {}
+        self.warm_start = False
         self.eval_config = {}
 
     @abc.abstractmethod
@@ -340,8 +535,57 @@ class EmbeddingModel(abc.ABC):
             It's the duty of the embedding model to load the variables correctly.
             This method must be overridden if the model has any other parameters (apart from entity-relation embeddings)
         """
-        self.ent_emb = tf.constant(self.trained_model_params[0])
-        self.rel_emb = tf.constant(self.trained_model_params[1])
+        self.ent_emb = tf.constant(np.asarray(self.trained_model_params[0]))
+        self.rel_emb = tf.constant(np.asarray(self.trained_model_params[1]))
+
+    def _predict_from_shards(self, X):
+        """Score triples reading only the embeddings of their entities.
+
+            Used when the entity embeddings of a restored model are sharded (see :meth:`ampligraph.utils.save_model`):
+            the scores are computed in a separate graph, built on the first call, which is fed the embeddings of
+            the entities of ``X`` only.
+
+        Parameters
+        ----------
+        X : ndarray, shape [n, 3] or [3]
+            The triples to score, as internal IDs.
+
+        Returns
+        -------
+        scores : list or float
+            The scores of the triples (a single score if ``X`` is a single triple).
+        """
+        x = np.atleast_2d(X).astype(np.int32)
+        entities, local_idx = np.unique(x[:, [0, 2]], return_inverse=True)
+        local_idx = local_idx.reshape((-1, 2))
+        x_local = np.column_stack([local_idx[:, 0], x[:, 1], local_idx[:, 1]]).astype(np.int32)
+
+        ent_emb = self.trained_model_params[0][entities]
+        rel_emb = np.asarray(self.trained_model_params[1])
+
+        if self.sess_shards_predict is None:
+            # _lookup_embeddings reads the embeddings from ent_emb and rel_emb: swap in the placeholders
+            ent_emb_tf, rel_emb_tf = getattr(self, 'ent_emb', None), getattr(self, 'rel_emb', None)
+            graph = tf.Graph()
+            try:
+                with graph.as_default():
+                    self.ent_emb = tf.placeholder(ent_emb.dtype, [None] + list(ent_emb.shape[1:]))
+                    self.rel_emb = tf.placeholder(rel_emb.dtype, [None] + list(rel_emb.shape[1:]))
+                    self.X_shards_tf = tf.placeholder(tf.int32, [None, 3])
+                    self.shards_emb_tf = (self.ent_emb, self.rel_emb)
+                    self.score_shards = tf.reshape(self._fn(*self._lookup_embeddings(self.X_shards_tf)), [-1])
+            finally:
+                self.ent_emb, self.rel_emb = ent_emb_tf, rel_emb_tf
+            self.sess_shards_predict = tf.Session(graph=graph, config=self.tf_config)
+
+        scores = self.sess_shards_predict.run(self.score_shards,
+                                              feed_dict={self.X_shards_tf: x_local,
+                                                         self.shards_emb_tf[0]: ent_emb,
+                                                         self.shards_emb_tf[1]: rel_emb})
+
+        if X.ndim > 1:
+            return list(scores)
+        return scores[0]
 
     def get_embeddings(self, entities, embedding_type='entity'):
         """Get the embeddings of entities or relations.
@@ -413,29 +657,32 @@ class EmbeddingModel(abc.ABC):
         self.rel_emb = tf.get_variable('rel_emb', shape=[len(self.rel_to_idx), self.k],
                                        initializer=self.initializer)
         
-    def _get_model_loss(self, dataset_iterator):
-        """ Get the current loss including loss due to regularization.
-            This function must be overridden if the model uses combination of different losses(eg: VAE) 
-            
+    def _generate_corruptions(self, x_pos, seed, positives_index=None):
+        """Generate the corruptions of a batch of positive triples, for each side in ``corrupt_sides``.
+
         Parameters
         ----------
-        dataset_iterator : tf.data.Iterator
-            Dataset iterator
-            
+        x_pos : tf.Tensor, shape [n, 3]
+            The positive triples of the batch.
+        seed : tf.Tensor, shape [2]
+            The seed of the stateless random ops: the model seed and the batch number.
+        positives_index : dict
+            Index of the training triples. If set, corruptions which are training triples are resampled.
+
         Returns
         -------
-        loss : tf.Tensor
-            The loss value that must be minimized.    
+        corruptions : dict
+            The corruptions of the batch for each corruption side (``'x_neg'``). If ``positives_index`` is set,
+            also the number of resampled (``'rejected'``) and of remaining colliding (``'unresolved'``) corruptions.
+            With shared negatives, the pool of negative entities (``'neg_pool'``) and the side to corrupt
+            (``'corrupt_subj'``) for each corruption side instead.
         """
-        # training input placeholder
-        x_pos_tf = tf.cast(dataset_iterator.get_next(), tf.int32)
-        
         entities_size = 0
         entities_list = None
-        
+
         negative_corruption_entities = self.embedding_model_params.get('negative_corruption_entities',
                                                                        DEFAULT_CORRUPTION_ENTITIES)
-        
+
         if negative_corruption_entities=='all':
             logger.debug('Using all entities for generation of corruptions during training')
             entities_size = len(self.ent_to_idx)
@@ -448,38 +695,855 @@ class EmbeddingModel(abc.ABC):
         elif isinstance(negative_corruption_entities, int):
             logger.debug('Using first {} entities for generation of corruptions during training'.format(negative_corruption_entities))
             entities_size = negative_corruption_entities
+        elif negative_corruption_entities=='degree' or isinstance(negative_corruption_entities, dict):
+            logger.debug('Using all entities, sampled with the supplied weights, for generation of corruptions '
+                         'during training')
+            entities_size = len(self.ent_to_idx)
 
-        if self.loss.get_state('require_same_size_pos_neg'):
-            logger.debug('Requires the same size of postive and negative')
-            x_pos = tf.reshape(tf.tile(tf.reshape(x_pos_tf, [-1]), [self.eta]), [tf.shape(x_pos_tf)[0] * self.eta, 3])
-        else:
-            x_pos = x_pos_tf
-        # look up embeddings from input training triples
-        e_s_pos, e_p_pos, e_o_pos = self._lookup_embeddings(x_pos)
-        scores_pos = self._fn(e_s_pos, e_p_pos, e_o_pos)
-        
-        loss = 0
-        
+        corruption_sides = self._get_corruption_sides()
+
+        if self.shared_negatives > 0:
+            pools = []
+            corrupt_subj = []
+            for i, side in enumerate(corruption_sides):
+                side_seed = tf.stack([seed[0], seed[1] * len(corruption_sides) + i])
+                side_pool, side_corrupt_subj = generate_shared_corruptions(x_pos,
+                                                                           self.shared_negatives,
+                                                                           entities_list=entities_list,
+                                                                           corrupt_side=side,
+                                                                           entities_size=entities_size,
+                                                                           rnd=side_seed,
+                                                                           alias_table=self.corruption_alias_table,
+                                                                           corrupt_subj_probs=self.corrupt_subj_probs)
+                pools.append(side_pool)
+                corrupt_subj.append(side_corrupt_subj)
+            return {'neg_pool': tuple(pools), 'corrupt_subj': tuple(corrupt_subj)}
+
+        resample_rounds = self.embedding_model_params.get('filter_resample_rounds', DEFAULT_FILTER_RESAMPLE_ROUNDS)
+
+        x_neg = []
+        rejected = 0
+        unresolved = 0
+        for i, side in enumerate(corruption_sides):
+            # each side gets its own stateless seed
+            side_seed = tf.stack([seed[0], seed[1] * len(corruption_sides) + i])
+            out = generate_corruptions_for_fit(x_pos,
+                                               entities_list=entities_list,
+                                               eta=self.eta,
+                                               corrupt_side=side,
+                                               entities_size=entities_size,
+                                               rnd=side_seed,
+                                               positives_index=positives_index,
+                                               resample_rounds=resample_rounds,
+                                               alias_table=self.corruption_alias_table,
+                                               corrupt_subj_probs=self.corrupt_subj_probs)
+            if positives_index is not None:
+                out, side_rejected, side_unresolved = out
+                rejected += side_rejected
+                unresolved += side_unresolved
+            x_neg.append(out)
+
+        if positives_index is not None:
+            return {'x_neg': tuple(x_neg), 'rejected': rejected, 'unresolved': unresolved}
+        return {'x_neg': tuple(x_neg)}
+
+    def _get_corruption_sides(self):
+        """Get the list of sides to corrupt during training, from ``corrupt_sides``.
+        """
         corruption_sides = self.embedding_model_params.get('corrupt_sides', DEFAULT_CORRUPT_SIDE_TRAIN)
         if not isinstance(corruption_sides, list):
             corruption_sides = [corruption_sides]
+        return corruption_sides
+
+    def _get_corruption_alias_table(self, X):
+        """Build the alias table used to sample the entities of the training corruptions.
+
+        Parameters
+        ----------
+        X : ndarray, shape [n, 3]
+            The training triples (internal IDs).
+
+        Returns
+        -------
+        alias_table : tuple
+            The alias table over all the entities, or None if entities are sampled uniformly.
+        """
+        negative_corruption_entities = self.embedding_model_params.get('negative_corruption_entities',
+                                                                       DEFAULT_CORRUPTION_ENTITIES)
+        if isinstance(negative_corruption_entities, str) and negative_corruption_entities == 'degree':
+            alpha = self.embedding_model_params.get('degree_alpha', DEFAULT_DEGREE_ALPHA)
+            degrees = np.bincount(np.concatenate([X[:, 0], X[:, 2]]), minlength=len(self.ent_to_idx))
+            return create_alias_table(np.power(degrees, alpha))
+        elif isinstance(negative_corruption_entities, dict):
+            weights = np.zeros(len(self.ent_to_idx))
+            for entity, weight in negative_corruption_entities.items():
+                if entity not in self.ent_to_idx:
+                    msg = 'Entity {} of negative_corruption_entities is not in the training set.'.format(entity)
+                    logger.error(msg)
+                    raise ValueError(msg)
+                weights[self.ent_to_idx[entity]] = weight
+            return create_alias_table(weights)
+        return None
+
+    def _get_training_dataset(self, X, batch_size, initial_batch=0):
+        """Build the input pipeline used for training.
+
+            The indices of the training triples are reshuffled at the beginning of each epoch and split in
+            batches of ``batch_size`` triples, so that each epoch processes every triple exactly once.
+            Triples are gathered and corrupted in a parallel map stage, and batches are prefetched while the
+            previous ones are being processed.
+
+            Corruptions are generated with stateless random ops, seeded with the model seed and the batch
+            number: training is reproducible regardless of the order in which batches are prepared.
+            When resuming a training, the batches already processed are skipped before the map stage:
+            the shuffled indices of the skipped epochs are recomputed, but not their corruptions.
+
+        Parameters
+        ----------
+        X : ndarray, shape [n, 3]
+            The training triples (internal IDs).
+        batch_size : int
+            The number of triples in each batch.
+        initial_batch : int
+            The number of batches already processed (default: 0).
+
+        Returns
+        -------
+        dataset : tf.data.Dataset
+            An infinite dataset of batches: dictionaries with the positive triples (``'x_pos'``) and the
+            output of :meth:`_generate_corruptions`.
+        """
+        X_tf = tf.constant(X, dtype=tf.int32)
+
+        if self.one_to_n:
+            corrupt_subj_tf = tf.constant(self.one_to_n_corrupt_subj)
+            offsets_tf = tf.constant(self.one_to_n_offsets, dtype=tf.int64)
+            targets_tf = tf.constant(self.one_to_n_targets, dtype=tf.int32)
+        if self.nscaching:
+            cache_idx_tf = {side: tf.constant(cache_idx, dtype=tf.int32)
+                            for side, cache_idx in self.cache_idx.items()}
+
+        def prepare_batch(batch_number, idx):
+            x_pos = tf.gather(X_tf, idx)
+            if self.one_to_n:
+                # the targets of the queries of the batch, as (row, entity) pairs of the labels
+                starts = tf.gather(offsets_tf, idx)
+                mask = tf.sequence_mask(tf.gather(offsets_tf, idx + 1) - starts)
+                positions = tf.expand_dims(starts, 1) + tf.range(tf.shape(mask, out_type=tf.int64)[1])
+                batch = {'corrupt_subj': tf.gather(corrupt_subj_tf, idx),
+                         'target_rows': tf.cast(tf.where(mask)[:, 0], tf.int32),
+                         'targets': tf.gather(targets_tf, tf.boolean_mask(positions, mask)),
+                         'seed': tf.stack([tf.constant(self.seed, dtype=tf.int64), batch_number])}
+            elif self.nscaching:
+                # corruptions are drawn from the cache, by the rows of the (s, p) and (p, o) pairs of the batch
+                batch = {'cache_idx': {side: tf.gather(cache_idx, idx) for side, cache_idx in cache_idx_tf.items()},
+                         'seed': tf.stack([tf.constant(self.seed, dtype=tf.int64), batch_number])}
+            else:
+                seed = tf.stack([tf.constant(self.seed, dtype=tf.int64), batch_number])
+                batch = self._generate_corruptions(x_pos, seed, self.positives_index)
+            batch['x_pos'] = x_pos
+            return batch
+
+        batches = tf.data.Dataset.range(X.shape[0]) \
+            .shuffle(X.shape[0], seed=self.seed, reshuffle_each_iteration=True) \
+            .batch(batch_size) \
+            .repeat() \
+            .skip(initial_batch)
+        batch_numbers = tf.data.Dataset.range(initial_batch, np.iinfo(np.int64).max)
+        return tf.data.Dataset.zip((batch_numbers, batches)) \
+            .map(prepare_batch, num_parallel_calls=tf.data.experimental.AUTOTUNE) \
+            .prefetch(tf.data.experimental.AUTOTUNE)
+
+    def _measure_filter_overhead(self, x_pos):
+        """Measure the time spent filtering the corruptions of a batch.
+
+            The corruptions of a sample batch are generated with and without filtering
+            ``FILTER_OVERHEAD_RUNS`` times, and the difference of the average times is returned.
+
+        Parameters
+        ----------
+        x_pos : ndarray, shape [n, 3]
+            A sample batch of training triples (internal IDs).
+
+        Returns
+        -------
+        overhead : float
+            The time spent filtering the corruptions of a batch, in seconds.
+        """
+        x_pos_tf = tf.constant(x_pos, dtype=tf.int32)
+        seed = tf.constant([self.seed, 0], dtype=tf.int64)
+        times = []
+        for positives_index in [None, self.positives_index]:
+            corruptions_op = self._generate_corruptions(x_pos_tf, seed, positives_index)['x_neg']
+            # warm up
+            self.sess_train.run(corruptions_op)
+            start_time = time.time()
+            for _ in range(FILTER_OVERHEAD_RUNS):
+                self.sess_train.run(corruptions_op)
+            times.append((time.time() - start_time) / FILTER_OVERHEAD_RUNS)
+        return max(times[1] - times[0], 0.0)
+
+    def _fn_candidates(self, e_s, e_p, e_o, e_cand, corrupt_subj):
+        """Score a list of triples with their subject or object replaced by each candidate entity.
+
+            This generic implementation evaluates ``_fn`` on every (triple, candidate) pair.
+            Models whose scoring function is multiplicative override it with a single matrix product.
+
+        Parameters
+        ----------
+        e_s : Tensor, shape [n, k]
+            The embeddings of a list of subjects.
+        e_p : Tensor, shape [n, k]
+            The embeddings of a list of predicates.
+        e_o : Tensor, shape [n, k]
+            The embeddings of a list of objects.
+        e_cand : Tensor, shape [m, k]
+            The embeddings of the candidate entities.
+        corrupt_subj : bool
+            If True, candidates replace the subjects, otherwise they replace the objects.
+
+        Returns
+        -------
+        scores : Tensor, shape [n, m]
+            The scores of the triples, for each candidate.
+        """
+        n = tf.shape(e_s)[0]
+        m = tf.shape(e_cand)[0]
+        tiled_shape = [n * m, tf.shape(e_cand)[1]]
+        e_p = tf.reshape(tf.tile(tf.expand_dims(e_p, 1), [1, m, 1]), tiled_shape)
+        e_cand = tf.reshape(tf.tile(tf.expand_dims(e_cand, 0), [n, 1, 1]), tiled_shape)
+        if corrupt_subj:
+            e_o = tf.reshape(tf.tile(tf.expand_dims(e_o, 1), [1, m, 1]), tiled_shape)
+            scores = self._fn(e_cand, e_p, e_o)
+        else:
+            e_s = tf.reshape(tf.tile(tf.expand_dims(e_s, 1), [1, m, 1]), tiled_shape)
+            scores = self._fn(e_s, e_p, e_cand)
+        return tf.reshape(scores, [n, m])
+
+    def _fn_inverse(self, e_p, e_known, unseen_subj):
+        """Estimate the embedding of the unknown entity of a list of triples, by inverting the scoring function.
+
+            The estimate is the embedding which maximises the score of the triple, given the embeddings of
+            the predicate and of the known entity (up to a scaling factor, for multiplicative models).
+
+        Parameters
+        ----------
+        e_p : Tensor, shape [n, k]
+            The embeddings of a list of predicates.
+        e_known : Tensor, shape [n, k]
+            The embeddings of the known entities.
+        unseen_subj : bool or Tensor, shape [n]
+            True if the unknown entity is the subject, False if it is the object.
+
+        Returns
+        -------
+        e_unseen : Tensor, shape [n, k]
+            The estimated embeddings of the unknown entities.
+        """
+        msg = '{} does not support the estimation of unseen entity embeddings.'.format(self.__class__.__name__)
+        logger.error(msg)
+        raise NotImplementedError(msg)
+
+    def estimate_embeddings(self, entities, X, pooling='avg', add_to_model=False):
+        """Estimate the embeddings of entities unseen during training, from their known neighbourhood.
+
+            Each triple of ``X`` which links an unseen entity to a known entity through a known relation
+            gives an estimate of the embedding of the unseen entity, obtained by inverting the scoring
+            function of the model. The estimates of each entity are then aggregated with a pooling function
+            (see :mod:`ampligraph.latent_features.pool_functions`), as in :cite:`Hamaguchi2017`.
+            No retraining is needed: the estimates of all the entities are computed at once.
+
+        Parameters
+        ----------
+        entities : array-like, shape [m]
+            The unseen entities.
+        X : ndarray, shape [n, 3]
+            The triples linking the unseen entities to the entities seen during training.
+            Triples with an unknown relation or with two unknown entities are ignored.
+        pooling : string
+            The pooling function: 'sum', 'avg' (default) or 'max'.
+        add_to_model : bool
+            If True, the unseen entities are added to the model with the estimated embeddings,
+            so that triples including them can be scored by :meth:`predict` (default: False).
+
+        Returns
+        -------
+        embeddings : ndarray, shape [m, k]
+            The estimated embeddings of the unseen entities.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from ampligraph.latent_features import TransE
+        >>> model = TransE(batches_count=1, seed=555, epochs=20, k=10)
+        >>> X = np.array([['a', 'y', 'b'],
+        >>>               ['b', 'y', 'a'],
+        >>>               ['a', 'y', 'c']])
+        >>> model.fit(X)
+        >>> model.estimate_embeddings(['d'], np.array([['d', 'y', 'a'], ['c', 'y', 'd']]), add_to_model=True)
+        >>> model.predict(np.array([['d', 'y', 'b']]))
+        """
+        if not self.is_fitted:
+            msg = 'Model has not been fitted.'
+            logger.error(msg)
+            raise RuntimeError(msg)
+
+        if pooling not in POOLING_FUNCTIONS:
+            msg = 'Unsupported pooling function {}. Choose one of {}.'.format(pooling, list(POOLING_FUNCTIONS))
+            logger.error(msg)
+            raise ValueError(msg)
+
+        entities = np.asarray(entities)
+        if any(ent in self.ent_to_idx for ent in entities):
+            msg = 'Some of the entities were seen during training.'
+            logger.error(msg)
+            raise ValueError(msg)
+        unseen_to_idx = dict(zip(entities, range(len(entities))))
+
+        # keep the triples which link an unseen entity to a known entity through a known relation
+        unseen_s = np.array([s in unseen_to_idx for s in X[:, 0]], dtype=bool)
+        unseen_o = np.array([o in unseen_to_idx for o in X[:, 2]], dtype=bool)
+        known_s = np.array([s in self.ent_to_idx for s in X[:, 0]], dtype=bool)
+        known_o = np.array([o in self.ent_to_idx for o in X[:, 2]], dtype=bool)
+        known_p = np.array([p in self.rel_to_idx for p in X[:, 1]], dtype=bool)
+        valid = known_p & ((unseen_s & known_o) | (unseen_o & known_s))
+        X = X[valid]
+        unseen_subj = unseen_s[valid]
+        logger.debug('Estimating {} embeddings from {} triples.'.format(len(entities), len(X)))
+
+        unseen_idx = np.array([unseen_to_idx[ent] for ent in np.where(unseen_subj, X[:, 0], X[:, 2])],
+                              dtype=np.int64)
+        known_idx = np.array([self.ent_to_idx[ent] for ent in np.where(unseen_subj, X[:, 2], X[:, 0])],
+                             dtype=np.int64)
+        rel_idx = np.array([self.rel_to_idx[rel] for rel in X[:, 1]], dtype=np.int64)
+
+        counts = np.bincount(unseen_idx, minlength=len(entities))
+        if np.any(counts == 0):
+            msg = 'No triple links {} to the known entities.'.format(entities[counts == 0].tolist())
+            logger.error(msg)
+            raise ValueError(msg)
+
+        # position of each triple among the neighbours of its unseen entity, to build a padded
+        # [m, max_neighbours, k] tensor
+        order = np.argsort(unseen_idx, kind='stable')
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        with tf.Graph().as_default():
+            ent_emb = tf.constant(self.trained_model_params[0])
+            rel_emb = tf.constant(self.trained_model_params[1])
+            estimates = self._fn_inverse(tf.nn.embedding_lookup(rel_emb, rel_idx),
+                                         tf.nn.embedding_lookup(ent_emb, known_idx),
+                                         tf.constant(unseen_subj))
+            padded_shape = [len(entities), counts.max()]
+            indices = np.stack([unseen_idx, position], axis=1)
+            neighbours = tf.scatter_nd(indices, estimates, padded_shape + [self.trained_model_params[0].shape[1]])
+            mask = tf.scatter_nd(indices, tf.ones(len(X), dtype=tf.bool), padded_shape)
+            pooled = POOLING_FUNCTIONS[pooling](neighbours, mask)
+            with tf.Session(config=self.tf_config) as sess:
+                embeddings = sess.run(pooled)
+
+        if add_to_model:
+            self.ent_to_idx = dict(self.ent_to_idx)
+            self.ent_to_idx.update(zip(entities, range(len(self.ent_to_idx), len(self.ent_to_idx) + len(entities))))
+            self.trained_model_params[0] = np.concatenate([self.trained_model_params[0], embeddings])
+            # the prediction graph is rebuilt with the new embeddings
+            if self.sess_predict is not None:
+                self.sess_predict.close()
+                self.sess_predict = None
+
+        return embeddings
+
+    def _get_shared_negatives_loss(self, batch):
+        """Get the loss of a batch whose triples share a pool of negative entities.
+
+            Each positive triple is corrupted with every entity of the pool, on the side given by
+            ``corrupt_subj``: ``shared_negatives`` corruptions per positive, but only ``shared_negatives``
+            entity embeddings to look up for the whole batch.
+
+        Parameters
+        ----------
+        batch : dict
+            The positive triples and the pools of negative entities of the batch.
+
+        Returns
+        -------
+        loss : tf.Tensor
+            The loss of the batch (without regularization).
+        batch_ent : list
+            The indices of the entities looked up in the batch.
+        """
+        x_pos_tf = batch['x_pos']
+        e_s_pos, e_p_pos, e_o_pos = self._lookup_embeddings(x_pos_tf)
+        scores_pos = self._fn(e_s_pos, e_p_pos, e_o_pos)
+        if self.loss.get_state('require_same_size_pos_neg'):
+            scores_pos = tf.tile(scores_pos, [self.shared_negatives])
+
+        loss = 0
+        batch_ent = [x_pos_tf[:, 0], x_pos_tf[:, 2]]
+        for side, pool, corrupt_subj in zip(self._get_corruption_sides(), batch['neg_pool'], batch['corrupt_subj']):
+            batch_ent.append(pool)
+            e_pool = tf.nn.embedding_lookup(self.ent_emb, pool)
+            if side == 's':
+                scores_neg = self._fn_candidates(e_s_pos, e_p_pos, e_o_pos, e_pool, True)
+            elif side == 'o':
+                scores_neg = self._fn_candidates(e_s_pos, e_p_pos, e_o_pos, e_pool, False)
+            else:
+                scores_neg = tf.where(corrupt_subj,
+                                      self._fn_candidates(e_s_pos, e_p_pos, e_o_pos, e_pool, True),
+                                      self._fn_candidates(e_s_pos, e_p_pos, e_o_pos, e_pool, False))
+            # losses expect the corruptions of each positive at [index + i * n for i in range(eta)]
+            loss += self.loss.apply(scores_pos, tf.reshape(tf.transpose(scores_neg), [-1]))
+
+        return loss, batch_ent
+
+    def _initialize_negative_cache(self, X):
+        """Create the caches of hard negative entities, as described in :cite:`zhang2019nscaching`.
+
+            Corruptions of the subjects are drawn from a cache of ``cache_size`` entities for each (p, o) pair
+            of the training set, and corruptions of the objects from a cache for each (s, p) pair.
+            Caches are initialized with random entities, and only the caches needed by ``corrupt_sides``
+            are created.
+
+        Parameters
+        ----------
+        X : ndarray, shape [n, 3]
+            The training triples (internal IDs).
+        """
+        cache_size = self.embedding_model_params.get('cache_size', DEFAULT_CACHE_SIZE)
+        corruption_sides = self._get_corruption_sides()
+
+        self.cache_idx = {}
+        self.negative_cache = {}
+        for side, pair_columns in [('s', [1, 2]), ('o', [0, 1])]:
+            if side not in corruption_sides and 's+o' not in corruption_sides:
+                continue
+            # row of the cache of each training triple
+            pairs, self.cache_idx[side] = np.unique(X[:, pair_columns], axis=0, return_inverse=True)
+            self.negative_cache[side] = tf.get_variable('negative_cache_{}'.format(side),
+                                                        shape=[len(pairs), cache_size],
+                                                        dtype=tf.int32,
+                                                        initializer=tf.random_uniform_initializer(
+                                                            0, len(self.ent_to_idx), seed=self.seed,
+                                                            dtype=tf.int32),
+                                                        trainable=False)
+        self.cache_refresh_tf = tf.placeholder_with_default(True, shape=[])
+
+    def _sample_cache(self, side, cache_idx, seed, offset):
+        """Draw ``eta`` entities uniformly from the cache rows of a batch.
+
+        Parameters
+        ----------
+        side : string
+            The cache to sample: 's' for the subjects cache, 'o' for the objects cache.
+        cache_idx : tf.Tensor, shape [n]
+            The cache rows of the triples of the batch.
+        seed : tf.Tensor, shape [2]
+            The seed of the stateless random ops: the model seed and the batch number.
+        offset : int
+            Offset used to derive the stateless seed of this draw from ``seed``.
+
+        Returns
+        -------
+        entities : tf.Tensor, shape [n * eta]
+            The sampled entities, with the ones of each triple at [index + i * n for i in range(eta)].
+        """
+        cache_rows = tf.gather(self.negative_cache[side], cache_idx)
+        n = tf.shape(cache_rows)[0]
+        cache_size = tf.shape(cache_rows)[1]
+        columns = _random_uniform_int([self.eta, n], cache_size, seed, offset)
+        return tf.gather(tf.reshape(cache_rows, [-1]), tf.reshape(tf.range(n) * cache_size + columns, [-1]))
+
+    def _get_cached_corruptions(self, batch):
+        """Draw the corruptions of a batch from the caches of hard negatives.
+
+        Parameters
+        ----------
+        batch : dict
+            The positive triples, the cache rows and the seed of the batch.
+
+        Returns
+        -------
+        x_neg : list of tf.Tensor, shape [n * eta, 3]
+            The corruptions of the batch, for each corruption side.
+        """
+        x_pos = batch['x_pos']
+        n = tf.shape(x_pos)[0]
+        x_pos_tiled = tf.tile(x_pos, [self.eta, 1])
+
+        x_neg = []
+        for i, side in enumerate(self._get_corruption_sides()):
+            # each side makes up to 3 draws, each with its own stateless seed
+            if side == 's+o':
+                if self.corrupt_subj_probs is not None:
+                    subj_probs = tf.gather(tf.constant(self.corrupt_subj_probs, dtype=tf.float64), x_pos[:, 1])
+                else:
+                    subj_probs = 0.5
+                corrupt_subj = tf.tile(_random_uniform([n], batch['seed'], 3 * i) < subj_probs, [self.eta])
+            else:
+                corrupt_subj = tf.fill([n * self.eta], side == 's')
+
+            subjects = x_pos_tiled[:, 0]
+            objects = x_pos_tiled[:, 2]
+            if side in ['s', 's+o']:
+                subjects = tf.where(corrupt_subj,
+                                    self._sample_cache('s', batch['cache_idx']['s'], batch['seed'], 3 * i + 1),
+                                    subjects)
+            if side in ['o', 's+o']:
+                objects = tf.where(corrupt_subj,
+                                   objects,
+                                   self._sample_cache('o', batch['cache_idx']['o'], batch['seed'], 3 * i + 2))
+            x_neg.append(tf.stack([subjects, x_pos_tiled[:, 1], objects], axis=1))
+        return x_neg
+
+    def _refresh_negative_cache(self, batch):
+        """Refresh the cache rows of a batch.
+
+            The entities of each row are scored together with ``cache_candidates`` random entities, and
+            ``cache_size`` of them are sampled without replacement with probabilities proportional to the
+            exponential of their scores (i.e. with the Gumbel top-k trick), so that hard negatives are kept
+            in the cache while still exploring other entities.
+            A row shared by several triples of the batch is refreshed once, from its first triple.
+
+        Parameters
+        ----------
+        batch : dict
+            The positive triples, the cache rows and the seed of the batch.
+
+        Returns
+        -------
+        refreshed : tf.Tensor
+            A boolean tensor, which is evaluated once the cache rows are updated.
+        """
+        cache_candidates = self.embedding_model_params.get('cache_candidates', DEFAULT_CACHE_CANDIDATES)
+        # the draws of the refresh follow the ones of _get_cached_corruptions
+        offset = 3 * len(self._get_corruption_sides())
+
+        update_ops = []
+        for j, (side, cache) in enumerate(sorted(self.negative_cache.items())):
+            # scatter_update is undefined for duplicate indices: keep the first triple of each cache row
+            cache_idx, segments = tf.unique(batch['cache_idx'][side])
+            n = tf.shape(cache_idx)[0]
+            first = tf.unsorted_segment_min(tf.range(tf.shape(segments)[0]), segments, n)
+            x_pos = tf.gather(batch['x_pos'], first)
+
+            cache_size = cache.get_shape().as_list()[1]
+            candidates = tf.concat([tf.gather(cache, cache_idx),
+                                    _random_uniform_int([n, cache_candidates], len(self.ent_to_idx),
+                                                        batch['seed'], offset + 2 * j)], axis=1)
+            m = cache_size + cache_candidates
+            x = tf.reshape(tf.tile(tf.expand_dims(x_pos, 1), [1, m, 1]), [-1, 3])
+            if side == 's':
+                x = tf.stack([tf.reshape(candidates, [-1]), x[:, 1], x[:, 2]], axis=1)
+            else:
+                x = tf.stack([x[:, 0], x[:, 1], tf.reshape(candidates, [-1])], axis=1)
+            e_s, e_p, e_o = self._lookup_embeddings(x)
+            scores = tf.reshape(self._fn(e_s, e_p, e_o), [n, m])
+
+            uniform = tf.maximum(_random_uniform([n, m], batch['seed'], offset + 2 * j + 1), 1e-10)
+            gumbel = tf.cast(-tf.log(-tf.log(uniform)), tf.float32)
+            _, sampled = tf.nn.top_k(scores + gumbel, k=cache_size)
+            new_rows = tf.gather(tf.reshape(candidates, [-1]), tf.expand_dims(tf.range(n) * m, 1) + sampled)
+            update_ops.append(tf.scatter_update(cache, cache_idx, new_rows))
+
+        with tf.control_dependencies(update_ops):
+            return tf.constant(True)
+
+    def _get_one_to_n_queries(self, X):
+        """Get the queries used for 1-N training.
+
+            Each distinct (s, p) pair is a query to predict the objects, and each distinct (p, o) pair is
+            a query to predict the subjects (depending on ``corrupt_sides``).
+            The targets of the queries (i.e. the entities which complete them into training triples) are
+            returned in compressed sparse row format: the targets of query ``i`` are
+            ``targets[offsets[i]:offsets[i + 1]]``.
+
+        Parameters
+        ----------
+        X : ndarray, shape [n, 3]
+            The training triples (internal IDs).
+
+        Returns
+        -------
+        queries : ndarray, shape [m, 3]
+            A training triple for each query.
+        corrupt_subj : ndarray, shape [m]
+            True for the queries on the subjects, False for the queries on the objects.
+        offsets : ndarray, shape [m + 1]
+            The offsets of the targets of each query.
+        targets : ndarray
+            The targets of all the queries.
+        """
+        corruption_sides = self._get_corruption_sides()
+        X_unique = np.unique(X, axis=0)
+        queries = []
+        corrupt_subj = []
+        counts = []
+        targets = []
+        for side, pair_columns, target_column in [('s', [1, 2], 0), ('o', [0, 1], 2)]:
+            if side not in corruption_sides and 's+o' not in corruption_sides:
+                continue
+            _, first_triples = np.unique(X[:, pair_columns], axis=0, return_index=True)
+            queries.append(X[first_triples])
+            corrupt_subj.append(np.full(len(first_triples), side == 's'))
+            # X and X_unique have the same pairs, so the queries are in the same (sorted) order
+            _, query_idx = np.unique(X_unique[:, pair_columns], axis=0, return_inverse=True)
+            query_idx = query_idx.reshape(-1)
+            counts.append(np.bincount(query_idx, minlength=len(first_triples)))
+            targets.append(X_unique[np.argsort(query_idx, kind='stable'), target_column])
+        offsets = np.concatenate([[0], np.cumsum(np.concatenate(counts))])
+        return np.concatenate(queries), np.concatenate(corrupt_subj), offsets, np.concatenate(targets)
+
+    def _get_one_to_n_loss(self, batch):
+        """Get the 1-N loss of a batch of queries.
+
+            Each query is scored against all the entities (or against a block of ``one_to_n_block`` random
+            entities, plus the entities of the batch triples) with a single matrix product. The targets of the
+            queries among the scored entities are labelled as positives, and the loss is either the binary
+            cross-entropy of the labels (``loss='nll'``) or the cross-entropy of the softmax of the scores
+            with the normalized labels (``loss='multiclass_nll'``) :cite:`DettmersMS018`.
+
+        Parameters
+        ----------
+        batch : dict
+            The queries of the batch (as training triples), the side to predict, the targets of the queries
+            and the seed of the batch.
+
+        Returns
+        -------
+        loss : tf.Tensor
+            The loss of the batch (without regularization).
+        batch_ent : list
+            The indices of the entities looked up in the batch.
+        """
+        x = batch['x_pos']
+        corrupt_subj = batch['corrupt_subj']
+        e_s, e_p, e_o = self._lookup_embeddings(x)
+
+        block = self.embedding_model_params.get('one_to_n_block', DEFAULT_ONE_TO_N_BLOCK)
+        if block > 0:
+            candidates, _ = tf.unique(tf.concat([tf.where(corrupt_subj, x[:, 0], x[:, 2]),
+                                                 _random_uniform_int([block], len(self.ent_to_idx),
+                                                                     batch['seed'])], 0))
+            e_cand = tf.nn.embedding_lookup(self.ent_emb, candidates)
+            batch_ent = [x[:, 0], x[:, 2], candidates]
+            # the column of each entity (or -1 if the entity is not a candidate)
+            columns = tf.scatter_nd(tf.expand_dims(candidates, 1), tf.range(1, tf.shape(candidates)[0] + 1),
+                                    [len(self.ent_to_idx)]) - 1
+            target_columns = tf.gather(columns, batch['targets'])
+            scored = target_columns >= 0
+            target_rows = tf.boolean_mask(batch['target_rows'], scored)
+            target_columns = tf.boolean_mask(target_columns, scored)
+        else:
+            candidates = tf.range(len(self.ent_to_idx))
+            e_cand = self.ent_emb
+            batch_ent = [candidates]
+            target_rows = batch['target_rows']
+            target_columns = batch['targets']
+
+        corruption_sides = self._get_corruption_sides()
+        if 's+o' in corruption_sides or ('s' in corruption_sides and 'o' in corruption_sides):
+            scores = tf.where(corrupt_subj,
+                              self._fn_candidates(e_s, e_p, e_o, e_cand, True),
+                              self._fn_candidates(e_s, e_p, e_o, e_cand, False))
+        else:
+            scores = self._fn_candidates(e_s, e_p, e_o, e_cand, 's' in corruption_sides)
+
+        # label the targets of the queries among the scored entities
+        labels = tf.scatter_nd(tf.stack([target_rows, target_columns], axis=1),
+                               tf.ones_like(target_rows, dtype=tf.float32),
+                               tf.stack([tf.shape(x)[0], tf.shape(candidates)[0]]))
+
+        if self.loss.name == 'nll':
+            loss = tf.reduce_sum(tf.nn.sigmoid_cross_entropy_with_logits(labels=labels, logits=scores))
+        else:
+            loss = tf.reduce_sum(tf.nn.softmax_cross_entropy_with_logits_v2(
+                labels=labels / tf.reduce_sum(labels, axis=1, keepdims=True), logits=scores))
+        return loss, batch_ent
+
+    def _get_model_loss(self, batch):
+        """ Get the current loss including loss due to regularization.
+            This function must be overridden if the model uses combination of different losses(eg: VAE) 
             
-        for side in corruption_sides:
-            x_neg_tf = generate_corruptions_for_fit(x_pos_tf, 
-                                                    entities_list=entities_list, 
-                                                    eta=self.eta, 
-                                                    corrupt_side=side, 
-                                                    entities_size=entities_size, 
-                                                    rnd=self.seed)
-            e_s_neg, e_p_neg, e_o_neg = self._lookup_embeddings(x_neg_tf)
-            scores_neg = self._fn(e_s_neg, e_p_neg, e_o_neg)
-            loss += self.loss.apply(scores_pos, scores_neg)
+        Parameters
+        ----------
+        batch : dict
+            The training batch, as returned by the dataset iterator: the positive triples (``'x_pos'``)
+            and their corruptions, or what is needed to generate them.
+            
+        Returns
+        -------
+        loss : tf.Tensor
+            The loss value that must be minimized.    
+        """
+        # training input: positive triples and their corruptions
+        x_pos_tf = batch['x_pos']
+
+        if self.one_to_n:
+            loss, batch_ent = self._get_one_to_n_loss(batch)
+        elif self.shared_negatives > 0:
+            loss, batch_ent = self._get_shared_negatives_loss(batch)
+        else:
+            if self.loss.get_state('require_same_size_pos_neg'):
+                logger.debug('Requires the same size of postive and negative')
+                x_pos = tf.reshape(tf.tile(tf.reshape(x_pos_tf, [-1]), [self.eta]),
+                                   [tf.shape(x_pos_tf)[0] * self.eta, 3])
+            else:
+                x_pos = x_pos_tf
+            # look up embeddings from input training triples
+            e_s_pos, e_p_pos, e_o_pos = self._lookup_embeddings(x_pos)
+            scores_pos = self._fn(e_s_pos, e_p_pos, e_o_pos)
+
+            loss = 0
+
+            if self.nscaching:
+                x_neg = self._get_cached_corruptions(batch)
+            else:
+                x_neg = batch['x_neg']
+
+            batch_ent = [x_pos_tf[:, 0], x_pos_tf[:, 2]]
+            for x_neg_tf in x_neg:
+                batch_ent.extend([x_neg_tf[:, 0], x_neg_tf[:, 2]])
+                e_s_neg, e_p_neg, e_o_neg = self._lookup_embeddings(x_neg_tf)
+                scores_neg = self._fn(e_s_neg, e_p_neg, e_o_neg)
+                loss += self.loss.apply(scores_pos, scores_neg)
+
+        if 'rejected' in batch:
+            # keep track of the corruptions which collided with training triples
+            update_filter_stats = [tf.assign_add(self.filter_stats_tf['sampled'],
+                                                 tf.cast(tf.shape(x_pos_tf)[0] * len(batch['x_neg']) * self.eta,
+                                                         tf.int64)),
+                                   tf.assign_add(self.filter_stats_tf['rejected'],
+                                                 tf.cast(batch['rejected'], tf.int64)),
+                                   tf.assign_add(self.filter_stats_tf['unresolved'],
+                                                 tf.cast(batch['unresolved'], tf.int64))]
+            with tf.control_dependencies(update_filter_stats):
+                loss = tf.identity(loss)
+
+        # entities whose embeddings are looked up (and therefore updated) in this batch
+        self.batch_ent_idx, _ = tf.unique(tf.concat(batch_ent, 0))
             
         if self.regularizer is not None:
-            loss += self.regularizer.apply([self.ent_emb, self.rel_emb])
+            if self.regularizer.is_batch_local():
+                # only penalize the embeddings looked up in this batch, so that the gradients stay row-sparse
+                batch_rel_idx, _ = tf.unique(x_pos_tf[:, 1])
+                loss += self.regularizer.apply([tf.nn.embedding_lookup(self.ent_emb, self.batch_ent_idx),
+                                                tf.nn.embedding_lookup(self.rel_emb, batch_rel_idx)])
+            else:
+                loss += self.regularizer.apply([self.ent_emb, self.rel_emb])
             
         return loss
         
+    def _has_row_sparse_updates(self):
+        """Check whether a training step only changes the entity embeddings looked up in the batch.
+
+        Returns
+        -------
+        row_sparse : bool
+            True if the optimizer performs row-sparse updates and no whole-matrix regularization term is used.
+        """
+        return self.optimizer_name in ROW_SPARSE_OPTIMIZERS and \
+            (self.regularizer is None or self.regularizer.is_batch_local())
+
+    def _normalize_batch_entities(self, train):
+        """Fuse the normalization of the entity embeddings updated in a batch into the training step.
+
+            Only the rows in ``batch_ent_idx`` are clipped to unit norm, with a scatter update that runs after
+            the optimizer step. If the optimizer only changes the rows looked up in the batch, this gives
+            the same result as clipping the whole entity embeddings matrix.
+
+        Parameters
+        ----------
+        train : tf.Operation
+            The optimizer step.
+
+        Returns
+        -------
+        train : tf.Operation
+            The optimizer step followed by the normalization of the batch entity embeddings.
+        """
+        with tf.control_dependencies([train]):
+            # read_value() makes sure the embeddings are read after the optimizer update
+            ent_emb_batch = tf.gather(self.ent_emb.read_value(), self.batch_ent_idx)
+            normalize_batch_op = tf.scatter_update(self.ent_emb, self.batch_ent_idx,
+                                                   tf.clip_by_norm(ent_emb_batch, clip_norm=1, axes=1))
+        return tf.group(train, normalize_batch_op)
+
+    def _get_train_op(self, dataset_iterator, normalize_ent_emb, normalize_batch_only):
+        """Get the loss and the training step for a single batch.
+
+        Parameters
+        ----------
+        dataset_iterator : tf.data.Iterator
+            Dataset iterator
+        normalize_ent_emb : bool
+            Flag to normalize the entity embeddings as part of the training step.
+        normalize_batch_only : bool
+            Flag to only normalize the entity embeddings updated in the batch.
+
+        Returns
+        -------
+        loss : tf.Tensor
+            The loss of the batch.
+        train : tf.Operation
+            The optimizer step, followed by the normalization of the entity embeddings (if required).
+        """
+        batch = dataset_iterator.get_next()
+        loss = self._get_model_loss(batch)
+        train = self.optimizer.minimize(loss)
+
+        if self.nscaching:
+            with tf.control_dependencies([train]):
+                refresh = tf.cond(self.cache_refresh_tf,
+                                  lambda: self._refresh_negative_cache(batch),
+                                  lambda: tf.constant(False))
+            train = tf.group(train, refresh)
+
+        if normalize_batch_only:
+            train = self._normalize_batch_entities(train)
+        elif normalize_ent_emb:
+            with tf.control_dependencies([train]):
+                ent_emb = self.ent_emb.read_value()
+                train = tf.group(self.ent_emb.assign(tf.clip_by_norm(ent_emb, clip_norm=1, axes=1)))
+        return loss, train
+
+    def _get_multi_step_train_op(self, dataset_iterator, normalize_ent_emb, normalize_batch_only):
+        """Run several training steps in a single session call, with an in-graph loop.
+
+            The number of steps is fed through the ``train_steps_tf`` placeholder.
+            Losses are summed on the device, and the check for NaN or infinite losses is done in-graph,
+            so that only two scalars are fetched at the end of the loop.
+
+        Parameters
+        ----------
+        dataset_iterator : tf.data.Iterator
+            Dataset iterator
+        normalize_ent_emb : bool
+            Flag to normalize the entity embeddings after each step.
+        normalize_batch_only : bool
+            Flag to only normalize the entity embeddings updated in each step.
+
+        Returns
+        -------
+        loss : tf.Tensor
+            The sum of the losses of the batches processed in the loop.
+        is_finite : tf.Tensor
+            False if the loss of any batch processed in the loop is NaN or infinite.
+        """
+        self.train_steps_tf = tf.placeholder(tf.int32, shape=[])
+
+        def train_step(step, loss_sum, is_finite):
+            loss, train = self._get_train_op(dataset_iterator, normalize_ent_emb, normalize_batch_only)
+            with tf.control_dependencies([train]):
+                return step + 1, loss_sum + loss, tf.logical_and(is_finite, tf.is_finite(loss))
+
+        _, loss, is_finite = tf.while_loop(lambda step, loss_sum, is_finite: step < self.train_steps_tf,
+                                           train_step,
+                                           [tf.constant(0), tf.constant(0.0), tf.constant(True)],
+                                           parallel_iterations=1,
+                                           back_prop=False)
+        return loss, is_finite
+
     def _initialize_early_stopping(self):
         """ Initializes and creates evaluation graph for early stopping
         """
@@ -494,7 +1558,8 @@ class EmbeddingModel(abc.ABC):
                 msg = 'Invalid size for input x_valid. Expected (n,3):  got {}'.format(np.shape(self.x_valid))
                 logger.error(msg)
                 raise ValueError(msg)
-            self.x_valid = to_idx(self.x_valid, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
+            if not self.from_idx:
+                self.x_valid = to_idx(self.x_valid, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
 
         except KeyError:
             msg = 'x_valid must be passed for early fitting.'
@@ -527,7 +1592,8 @@ class EmbeddingModel(abc.ABC):
         self.early_stopping_stop_counter = 0
         try:
             x_filter = self.early_stopping_params['x_filter']
-            x_filter = to_idx(x_filter, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
+            if not self.from_idx:
+                x_filter = to_idx(x_filter, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
             self.set_filter_for_eval(x_filter)
         except KeyError:
             logger.debug('x_filter not found in early_stopping_params.')
@@ -565,6 +1631,7 @@ class EmbeddingModel(abc.ABC):
             elif self.early_stopping_criteria == 'mrr':
                 current_test_value = mrr_score(ranks)
 
+            stop = False
             if self.early_stopping_best_value >= current_test_value:
                 self.early_stopping_stop_counter += 1
                 if self.early_stopping_stop_counter == self.early_stopping_params.get('stop_interval',
@@ -580,12 +1647,21 @@ class EmbeddingModel(abc.ABC):
                         logger.info(msg)
                         msg = 'Best {}: {:10f}'.format(self.early_stopping_criteria, self.early_stopping_best_value)
                         logger.info(msg)
-                    return True
+                    stop = True
             else:
                 self.early_stopping_best_value = current_test_value
                 self.early_stopping_stop_counter = 0
                 self._save_trained_params()
 
+            for callback in self.callbacks:
+                callback.on_early_stopping_check(self, epoch, {'criteria': self.early_stopping_criteria,
+                                                               'value': current_test_value,
+                                                               'best': self.early_stopping_best_value,
+                                                               'stop_counter': self.early_stopping_stop_counter,
+                                                               'stop': stop})
+            if stop:
+                return True
+
             if self.verbose:
                 msg = 'Current best:{}'.format(self.early_stopping_best_value)
                 logger.debug(msg)
@@ -594,20 +1670,167 @@ class EmbeddingModel(abc.ABC):
 
         return False
     
+    def _load_warm_start_params(self):
+        """Initialize the training graph with the parameters and the optimizer state of the previous training.
+
+            Rows of the entities and relations seen by the previous training are restored,
+            while the rows of the new ones keep their initial values.
+        """
+        values = dict(zip([self.ent_emb.op.name, self.rel_emb.op.name], self.trained_model_params))
+        values.update(self.optimizer_state)
+        for var in [self.ent_emb, self.rel_emb] + self.optimizer.variables():
+            if var.op.name not in values:
+                continue
+            value = values[var.op.name]
+            if np.ndim(value) > 0:
+                initial_value = self.sess_train.run(var)
+                initial_value[:value.shape[0]] = value
+                value = initial_value
+            var.load(value, self.sess_train)
+
+    def partial_fit(self, X, X_replay=None, replay_ratio=DEFAULT_REPLAY_RATIO, epochs=DEFAULT_PARTIAL_FIT_EPOCHS,
+                    early_stopping=False, early_stopping_params={}, callbacks=[]):
+        """Continue the training of a fitted model on new triples.
+
+            The mappings of the model are extended with the entities and relations of ``X`` that were not seen
+            by the previous training. Their embeddings are initialized from scratch, while the embeddings and
+            the optimizer state of the others are kept.
+
+            The model is trained for a few epochs on the new triples along with a random sample of
+            ``X_replay``, so that the embeddings do not drift away from the triples of the previous trainings.
+            If the model is not fitted yet, this is equivalent to :meth:`fit`.
+
+        Parameters
+        ----------
+        X : ndarray, shape [n, 3]
+            The new training triples.
+        X_replay : ndarray, shape [m, 3]
+            Old training triples to replay (default: ``None``, do not replay).
+        replay_ratio : float
+            The number of old triples sampled from ``X_replay``, relative to the number of new triples
+            (default: 1). If ``None``, all of ``X_replay`` is used.
+        epochs : int
+            The number of training epochs (default: 10).
+        early_stopping: bool
+            Flag to enable early stopping (default:``False``)
+        early_stopping_params: dictionary
+            Dictionary of hyperparameters for the early stopping heuristics (see :meth:`fit`).
+        callbacks: list
+            List of :class:`ampligraph.latent_features.Callback` invoked during training (default: ``[]``).
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from ampligraph.latent_features import TransE
+        >>> model = TransE(batches_count=1, seed=555, epochs=20, k=10)
+        >>> X = np.array([['a', 'y', 'b'],
+        >>>               ['b', 'y', 'a'],
+        >>>               ['a', 'y', 'c']])
+        >>> model.fit(X)
+        >>> model.partial_fit(np.array([['c', 'y', 'd'], ['d', 'z', 'a']]), X_replay=X)
+        """
+        if X_replay is not None and len(X_replay) > 0:
+            if replay_ratio is None:
+                replayed = X_replay
+            else:
+                replay_size = min(len(X_replay), int(np.ceil(replay_ratio * len(X))))
+                replayed = X_replay[self.rnd.choice(len(X_replay), replay_size, replace=False)]
+            X = np.concatenate([X, replayed])
+
+        if not self.is_fitted:
+            logger.debug('The model is not fitted: training from scratch.')
+            self.fit(X, early_stopping, early_stopping_params, callbacks)
+            return
+
+        self.warm_start = True
+        self.warm_start_epochs = epochs
+        try:
+            self.fit(X, early_stopping, early_stopping_params, callbacks)
+        finally:
+            self.warm_start = False
+
+    def _get_training_state(self, epoch):
+        """Return the state saved along a training checkpoint, besides the TensorFlow variables.
+
+        Parameters
+        ----------
+        epoch : int
+            The last completed epoch.
+
+        Returns
+        -------
+        state : dict
+            The training state.
+        """
+        return {'epoch': epoch,
+                'num_triples': self.num_training_triples,
+                'batch_size': self.training_batch_size,
+                'ent_to_idx': self.ent_to_idx,
+                'rel_to_idx': self.rel_to_idx,
+                'early_stopping_best_value': getattr(self, 'early_stopping_best_value', None),
+                'early_stopping_stop_counter': getattr(self, 'early_stopping_stop_counter', None),
+                'trained_model_params': self.trained_model_params,
+                'filter_stats': self.filter_stats,
+                'history': self.history}
+
+    def _load_training_state(self, resume_from, num_triples, batch_size):
+        """Load the state of the latest checkpoint saved in a directory.
+
+        Parameters
+        ----------
+        resume_from : str
+            The checkpoint directory.
+        num_triples : int
+            The number of training triples (or 1-N queries) of the current training.
+        batch_size : int
+            The batch size of the current training.
+
+        Returns
+        -------
+        checkpoint_path : str
+            The prefix of the latest checkpoint.
+        state : dict
+            The training state saved along the checkpoint.
+        """
+        checkpoint_path = tf.train.latest_checkpoint(resume_from)
+        if checkpoint_path is None:
+            msg = 'No checkpoint found in {}.'.format(resume_from)
+            logger.error(msg)
+            raise ValueError(msg)
+
+        with open(get_training_state_path(checkpoint_path), 'rb') as f:
+            state = pickle.load(f)
+
+        if state['ent_to_idx'] != self.ent_to_idx or state['rel_to_idx'] != self.rel_to_idx \
+                or state['num_triples'] != num_triples or state['batch_size'] != batch_size:
+            msg = 'The checkpoint {} was saved by a training on a different graph or with a different ' \
+                  'batch size.'.format(checkpoint_path)
+            logger.error(msg)
+            raise ValueError(msg)
+
+        logger.debug('Resuming the training from {} (epoch {}).'.format(checkpoint_path, state['epoch']))
+        return checkpoint_path, state
+
     def _end_training(self):
         """Perform clean up tasks after training.
         """
         # Reset this variable as it is reused during evaluation phase
         self.is_filtered = False
         self.eval_config = {}
-        
+
+        # keep the optimizer state to warm start a later partial_fit
+        optimizer_variables = self.optimizer.variables()
+        self.optimizer_state = dict(zip([var.op.name for var in optimizer_variables],
+                                        self.sess_train.run(optimizer_variables)))
+
         # close the tf session
         self.sess_train.close()
         
         # set is_fitted to true to indicate that the model fitting is completed
         self.is_fitted = True
         
-    def fit(self, X, early_stopping=False, early_stopping_params={}):
+    def fit(self, X, early_stopping=False, early_stopping_params={}, callbacks=[], resume_from=None,
+            from_idx=False):
         """Train an EmbeddingModel (with optional early stopping).
 
             The model is trained on a training set X using the training protocol
@@ -637,6 +1860,17 @@ class EmbeddingModel(abc.ABC):
                 - **'corrupt_side'**: Specifies which side to corrupt. 's', 'o', 's+o' (default)
 
                 Example: ``early_stopping_params={x_valid=X['valid'], 'criteria': 'mrr'}``
+        callbacks: list
+            List of :class:`ampligraph.latent_features.Callback` invoked during training (default: ``[]``).
+            The statistics of each epoch are recorded in ``model.history``
+            (a :class:`ampligraph.latent_features.History`).
+        resume_from: string
+            Resume the training from the latest checkpoint saved in this directory by a
+            :class:`ampligraph.latent_features.ModelCheckpoint` callback (default: ``None``).
+        from_idx: bool
+            If ``True``, ``X`` (and ``x_valid``, ``x_filter`` in ``early_stopping_params``) are already
+            converted to the internal IDs of ``model.ent_to_idx`` and ``model.rel_to_idx``, which must be set
+            beforehand (default: ``False``).
 
         """
         if type(X) != np.ndarray:
@@ -649,10 +1883,22 @@ class EmbeddingModel(abc.ABC):
             logger.error(msg)
             raise ValueError(msg)
 
-        # create internal IDs mappings
-        self.rel_to_idx, self.ent_to_idx = create_mappings(X)
-        #  convert training set into internal IDs
-        X = to_idx(X, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
+        epochs = self.warm_start_epochs if self.warm_start else self.epochs
+        self.from_idx = from_idx
+        if from_idx:
+            if getattr(self, 'ent_to_idx', None) is None or getattr(self, 'rel_to_idx', None) is None:
+                msg = 'The mappings ent_to_idx and rel_to_idx must be set to fit a model on internal IDs.'
+                logger.error(msg)
+                raise ValueError(msg)
+        else:
+            # create internal IDs mappings
+            if self.warm_start:
+                # keep the IDs of the entities and relations seen by the previous training
+                self.rel_to_idx, self.ent_to_idx = extend_mappings(X, self.rel_to_idx, self.ent_to_idx)
+            else:
+                self.rel_to_idx, self.ent_to_idx = create_mappings(X)
+            #  convert training set into internal IDs
+            X = to_idx(X, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
         
         if len(self.ent_to_idx) > ENTITY_WARN_THRESHOLD:
             logger.warning('Your graph has a large number of distinct entities. '
@@ -669,25 +1915,81 @@ class EmbeddingModel(abc.ABC):
 
         self.sess_train = tf.Session(config=self.tf_config)
 
-        batch_size = X.shape[0] // self.batches_count
-        dataset = tf.data.Dataset.from_tensor_slices(X).repeat().batch(batch_size).prefetch(2)
-        dataset_iterator = dataset.make_one_shot_iterator()
+        self.positives_index = None
+        X_train = X
+        if self.one_to_n:
+            logger.debug('Training with 1-N scoring.')
+            # batches are made of queries rather than triples
+            X_train, self.one_to_n_corrupt_subj, self.one_to_n_offsets, self.one_to_n_targets = \
+                self._get_one_to_n_queries(X)
+
+        if self.batch_size is not None:
+            batch_size = self.batch_size
+        else:
+            batch_size = int(np.ceil(X_train.shape[0] / self.batches_count))
+        # the last batch of each epoch holds the remainder
+        batches_count = int(np.ceil(X_train.shape[0] / batch_size))
+
+        filter_corruptions = self.embedding_model_params.get('filter_corruptions', DEFAULT_FILTER_CORRUPTIONS)
+        if filter_corruptions:
+            logger.debug('Resampling the training corruptions which are positive triples.')
+            self.positives_index = create_positives_index(X, len(self.ent_to_idx), len(self.rel_to_idx))
+            self.filter_stats_tf = {key: tf.Variable(0, dtype=tf.int64, trainable=False)
+                                    for key in ['sampled', 'rejected', 'unresolved']}
+            reset_filter_stats_op = tf.group(*[var.assign(0) for var in self.filter_stats_tf.values()])
+
+        self.corruption_alias_table = self._get_corruption_alias_table(X)
+
+        self.corrupt_subj_probs = None
+        if self.embedding_model_params.get('bernoulli', DEFAULT_BERNOULLI_CORRUPTION):
+            logger.debug('Using per-relation probabilities to pick the side to corrupt.')
+            self.corrupt_subj_probs = compute_corrupt_subj_probs(X, len(self.rel_to_idx))
+
+        if self.nscaching:
+            logger.debug('Drawing the training corruptions from a cache of hard negatives.')
+            self._initialize_negative_cache(X)
+
+        self.num_training_triples = X_train.shape[0]
+        self.training_batch_size = batch_size
+        initial_epoch = 0
+        if resume_from is not None:
+            checkpoint_path, training_state = self._load_training_state(resume_from, X_train.shape[0], batch_size)
+            initial_epoch = training_state['epoch']
+
+        dataset_iterator = self._get_training_dataset(X_train, batch_size,
+                                                      initial_epoch * batches_count).make_one_shot_iterator()
         # init tf graph/dataflow for training
         # init variables (model parameters to be learned - i.e. the embeddings)
         self._initialize_parameters()
 
-        if self.loss.get_state('require_same_size_pos_neg'):
-            batch_size = batch_size * self.eta
-            
-        loss = self._get_model_loss(dataset_iterator)
-            
-        train = self.optimizer.minimize(loss)
+        triples_per_epoch = X_train.shape[0]
+        if self.loss.get_state('require_same_size_pos_neg') and not self.one_to_n:
+            triples_per_epoch = triples_per_epoch * self.eta
 
         # Entity embeddings normalization
+        normalize_ent_emb = self.embedding_model_params.get('normalize_ent_emb', DEFAULT_NORMALIZE_EMBEDDINGS)
+
+        # If only the batch rows change at each step, normalize them as part of the training step
+        # instead of clipping the whole matrix after each batch.
+        normalize_batch_only = normalize_ent_emb and self._has_row_sparse_updates()
+        if normalize_batch_only:
+            logger.debug('Normalizing the entity embeddings updated in each batch.')
+
+        steps_per_run = self.embedding_model_params.get('steps_per_run', DEFAULT_STEPS_PER_RUN)
+        if steps_per_run > 1:
+            logger.debug('Running {} training steps per session call.'.format(steps_per_run))
+            loss, is_finite = self._get_multi_step_train_op(dataset_iterator, normalize_ent_emb, normalize_batch_only)
+        else:
+            loss, train = self._get_train_op(dataset_iterator, False, normalize_batch_only)
+
         normalize_ent_emb_op = self.ent_emb.assign(tf.clip_by_norm(self.ent_emb, clip_norm=1, axes=1))
 
         self.early_stopping_params = early_stopping_params
 
+        self.history = History() if resume_from is None else training_state['history']
+        self.callbacks = [self.history] + list(callbacks)
+        self.stop_training = False
+
         # early stopping
         if early_stopping:
             self._initialize_early_stopping()
@@ -695,42 +1997,130 @@ class EmbeddingModel(abc.ABC):
         self.sess_train.run(tf.tables_initializer())
         self.sess_train.run(tf.global_variables_initializer())
 
-        # X_batches = np.array_split(X, self.batches_count)
+        if self.warm_start:
+            self._load_warm_start_params()
 
         normalize_rel_emb_op = self.rel_emb.assign(tf.clip_by_norm(self.rel_emb, clip_norm=1, axes=1))
 
-        if self.embedding_model_params.get('normalize_ent_emb', DEFAULT_NORMALIZE_EMBEDDINGS):
+        if normalize_ent_emb:
             self.sess_train.run(normalize_rel_emb_op)
             self.sess_train.run(normalize_ent_emb_op)
 
-        epoch_iterator_with_progress = tqdm(range(1, self.epochs + 1), disable=(not self.verbose), unit='epoch')
-        for epoch in epoch_iterator_with_progress:
-            losses = []
-            for batch in range(1, self.batches_count + 1):
-                loss_batch, _ = self.sess_train.run([loss, train])
+        self.filter_stats = []
+        if resume_from is not None:
+            # restore the embeddings, the optimizer slots and any other variable of the training graph
+            tf.train.Saver().restore(self.sess_train, checkpoint_path)
+            self.trained_model_params = training_state['trained_model_params']
+            self.filter_stats = training_state['filter_stats']
+            if early_stopping:
+                self.early_stopping_best_value = training_state['early_stopping_best_value']
+                self.early_stopping_stop_counter = training_state['early_stopping_stop_counter']
 
-                if np.isnan(loss_batch) or np.isinf(loss_batch):
-                    msg = 'Loss is {}. Please change the hyperparameters.'.format(loss_batch)
-                    logger.error(msg)
-                    raise ValueError(msg)
+        self.filter_overhead_per_batch = None
+        if filter_corruptions and self.verbose:
+            # the benchmark adds session runs before training: only pay for it when the result is reported
+            self.filter_overhead_per_batch = self._measure_filter_overhead(X[:batch_size])
+            logger.info('Filtering the corruptions adds {:.2f} ms per batch.'.format(
+                1000 * self.filter_overhead_per_batch))
+
+        for callback in self.callbacks:
+            callback.on_train_begin(self)
 
-                losses.append(loss_batch)
-                if self.embedding_model_params.get('normalize_ent_emb', DEFAULT_NORMALIZE_EMBEDDINGS):
-                    self.sess_train.run(normalize_ent_emb_op)
+        epoch_iterator_with_progress = tqdm(range(initial_epoch + 1, epochs + 1), disable=(not self.verbose),
+                                            unit='epoch')
+        for epoch in epoch_iterator_with_progress:
+            losses = []
+            timers = {'session_run': 0, 'normalization': 0, 'early_stopping': 0, 'callbacks': 0}
+            epoch_start_time = time.time()
+            for callback in self.callbacks:
+                callback.on_epoch_begin(self, epoch)
+            timers['callbacks'] += time.time() - epoch_start_time
+            feed_dict = {}
+            if self.nscaching:
+                # the cache is only refreshed every cache_refresh_interval epochs
+                feed_dict[self.cache_refresh_tf] = (epoch - 1) % self.embedding_model_params.get(
+                    'cache_refresh_interval', DEFAULT_CACHE_REFRESH_INTERVAL) == 0
+            if steps_per_run > 1:
+                for first_batch in range(0, batches_count, steps_per_run):
+                    feed_dict[self.train_steps_tf] = min(steps_per_run, batches_count - first_batch)
+                    start_time = time.time()
+                    loss_run, loss_is_finite = self.sess_train.run([loss, is_finite], feed_dict=feed_dict)
+                    timers['session_run'] += time.time() - start_time
+
+                    if not loss_is_finite:
+                        msg = 'Loss is NaN or infinite. Please change the hyperparameters.'
+                        logger.error(msg)
+                        raise ValueError(msg)
+
+                    losses.append(loss_run)
+                    start_time = time.time()
+                    for callback in self.callbacks:
+                        callback.on_batch_end(self, first_batch + feed_dict[self.train_steps_tf],
+                                              {'loss': loss_run, 'steps': feed_dict[self.train_steps_tf]})
+                    timers['callbacks'] += time.time() - start_time
+            else:
+                for batch in range(1, batches_count + 1):
+                    start_time = time.time()
+                    loss_batch, _ = self.sess_train.run([loss, train], feed_dict=feed_dict)
+                    timers['session_run'] += time.time() - start_time
+
+                    if np.isnan(loss_batch) or np.isinf(loss_batch):
+                        msg = 'Loss is {}. Please change the hyperparameters.'.format(loss_batch)
+                        logger.error(msg)
+                        raise ValueError(msg)
+
+                    losses.append(loss_batch)
+                    if normalize_ent_emb and not normalize_batch_only:
+                        start_time = time.time()
+                        self.sess_train.run(normalize_ent_emb_op)
+                        timers['normalization'] += time.time() - start_time
+                    start_time = time.time()
+                    for callback in self.callbacks:
+                        callback.on_batch_end(self, batch, {'loss': loss_batch, 'steps': 1})
+                    timers['callbacks'] += time.time() - start_time
+
+            training_time = time.time() - epoch_start_time
+            logs = {'epoch': epoch,
+                    'loss': sum(losses) / triples_per_epoch,
+                    'steps_per_sec': batches_count / training_time,
+                    'triples_per_sec': X_train.shape[0] / training_time}
+            if filter_corruptions:
+                filter_stats = self.sess_train.run(self.filter_stats_tf)
+                self.sess_train.run(reset_filter_stats_op)
+                self.filter_stats.append({'reject_rate': filter_stats['rejected'] / filter_stats['sampled'],
+                                          'unresolved_rate': filter_stats['unresolved'] / filter_stats['sampled']})
+                logs.update(self.filter_stats[-1])
+                if self.verbose:
+                    logger.debug('Corruptions reject rate: {:.4f} - unresolved: {:.4f}'.format(
+                        self.filter_stats[-1]['reject_rate'], self.filter_stats[-1]['unresolved_rate']))
             if self.verbose:
-                msg = 'Average Loss: {:10f}'.format(sum(losses) / (batch_size * self.batches_count))
+                msg = 'Average Loss: {:10f} - {:.1f} steps/sec'.format(logs['loss'], logs['steps_per_sec'])
                 logger.debug(msg)
                 epoch_iterator_with_progress.set_description(msg)
 
+            early_stopped = False
             if early_stopping:
-                if self._perform_early_stopping_test(epoch):
-                    self._end_training()
-                    return
+                start_time = time.time()
+                early_stopped = self._perform_early_stopping_test(epoch)
+                timers['early_stopping'] = time.time() - start_time
+
+            timers['epoch'] = time.time() - epoch_start_time
+            for key, value in timers.items():
+                logs['time_{}'.format(key)] = value
+            for callback in self.callbacks:
+                callback.on_epoch_end(self, epoch, logs)
+
+            if early_stopped:
+                self._end_training()
+                return
+            if self.stop_training:
+                logger.debug('Training stopped by a callback at epoch {}.'.format(epoch))
+                break
 
         self._save_trained_params()
         self._end_training()
         
-    def set_filter_for_eval(self, x_filter):
+    def set_filter_for_eval(self, x_filter, filter_index=None):
         """Set the filter to be used during evaluation (filtered_corruption = corruptions - filter).
        
         We would be using a prime number based assignment and product for do the filtering.
@@ -745,49 +2135,19 @@ class EmbeddingModel(abc.ABC):
         ----------
         x_filter : ndarray, shape [n, 3]
             Filter triples. If the generated corruptions are present in this, they will be removed.
+        filter_index : dict
+            The index of ``x_filter`` returned by :func:`create_filter_index`, e.g. shared by models trained
+            with the same internal IDs (default: ``None``, the index is built from ``x_filter``).
 
         """
         self.x_filter = x_filter
 
-        entity_size = len(self.ent_to_idx)
-        reln_size = len(self.rel_to_idx)
-
-        first_million_primes_list = []
-        curr_dir, _ = os.path.split(__file__)
-        with open(os.path.join(curr_dir, "prime_number_list.txt"), "r") as f:
-            logger.debug('Reading from prime_number_list.txt.')
-            line = f.readline()
-            i = 0
-            for line in f:
-                p_nums_line = line.split(' ')
-                first_million_primes_list.extend([np.int64(x) for x in p_nums_line if x != '' and x != '\n'])
-                if len(first_million_primes_list) > (2 * entity_size + reln_size):
-                    break
-        # Assign first to relations - as these are dense - it would reduce the overflows in the product computation
-        # reln
-        self.relation_primes = np.array(first_million_primes_list[:reln_size], dtype=np.int64)
-        # subject
-        self.entity_primes_left = np.array(first_million_primes_list[reln_size:(entity_size+reln_size)], dtype=np.int64)
-        # obj
-        self.entity_primes_right = np.array(first_million_primes_list[(entity_size+reln_size):(2 * entity_size + reln_size)], dtype=np.int64)
-        
-        self.filter_keys = []
-        try:
-            # subject
-            self.filter_keys = [self.entity_primes_left[self.x_filter[i, 0]] for i in range(self.x_filter.shape[0])]
-            # obj
-            self.filter_keys = [self.filter_keys[i] * self.entity_primes_right[self.x_filter[i, 2]]
-                                for i in range(self.x_filter.shape[0])]
-            # reln
-            self.filter_keys = [self.filter_keys[i] * self.relation_primes[self.x_filter[i, 1]]
-                                for i in range(self.x_filter.shape[0])]
-            
-            self.filter_keys = np.array(self.filter_keys, dtype=np.int64)
-        except IndexError:
-            msg = 'The graph has too many distinct entities. ' \
-                  'Please extend the prime numbers list to have at least {} primes.'.format(2 * entity_size + reln_size)
-            logger.error(msg)
-            raise ValueError(msg)
+        if filter_index is None:
+            filter_index = create_filter_index(x_filter, len(self.ent_to_idx), len(self.rel_to_idx))
+        self.relation_primes = filter_index['relation_primes']
+        self.entity_primes_left = filter_index['entity_primes_left']
+        self.entity_primes_right = filter_index['entity_primes_right']
+        self.filter_keys = filter_index['filter_keys']
 
         self.is_filtered = True
 
@@ -913,6 +2273,9 @@ class EmbeddingModel(abc.ABC):
         if self.sess_predict is not None:
             self.sess_predict.close()
         self.sess_predict = None
+        if self.sess_shards_predict is not None:
+            self.sess_shards_predict.close()
+        self.sess_shards_predict = None
         self.is_filtered = False
         self.eval_config = {}
 
@@ -969,13 +2332,17 @@ class EmbeddingModel(abc.ABC):
         if not from_idx:
             X = to_idx(X, ent_to_idx=self.ent_to_idx, rel_to_idx=self.rel_to_idx)
 
+        if not get_ranks and not isinstance(self.trained_model_params[0], np.ndarray):
+            # the entity embeddings are sharded: only read the shards of the entities of X
+            return self._predict_from_shards(X)
+
         # build tf graph for predictions
         if self.sess_predict is None:
             self._load_model_from_trained_params()
 
             self._initialize_eval_graph()
 
-            sess = tf.Session()
+            sess = tf.Session(config=self.tf_config)
             sess.run(tf.tables_initializer())
             sess.run(tf.global_variables_initializer())
             self.sess_predict = sess
@@ -1044,7 +2411,7 @@ class RandomBaseline(EmbeddingModel):
         """
         self.seed = seed
         self.is_fitted = False
-        self.rnd = check_random_state(self.seed)
+        self.rnd = sklearn_utils.check_random_state(self.seed)
         self.eval_config = {}
 
     def _fn(e_s, e_p, e_o):
@@ -1199,7 +2566,8 @@ class TransE(EmbeddingModel):
                  loss_params={},
                  regularizer=DEFAULT_REGULARIZER, 
                  regularizer_params={},
-                 verbose=DEFAULT_VERBOSE):
+                 verbose=DEFAULT_VERBOSE,
+                 batch_size=DEFAULT_BATCH_SIZE):
         """Initialize an EmbeddingModel
 
             Also creates a new Tensorflow session for training.
@@ -1222,15 +2590,22 @@ class TransE(EmbeddingModel):
             Supported keys:
 
             - **'norm'** (int): the norm to be used in the scoring function (1 or 2-norm - default: 1).
-            - **'normalize_ent_emb'** (bool): flag to indicate whether to normalize entity embeddings after each batch update (default: False).
-            - **negative_corruption_entities** : entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities or an int (which indicates how many entities that should be used for corruption generation).
+            - **'normalize_ent_emb'** (bool): flag to indicate whether to normalize entity embeddings after each batch update (default: False). With row-sparse optimizers (``sgd``, ``adagrad``, ``momentum``, ``lazy_adam``) and no regularizer, only the entity embeddings updated in the batch are normalized, as part of the training step.
+            - **negative_corruption_entities** : entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities, an int (which indicates how many entities that should be used for corruption generation), ``degree`` (all entities, sampled proportionally to their degree raised to the power ``degree_alpha``, as in :cite:`mikolov2013distributed`) or a dict of entity-weight pairs (entities are sampled proportionally to the weights, missing entities are never sampled). Weighted sampling uses alias tables :cite:`vose1991linear`, so each draw takes constant time.
+            - **'degree_alpha'** (float): exponent of the entity degrees with ``negative_corruption_entities='degree'`` (default: 0.75).
+            - **'bernoulli'** (bool): with ``corrupt_sides='s+o'``, corrupt the subject of each triple with the per-relation probability ``tph / (tph + hpt)`` computed on the training set, instead of flipping a fair coin :cite:`wang2014knowledge` (default: False).
+            - **'shared_negatives'** (int): if greater than 0, the triples of each batch share a pool of ``shared_negatives`` negative entities, and each triple is corrupted with all of them (``eta`` is then ignored). Not compatible with ``filter_corruptions`` (default: 0).
+            - **'nscaching'** (bool): draw the training corruptions from caches of hard negatives for each (s, p) and (p, o) pair, refreshed with importance sampling :cite:`zhang2019nscaching` (default: False). Configure the cache memory with **'cache_size'** (entities per pair, default: 50) and the refresh cost with **'cache_candidates'** (random entities scored at each refresh, default: 50) and **'cache_refresh_interval'** (in epochs, default: 1). Not compatible with ``shared_negatives`` and ``filter_corruptions``.
             - **corrupt_sides** : Specifies how to generate corruptions for training. Takes values `s`, `o`, `s+o` or any combination passed as a list
+            - **'steps_per_run'** (int): number of optimizer steps executed by each session call, with an in-graph training loop. Values greater than 1 reduce the Python overhead when training with small batches (default: 1).
+            - **'filter_corruptions'** (bool): flag to resample the training corruptions which are positive triples of the training set (default: False). The reject rate is stored in ``filter_stats``, for each epoch. With ``verbose=True``, the time filtering adds to each batch is stored in ``filter_overhead_per_batch``.
+            - **'filter_resample_rounds'** (int): maximum number of times a colliding corruption is resampled (default: 3).
             
             Example: ``embedding_model_params={'norm': 1, 'normalize_ent_emb': False}``
 
         optimizer : string
             The optimizer used to minimize the loss function. Choose between 'sgd',
-            'adagrad', 'adam', 'momentum'.
+            'adagrad', 'adam', 'lazy_adam', 'momentum'.
         optimizer_params : dict
             Arguments specific to the optimizer, passed as a dictionary.
 
@@ -1267,16 +2642,20 @@ class TransE(EmbeddingModel):
             documentation for additional details.
 
             Example: ``regularizer_params={'lambda': 1e-5, 'p': 2}`` if ``regularizer='LP'``.
+            Pass ``'batch_local': True`` to only regularize the embeddings looked up in each batch.
 
         verbose : bool
             Verbose mode
+        batch_size : int
+            The number of triples in each batch. If set, it is used instead of ``batches_count``.
+            The last batch of each epoch may be smaller (default: None).
         """
         super().__init__(k=k, eta=eta, epochs=epochs, batches_count=batches_count, seed=seed,
                          embedding_model_params=embedding_model_params,
                          optimizer=optimizer, optimizer_params=optimizer_params,
                          loss=loss, loss_params=loss_params,
                          regularizer=regularizer, regularizer_params=regularizer_params,
-                         verbose=verbose)
+                         verbose=verbose, batch_size=batch_size)
 
     def _fn(self, e_s, e_p, e_o):
         """The TransE scoring function.
@@ -1304,7 +2683,31 @@ class TransE(EmbeddingModel):
         return tf.negative(
             tf.norm(e_s + e_p - e_o, ord=self.embedding_model_params.get('norm', DEFAULT_NORM_TRANSE), axis=1))
 
-    def fit(self, X, early_stopping=False, early_stopping_params={}):
+    def _fn_inverse(self, e_p, e_known, unseen_subj):
+        """Estimate the embedding of the unknown entity of a list of triples.
+
+            The TransE score is maximal when :math:`\mathbf{e}_s + \mathbf{r}_p = \mathbf{e}_o`:
+            the unknown subject is :math:`\mathbf{e}_o - \mathbf{r}_p`,
+            the unknown object is :math:`\mathbf{e}_s + \mathbf{r}_p`.
+
+        Parameters
+        ----------
+        e_p : Tensor, shape [n, k]
+            The embeddings of a list of predicates.
+        e_known : Tensor, shape [n, k]
+            The embeddings of the known entities.
+        unseen_subj : bool or Tensor, shape [n]
+            True if the unknown entity is the subject, False if it is the object.
+
+        Returns
+        -------
+        e_unseen : Tensor, shape [n, k]
+            The estimated embeddings of the unknown entities.
+        """
+        return e_known + (1 - 2 * tf.cast(tf.reshape(unseen_subj, [-1, 1]), e_p.dtype)) * e_p
+
+    def fit(self, X, early_stopping=False, early_stopping_params={}, callbacks=[], resume_from=None,
+            from_idx=False):
         """Train an Translating Embeddings model.
 
             The model is trained on a training set X using the training protocol
@@ -1359,10 +2762,21 @@ class TransE(EmbeddingModel):
                 - **'corrupt_side'**: Specifies which side to corrupt. 's', 'o', 's+o' (default)
 
                 Example: ``early_stopping_params={x_valid=X['valid'], 'criteria': 'mrr'}``
+        callbacks: list
+            List of :class:`ampligraph.latent_features.Callback` invoked during training (default: ``[]``).
+            The statistics of each epoch are recorded in ``model.history``
+            (a :class:`ampligraph.latent_features.History`).
+        resume_from: string
+            Resume the training from the latest checkpoint saved in this directory by a
+            :class:`ampligraph.latent_features.ModelCheckpoint` callback (default: ``None``).
+        from_idx: bool
+            If ``True``, ``X`` (and ``x_valid``, ``x_filter`` in ``early_stopping_params``) are already
+            converted to the internal IDs of ``model.ent_to_idx`` and ``model.rel_to_idx``, which must be set
+            beforehand (default: ``False``).
 
 
         """
-        super().fit(X, early_stopping, early_stopping_params)
+        super().fit(X, early_stopping, early_stopping_params, callbacks, resume_from, from_idx)
 
     def predict(self, X, from_idx=False, get_ranks=False):
         """Predict the scores of triples using a trained embedding model.
@@ -1460,7 +2874,8 @@ class DistMult(EmbeddingModel):
                  loss_params={},
                  regularizer=DEFAULT_REGULARIZER, 
                  regularizer_params={},
-                 verbose=DEFAULT_VERBOSE):
+                 verbose=DEFAULT_VERBOSE,
+                 batch_size=DEFAULT_BATCH_SIZE):
         """Initialize an EmbeddingModel
 
             Also creates a new Tensorflow session for training.
@@ -1482,15 +2897,24 @@ class DistMult(EmbeddingModel):
 
             Supported keys:
 
-            - **'normalize_ent_emb'** (bool): flag to indicate whether to normalize entity embeddings after each batch update (default: False).
-            - **'negative_corruption_entities'** - Entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities or an int (which indicates how many entities that should be used for corruption generation).
+            - **'normalize_ent_emb'** (bool): flag to indicate whether to normalize entity embeddings after each batch update (default: False). With row-sparse optimizers (``sgd``, ``adagrad``, ``momentum``, ``lazy_adam``) and no regularizer, only the entity embeddings updated in the batch are normalized, as part of the training step.
+            - **'negative_corruption_entities'** - Entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities, an int (which indicates how many entities that should be used for corruption generation), ``degree`` (all entities, sampled proportionally to their degree raised to the power ``degree_alpha``, as in :cite:`mikolov2013distributed`) or a dict of entity-weight pairs (entities are sampled proportionally to the weights, missing entities are never sampled). Weighted sampling uses alias tables :cite:`vose1991linear`, so each draw takes constant time.
+            - **'degree_alpha'** (float): exponent of the entity degrees with ``negative_corruption_entities='degree'`` (default: 0.75).
+            - **'bernoulli'** (bool): with ``corrupt_sides='s+o'``, corrupt the subject of each triple with the per-relation probability ``tph / (tph + hpt)`` computed on the training set, instead of flipping a fair coin :cite:`wang2014knowledge` (default: False).
+            - **'shared_negatives'** (int): if greater than 0, the triples of each batch share a pool of ``shared_negatives`` negative entities, and each triple is corrupted with all of them (``eta`` is then ignored). Not compatible with ``filter_corruptions`` (default: 0).
+            - **'nscaching'** (bool): draw the training corruptions from caches of hard negatives for each (s, p) and (p, o) pair, refreshed with importance sampling :cite:`zhang2019nscaching` (default: False). Configure the cache memory with **'cache_size'** (entities per pair, default: 50) and the refresh cost with **'cache_candidates'** (random entities scored at each refresh, default: 50) and **'cache_refresh_interval'** (in epochs, default: 1). Not compatible with ``shared_negatives`` and ``filter_corruptions``.
+            - **'one_to_n'** (bool): 1-N training: each (s, p) and (p, o) query is scored against all the entities with a single matrix product, and trained with the binary cross-entropy (``loss='nll'``) or softmax (``loss='multiclass_nll'``) of the labels of all the training triples :cite:`DettmersMS018`. ``batches_count`` and ``batch_size`` then refer to queries, and ``eta`` is ignored (default: False).
+            - **'one_to_n_block'** (int): with ``one_to_n``, score each query against a block of ``one_to_n_block`` random entities (and the entities of the batch) instead of all the entities (default: 0, i.e. all the entities).
             - **corrupt_sides** : Specifies how to generate corruptions for training. Takes values `s`, `o`, `s+o` or any combination passed as a list
+            - **'steps_per_run'** (int): number of optimizer steps executed by each session call, with an in-graph training loop. Values greater than 1 reduce the Python overhead when training with small batches (default: 1).
+            - **'filter_corruptions'** (bool): flag to resample the training corruptions which are positive triples of the training set (default: False). The reject rate is stored in ``filter_stats``, for each epoch. With ``verbose=True``, the time filtering adds to each batch is stored in ``filter_overhead_per_batch``.
+            - **'filter_resample_rounds'** (int): maximum number of times a colliding corruption is resampled (default: 3).
 
             Example: ``embedding_model_params={'normalize_ent_emb': False}``
 
         optimizer : string
             The optimizer used to minimize the loss function. Choose between 'sgd',
-            'adagrad', 'adam', 'momentum'.
+            'adagrad', 'adam', 'lazy_adam', 'momentum'.
         optimizer_params : dict
             Arguments specific to the optimizer, passed as a dictionary.
 
@@ -1527,16 +2951,20 @@ class DistMult(EmbeddingModel):
             documentation for additional details.
 
             Example: ``regularizer_params={'lambda': 1e-5, 'p': 2}`` if ``regularizer='LP'``.
+            Pass ``'batch_local': True`` to only regularize the embeddings looked up in each batch.
 
         verbose : bool
             Verbose mode
+        batch_size : int
+            The number of triples in each batch. If set, it is used instead of ``batches_count``.
+            The last batch of each epoch may be smaller (default: None).
         """
         super().__init__(k=k, eta=eta, epochs=epochs, batches_count=batches_count, seed=seed,
                          embedding_model_params=embedding_model_params,
                          optimizer=optimizer, optimizer_params=optimizer_params,
                          loss=loss, loss_params=loss_params,
                          regularizer=regularizer, regularizer_params=regularizer_params,
-                         verbose=verbose)
+                         verbose=verbose, batch_size=batch_size)
 
     def _fn(self, e_s, e_p, e_o):
         """DistMult
@@ -1564,7 +2992,57 @@ class DistMult(EmbeddingModel):
 
         return tf.reduce_sum(e_s * e_p * e_o, axis=1)
 
-    def fit(self, X, early_stopping=False, early_stopping_params={}):
+    def _fn_candidates(self, e_s, e_p, e_o, e_cand, corrupt_subj):
+        """Score a list of triples with their subject or object replaced by each candidate entity.
+
+            The scores are computed with a single matrix product.
+
+        Parameters
+        ----------
+        e_s : Tensor, shape [n, k]
+            The embeddings of a list of subjects.
+        e_p : Tensor, shape [n, k]
+            The embeddings of a list of predicates.
+        e_o : Tensor, shape [n, k]
+            The embeddings of a list of objects.
+        e_cand : Tensor, shape [m, k]
+            The embeddings of the candidate entities.
+        corrupt_subj : bool
+            If True, candidates replace the subjects, otherwise they replace the objects.
+
+        Returns
+        -------
+        scores : Tensor, shape [n, m]
+            The DistMult scores of the triples, for each candidate.
+        """
+        if corrupt_subj:
+            return tf.matmul(self._fn_inverse(e_p, e_o, True), e_cand, transpose_b=True)
+        return tf.matmul(self._fn_inverse(e_p, e_s, False), e_cand, transpose_b=True)
+
+    def _fn_inverse(self, e_p, e_known, unseen_subj):
+        """Estimate the embedding of the unknown entity of a list of triples.
+
+            The DistMult score is the dot product of the unknown entity with the element-wise product of
+            the predicate and of the known entity, whatever the side of the unknown entity.
+
+        Parameters
+        ----------
+        e_p : Tensor, shape [n, k]
+            The embeddings of a list of predicates.
+        e_known : Tensor, shape [n, k]
+            The embeddings of the known entities.
+        unseen_subj : bool or Tensor, shape [n]
+            True if the unknown entity is the subject, False if it is the object.
+
+        Returns
+        -------
+        e_unseen : Tensor, shape [n, k]
+            The estimated embeddings of the unknown entities.
+        """
+        return e_p * e_known
+
+    def fit(self, X, early_stopping=False, early_stopping_params={}, callbacks=[], resume_from=None,
+            from_idx=False):
         """Train an DistMult.
 
             The model is trained on a training set X using the training protocol
@@ -1619,9 +3097,20 @@ class DistMult(EmbeddingModel):
                 - **'corrupt_side'**: Specifies which side to corrupt. 's', 'o', 's+o' (default)
 
                 Example: ``early_stopping_params={x_valid=X['valid'], 'criteria': 'mrr'}``
+        callbacks: list
+            List of :class:`ampligraph.latent_features.Callback` invoked during training (default: ``[]``).
+            The statistics of each epoch are recorded in ``model.history``
+            (a :class:`ampligraph.latent_features.History`).
+        resume_from: string
+            Resume the training from the latest checkpoint saved in this directory by a
+            :class:`ampligraph.latent_features.ModelCheckpoint` callback (default: ``None``).
+        from_idx: bool
+            If ``True``, ``X`` (and ``x_valid``, ``x_filter`` in ``early_stopping_params``) are already
+            converted to the internal IDs of ``model.ent_to_idx`` and ``model.rel_to_idx``, which must be set
+            beforehand (default: ``False``).
 
         """
-        super().fit(X, early_stopping, early_stopping_params)
+        super().fit(X, early_stopping, early_stopping_params, callbacks, resume_from, from_idx)
 
     def predict(self, X, from_idx=False, get_ranks=False):
         """Predict the scores of triples using a trained embedding model.
@@ -1722,7 +3211,8 @@ class ComplEx(EmbeddingModel):
                  loss_params={},
                  regularizer=DEFAULT_REGULARIZER, 
                  regularizer_params={},
-                 verbose=DEFAULT_VERBOSE):
+                 verbose=DEFAULT_VERBOSE,
+                 batch_size=DEFAULT_BATCH_SIZE):
         """Initialize an EmbeddingModel
 
             Also creates a new Tensorflow session for training.
@@ -1742,12 +3232,21 @@ class ComplEx(EmbeddingModel):
         embedding_model_params : dict
             ComplEx-specific hyperparams:
             
-            - **'negative_corruption_entities'** - Entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities or an int (which indicates how many entities that should be used for corruption generation).
+            - **'negative_corruption_entities'** - Entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities, an int (which indicates how many entities that should be used for corruption generation), ``degree`` (all entities, sampled proportionally to their degree raised to the power ``degree_alpha``, as in :cite:`mikolov2013distributed`) or a dict of entity-weight pairs (entities are sampled proportionally to the weights, missing entities are never sampled). Weighted sampling uses alias tables :cite:`vose1991linear`, so each draw takes constant time.
+            - **'degree_alpha'** (float): exponent of the entity degrees with ``negative_corruption_entities='degree'`` (default: 0.75).
+            - **'bernoulli'** (bool): with ``corrupt_sides='s+o'``, corrupt the subject of each triple with the per-relation probability ``tph / (tph + hpt)`` computed on the training set, instead of flipping a fair coin :cite:`wang2014knowledge` (default: False).
+            - **'shared_negatives'** (int): if greater than 0, the triples of each batch share a pool of ``shared_negatives`` negative entities, and each triple is corrupted with all of them (``eta`` is then ignored). Not compatible with ``filter_corruptions`` (default: 0).
+            - **'nscaching'** (bool): draw the training corruptions from caches of hard negatives for each (s, p) and (p, o) pair, refreshed with importance sampling :cite:`zhang2019nscaching` (default: False). Configure the cache memory with **'cache_size'** (entities per pair, default: 50) and the refresh cost with **'cache_candidates'** (random entities scored at each refresh, default: 50) and **'cache_refresh_interval'** (in epochs, default: 1). Not compatible with ``shared_negatives`` and ``filter_corruptions``.
+            - **'one_to_n'** (bool): 1-N training: each (s, p) and (p, o) query is scored against all the entities with a single matrix product, and trained with the binary cross-entropy (``loss='nll'``) or softmax (``loss='multiclass_nll'``) of the labels of all the training triples :cite:`DettmersMS018`. ``batches_count`` and ``batch_size`` then refer to queries, and ``eta`` is ignored (default: False).
+            - **'one_to_n_block'** (int): with ``one_to_n``, score each query against a block of ``one_to_n_block`` random entities (and the entities of the batch) instead of all the entities (default: 0, i.e. all the entities).
             - **corrupt_sides** : Specifies how to generate corruptions for training. Takes values `s`, `o`, `s+o` or any combination passed as a list
+            - **'steps_per_run'** (int): number of optimizer steps executed by each session call, with an in-graph training loop. Values greater than 1 reduce the Python overhead when training with small batches (default: 1).
+            - **'filter_corruptions'** (bool): flag to resample the training corruptions which are positive triples of the training set (default: False). The reject rate is stored in ``filter_stats``, for each epoch. With ``verbose=True``, the time filtering adds to each batch is stored in ``filter_overhead_per_batch``.
+            - **'filter_resample_rounds'** (int): maximum number of times a colliding corruption is resampled (default: 3).
 
         optimizer : string
             The optimizer used to minimize the loss function. Choose between 'sgd',
-            'adagrad', 'adam', 'momentum'.
+            'adagrad', 'adam', 'lazy_adam', 'momentum'.
         optimizer_params : dict
             Arguments specific to the optimizer, passed as a dictionary.
 
@@ -1784,15 +3283,19 @@ class ComplEx(EmbeddingModel):
             documentation for additional details.
 
             Example: ``regularizer_params={'lambda': 1e-5, 'p': 2}`` if ``regularizer='LP'``.
+            Pass ``'batch_local': True`` to only regularize the embeddings looked up in each batch.
         verbose : bool
             Verbose mode
+        batch_size : int
+            The number of triples in each batch. If set, it is used instead of ``batches_count``.
+            The last batch of each epoch may be smaller (default: None).
         """
         super().__init__(k=k, eta=eta, epochs=epochs, batches_count=batches_count, seed=seed,
                          embedding_model_params=embedding_model_params,
                          optimizer=optimizer, optimizer_params=optimizer_params,
                          loss=loss, loss_params=loss_params,
                          regularizer=regularizer, regularizer_params=regularizer_params,
-                         verbose=verbose)
+                         verbose=verbose, batch_size=batch_size)
 
     def _initialize_parameters(self):
         """ Initialize the complex embeddings.
@@ -1839,7 +3342,66 @@ class ComplEx(EmbeddingModel):
                tf.reduce_sum(e_p_img * e_s_real * e_o_img, axis=1) - \
                tf.reduce_sum(e_p_img * e_s_img * e_o_real, axis=1)
 
-    def fit(self, X, early_stopping=False, early_stopping_params={}):
+    def _fn_candidates(self, e_s, e_p, e_o, e_cand, corrupt_subj):
+        """Score a list of triples with their subject or object replaced by each candidate entity.
+
+            The real and imaginary parts of the known entity and of the predicate are combined in a query
+            vector, which is multiplied by the candidate embeddings with a single matrix product.
+
+        Parameters
+        ----------
+        e_s : Tensor, shape [n, 2*k]
+            The embeddings of a list of subjects.
+        e_p : Tensor, shape [n, 2*k]
+            The embeddings of a list of predicates.
+        e_o : Tensor, shape [n, 2*k]
+            The embeddings of a list of objects.
+        e_cand : Tensor, shape [m, 2*k]
+            The embeddings of the candidate entities.
+        corrupt_subj : bool
+            If True, candidates replace the subjects, otherwise they replace the objects.
+
+        Returns
+        -------
+        scores : Tensor, shape [n, m]
+            The ComplEx scores of the triples, for each candidate.
+        """
+        if corrupt_subj:
+            query = self._fn_inverse(e_p, e_o, True)
+        else:
+            query = self._fn_inverse(e_p, e_s, False)
+        return tf.matmul(query, e_cand, transpose_b=True)
+
+    def _fn_inverse(self, e_p, e_known, unseen_subj):
+        """Estimate the embedding of the unknown entity of a list of triples.
+
+            The ComplEx score is the dot product of the unknown entity with a query vector:
+            :math:`\overline{\mathbf{r}_p} \mathbf{e}_o` for an unknown subject,
+            :math:`\mathbf{r}_p \mathbf{e}_s` for an unknown object.
+
+        Parameters
+        ----------
+        e_p : Tensor, shape [n, 2*k]
+            The embeddings of a list of predicates.
+        e_known : Tensor, shape [n, 2*k]
+            The embeddings of the known entities.
+        unseen_subj : bool or Tensor, shape [n]
+            True if the unknown entity is the subject, False if it is the object.
+
+        Returns
+        -------
+        e_unseen : Tensor, shape [n, 2*k]
+            The estimated embeddings of the unknown entities.
+        """
+        e_p_real, e_p_img = tf.split(e_p, 2, axis=1)
+        e_known_real, e_known_img = tf.split(e_known, 2, axis=1)
+        # the unknown subject is the conjugate of the predicate times the object
+        e_p_img = (1 - 2 * tf.cast(tf.reshape(unseen_subj, [-1, 1]), e_p.dtype)) * e_p_img
+        return tf.concat([e_p_real * e_known_real - e_p_img * e_known_img,
+                          e_p_real * e_known_img + e_p_img * e_known_real], axis=1)
+
+    def fit(self, X, early_stopping=False, early_stopping_params={}, callbacks=[], resume_from=None,
+            from_idx=False):
         """Train a ComplEx model.
 
             The model is trained on a training set X using the training protocol
@@ -1894,9 +3456,20 @@ class ComplEx(EmbeddingModel):
                 - **'corrupt_side'**: Specifies which side to corrupt. 's', 'o', 's+o' (default)
 
                 Example: ``early_stopping_params={x_valid=X['valid'], 'criteria': 'mrr'}``
+        callbacks: list
+            List of :class:`ampligraph.latent_features.Callback` invoked during training (default: ``[]``).
+            The statistics of each epoch are recorded in ``model.history``
+            (a :class:`ampligraph.latent_features.History`).
+        resume_from: string
+            Resume the training from the latest checkpoint saved in this directory by a
+            :class:`ampligraph.latent_features.ModelCheckpoint` callback (default: ``None``).
+        from_idx: bool
+            If ``True``, ``X`` (and ``x_valid``, ``x_filter`` in ``early_stopping_params``) are already
+            converted to the internal IDs of ``model.ent_to_idx`` and ``model.rel_to_idx``, which must be set
+            beforehand (default: ``False``).
 
         """
-        super().fit(X, early_stopping, early_stopping_params)
+        super().fit(X, early_stopping, early_stopping_params, callbacks, resume_from, from_idx)
 
     def predict(self, X, from_idx=False, get_ranks=False):
         """Predict the scores of triples using a trained embedding model.
@@ -1992,7 +3565,8 @@ class HolE(ComplEx):
                  loss_params={},
                  regularizer=DEFAULT_REGULARIZER, 
                  regularizer_params={},
-                 verbose=DEFAULT_VERBOSE):
+                 verbose=DEFAULT_VERBOSE,
+                 batch_size=DEFAULT_BATCH_SIZE):
         """Initialize an EmbeddingModel
 
             Also creates a new Tensorflow session for training.
@@ -2012,12 +3586,21 @@ class HolE(ComplEx):
         embedding_model_params : dict
             HolE-specific hyperparams: 
             
-            - **negative_corruption_entities** - Entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities or an int (which indicates how many entities that should be used for corruption generation).
+            - **negative_corruption_entities** - Entities to be used for generation of corruptions while training. It can take the following values : ``all`` (default: all entities), ``batch`` (entities present in each batch), list of entities, an int (which indicates how many entities that should be used for corruption generation), ``degree`` (all entities, sampled proportionally to their degree raised to the power ``degree_alpha``, as in :cite:`mikolov2013distributed`) or a dict of entity-weight pairs (entities are sampled proportionally to the weights, missing entities are never sampled). Weighted sampling uses alias tables :cite:`vose1991linear`, so each draw takes constant time.
+            - **'degree_alpha'** (float): exponent of the entity degrees with ``negative_corruption_entities='degree'`` (default: 0.75).
+            - **'bernoulli'** (bool): with ``corrupt_sides='s+o'``, corrupt the subject of each triple with the per-relation probability ``tph / (tph + hpt)`` computed on the training set, instead of flipping a fair coin :cite:`wang2014knowledge` (default: False).
+            - **'shared_negatives'** (int): if greater than 0, the triples of each batch share a pool of ``shared_negatives`` negative entities, and each triple is corrupted with all of them (``eta`` is then ignored). Not compatible with ``filter_corruptions`` (default: 0).
+            - **'nscaching'** (bool): draw the training corruptions from caches of hard negatives for each (s, p) and (p, o) pair, refreshed with importance sampling :cite:`zhang2019nscaching` (default: False). Configure the cache memory with **'cache_size'** (entities per pair, default: 50) and the refresh cost with **'cache_candidates'** (random entities scored at each refresh, default: 50) and **'cache_refresh_interval'** (in epochs, default: 1). Not compatible with ``shared_negatives`` and ``filter_corruptions``.
+            - **'one_to_n'** (bool): 1-N training: each (s, p) and (p, o) query is scored against all the entities with a single matrix product, and trained with the binary cross-entropy (``loss='nll'``) or softmax (``loss='multiclass_nll'``) of the labels of all the training triples :cite:`DettmersMS018`. ``batches_count`` and ``batch_size`` then refer to queries, and ``eta`` is ignored (default: False).
+            - **'one_to_n_block'** (int): with ``one_to_n``, score each query against a block of ``one_to_n_block`` random entities (and the entities of the batch) instead of all the entities (default: 0, i.e. all the entities).
             - **corrupt_sides** : Specifies how to generate corruptions for training. Takes values `s`, `o`, `s+o` or any combination passed as a list
+            - **'steps_per_run'** (int): number of optimizer steps executed by each session call, with an in-graph training loop. Values greater than 1 reduce the Python overhead when training with small batches (default: 1).
+            - **'filter_corruptions'** (bool): flag to resample the training corruptions which are positive triples of the training set (default: False). The reject rate is stored in ``filter_stats``, for each epoch. With ``verbose=True``, the time filtering adds to each batch is stored in ``filter_overhead_per_batch``.
+            - **'filter_resample_rounds'** (int): maximum number of times a colliding corruption is resampled (default: 3).
             
         optimizer : string
             The optimizer used to minimize the loss function. Choose between 'sgd',
-            'adagrad', 'adam', 'momentum'.
+            'adagrad', 'adam', 'lazy_adam', 'momentum'.
         optimizer_params : dict
             Arguments specific to the optimizer, passed as a dictionary.
 
@@ -2054,15 +3637,19 @@ class HolE(ComplEx):
             documentation for additional details.
 
             Example: ``regularizer_params={'lambda': 1e-5, 'p': 2}`` if ``regularizer='LP'``.
+            Pass ``'batch_local': True`` to only regularize the embeddings looked up in each batch.
         verbose : bool
             Verbose mode
+        batch_size : int
+            The number of triples in each batch. If set, it is used instead of ``batches_count``.
+            The last batch of each epoch may be smaller (default: None).
         """
         super().__init__(k=k, eta=eta, epochs=epochs, batches_count=batches_count, seed=seed,
                          embedding_model_params=embedding_model_params,
                          optimizer=optimizer, optimizer_params=optimizer_params,
                          loss=loss, loss_params=loss_params,
                          regularizer=regularizer, regularizer_params=regularizer_params,
-                         verbose=verbose)
+                         verbose=verbose, batch_size=batch_size)
 
     def _fn(self, e_s, e_p, e_o):
         """The Hole scoring function.
@@ -2091,7 +3678,20 @@ class HolE(ComplEx):
         """
         return (2 / self.k) * (super()._fn(e_s, e_p, e_o))
 
-    def fit(self, X, early_stopping=False, early_stopping_params={}):
+    def _fn_candidates(self, e_s, e_p, e_o, e_cand, corrupt_subj):
+        """Score a list of triples with their subject or object replaced by each candidate entity.
+
+            See :meth:`ComplEx._fn_candidates`.
+
+        Returns
+        -------
+        scores : Tensor, shape [n, m]
+            The HolE scores of the triples, for each candidate.
+        """
+        return (2 / self.k) * (super()._fn_candidates(e_s, e_p, e_o, e_cand, corrupt_subj))
+
+    def fit(self, X, early_stopping=False, early_stopping_params={}, callbacks=[], resume_from=None,
+            from_idx=False):
         """Train a HolE model.
 
             The model is trained on a training set X using the training protocol
@@ -2146,9 +3746,20 @@ class HolE(ComplEx):
                 - **'corrupt_side'**: Specifies which side to corrupt. 's', 'o', 's+o' (default)
 
                 Example: ``early_stopping_params={x_valid=X['valid'], 'criteria': 'mrr'}``
+        callbacks: list
+            List of :class:`ampligraph.latent_features.Callback` invoked during training (default: ``[]``).
+            The statistics of each epoch are recorded in ``model.history``
+            (a :class:`ampligraph.latent_features.History`).
+        resume_from: string
+            Resume the training from the latest checkpoint saved in this directory by a
+            :class:`ampligraph.latent_features.ModelCheckpoint` callback (default: ``None``).
+        from_idx: bool
+            If ``True``, ``X`` (and ``x_valid``, ``x_filter`` in ``early_stopping_params``) are already
+            converted to the internal IDs of ``model.ent_to_idx`` and ``model.rel_to_idx``, which must be set
+            beforehand (default: ``False``).
 
         """
-        super().fit(X, early_stopping, early_stopping_params)
+        super().fit(X, early_stopping, early_stopping_params, callbacks, resume_from, from_idx)
 
     def predict(self, X, from_idx=False, get_ranks=False):
         """Predict the scores of triples using a trained embedding model.
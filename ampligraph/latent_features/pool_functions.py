@@ -1,11 +1,12 @@
-import tensorflow as tf
 import logging
 
+from ..utils.lazy import tf
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
-def sum_pooling(embeddings):
+def sum_pooling(embeddings, mask=None):
     """Sum pooling function
     Performs pooling by summation of all embeddings along neighbour axis.
 
@@ -13,6 +14,8 @@ def sum_pooling(embeddings):
     ----------
     embeddings : Tensor, shape [B, max_rel, emb_dim]
         The embeddings of a list of subjects.
+    mask : Tensor, shape [B, max_rel]
+        Boolean mask of the valid neighbours, if the embeddings are padded (default: None).
 
     Returns
     -------
@@ -20,17 +23,21 @@ def sum_pooling(embeddings):
         Reduced vector v
 
     """
+    if mask is not None:
+        embeddings = embeddings * tf.cast(tf.expand_dims(mask, 2), embeddings.dtype)
     return tf.reduce_sum(embeddings, axis=1)
 
 
-def avg_pooling(embeddings):
-    """Sum pooling function
-    Performs pooling by summation of all embeddings along neighbour axis.
+def avg_pooling(embeddings, mask=None):
+    """Average pooling function
+    Performs pooling by averaging all embeddings along neighbour axis.
 
     Parameters
     ----------
     embeddings : Tensor, shape [B, max_rel, emb_dim]
         The embeddings of a list of subjects.
+    mask : Tensor, shape [B, max_rel]
+        Boolean mask of the valid neighbours, if the embeddings are padded (default: None).
 
     Returns
     -------
@@ -38,17 +45,22 @@ def avg_pooling(embeddings):
         Reduced vector v
 
     """
+    if mask is not None:
+        counts = tf.reduce_sum(tf.cast(mask, embeddings.dtype), axis=1, keepdims=True)
+        return sum_pooling(embeddings, mask) / tf.maximum(counts, 1)
     return tf.reduce_mean(embeddings, axis=1)
 
 
-def max_pooling(embeddings):
-    """Sum pooling function
-    Performs pooling by summation of all embeddings along neighbour axis.
+def max_pooling(embeddings, mask=None):
+    """Max pooling function
+    Performs pooling by taking the element-wise maximum of all embeddings along neighbour axis.
 
     Parameters
     ----------
     embeddings : Tensor, shape [B, max_rel, emb_dim]
         The embeddings of a list of subjects.
+    mask : Tensor, shape [B, max_rel]
+        Boolean mask of the valid neighbours, if the embeddings are padded (default: None).
 
     Returns
     -------
@@ -56,4 +68,11 @@ def max_pooling(embeddings):
         Reduced vector v
 
     """
+    if mask is not None:
+        embeddings = tf.where(tf.tile(tf.expand_dims(mask, 2), [1, 1, tf.shape(embeddings)[2]]),
+                              embeddings, tf.fill(tf.shape(embeddings), embeddings.dtype.min))
     return tf.reduce_max(embeddings, axis=1)
+
+
+# Pooling functions, by name
+POOLING_FUNCTIONS = {'sum': sum_pooling, 'avg': avg_pooling, 'max': max_pooling}
@@ -1,8 +1,9 @@
-import tensorflow as tf
 import numpy as np
 import abc
 import logging
 
+from ..utils.lazy import tf
+
 REGULARIZER_REGISTRY = {}
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,9 @@ DEFAULT_LAMBDA = 1e-5
 # default regularization - L2
 DEFAULT_NORM = 2
 
+# default regularization scope - whole embedding matrices
+DEFAULT_BATCH_LOCAL = False
+
 
 class Regularizer(abc.ABC):
     """Abstract class for Regularizer.
@@ -80,6 +84,17 @@ class Regularizer(abc.ABC):
             logger.error(msg)
             raise Exception(msg)
 
+    def is_batch_local(self):
+        """Check whether the regularizer must only be applied to the embeddings looked up in the current batch.
+
+        Returns
+        -------
+        batch_local : bool
+            True if the model must pass the batch embeddings to the regularizer,
+            False if it must pass the whole embedding matrices.
+        """
+        return self._regularizer_parameters.get('batch_local', DEFAULT_BATCH_LOCAL)
+
     def _init_hyperparams(self, hyperparam_dict):
         """ Initializes the hyperparameters needed by the algorithm.
         
@@ -127,7 +142,7 @@ class Regularizer(abc.ABC):
         return loss
 
 
-@register_regularizer("LP", ['p', 'lambda'])
+@register_regularizer("LP", ['p', 'lambda', 'batch_local'])
 class LPRegularizer(Regularizer):
     """ Performs LP regularization
     
@@ -140,10 +155,17 @@ class LPRegularizer(Regularizer):
            
         Example: if :math:`p=1` the function will perform L1 regularization.
         L2 regularization is obtained with :math:`p=2`.
+
+        By default the penalty is computed over the whole entity and relation embedding matrices at each batch,
+        which makes the gradient dense. With ``batch_local=True`` it is computed only over the embeddings looked up
+        for the positives and negatives of the current batch (e.g. the N3 regularizer with :math:`p=3`,
+        as done in :cite:`lacroix2018canonical`). Updates then stay row-sparse, which is much faster on
+        large graphs. Note that ``lambda`` must be scaled accordingly, since fewer parameters are penalized.
           
     """
 
-    def __init__(self, regularizer_params={'lambda': DEFAULT_LAMBDA, 'p': DEFAULT_NORM}, verbose=False):
+    def __init__(self, regularizer_params={'lambda': DEFAULT_LAMBDA, 'p': DEFAULT_NORM,
+                                           'batch_local': DEFAULT_BATCH_LOCAL}, verbose=False):
         """ Initializes the hyperparameters needed by the algorithm.
 
         Parameters
@@ -153,6 +175,8 @@ class LPRegularizer(Regularizer):
 
             - **'lambda'**: (float). Weight of regularization loss for each parameter (default: 1e-5)
             - **'p'**: (int): norm (default: 2)
+            - **'batch_local'**: (bool): only regularize the embeddings looked up in the current batch
+              (default: False)
 
             Example: ``regularizer_params={'lambda': 1e-5, 'p': 1}``
             
@@ -174,10 +198,15 @@ class LPRegularizer(Regularizer):
             'p': int
             
                 Norm of the regularizer (``1`` for L1 regularizer, ``2`` for L2 and so on.) (default:2) 
+
+            'batch_local': bool
+
+                Whether to regularize only the embeddings looked up in the current batch (default: False)
                 
         """
         self._regularizer_parameters['lambda'] = hyperparam_dict.get('lambda', DEFAULT_LAMBDA)
         self._regularizer_parameters['p'] = hyperparam_dict.get('p', DEFAULT_NORM)
+        self._regularizer_parameters['batch_local'] = hyperparam_dict.get('batch_local', DEFAULT_BATCH_LOCAL)
         if type(self._regularizer_parameters['p']) is not int:
             msg = 'Invalid value for regularizer parameter p:{}. Supported type int'.format(
                 self._regularizer_parameters['p'])
@@ -0,0 +1,53 @@
+"""This module contains the lazy loading of the heavy dependencies of AmpliGraph (e.g. TensorFlow).
+
+A lazy module is imported on first attribute access, so that importing AmpliGraph (e.g. to load a dataset or to
+compute metrics) does not pay for backends it does not use.
+"""
+
+import importlib
+import logging
+import types
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class LazyModule(types.ModuleType):
+    """A module imported on first attribute access.
+
+    Example
+    -------
+    >>> from ampligraph.utils.lazy import LazyModule
+    >>> tf = LazyModule('tensorflow')
+    >>> tf.constant(1)  # tensorflow is imported here
+    """
+
+    def __init__(self, name):
+        """Initialize the lazy module.
+
+        Parameters
+        ----------
+        name : string
+            The absolute name of the module (e.g. ``tensorflow.contrib.tensorboard.plugins.projector``).
+        """
+        super(LazyModule, self).__init__(name)
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            logger.debug('Importing {}.'.format(self.__name__))
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+# The heavy dependencies of AmpliGraph, imported on first use
+tf = LazyModule('tensorflow')
+projector = LazyModule('tensorflow.contrib.tensorboard.plugins.projector')
+pd = LazyModule('pandas')
+sklearn_utils = LazyModule('sklearn.utils')
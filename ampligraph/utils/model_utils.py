@@ -1,26 +1,56 @@
 import os
+import json
 import pickle
 import importlib
 from time import gmtime, strftime
 import glob
 import logging
 
-import tensorflow as tf
-from tensorflow.contrib.tensorboard.plugins import projector
-import pandas as pd
+import numpy as np
+
+from .sharding import write_sharded_entities, ShardedVocabulary, ShardedArray
+from .lazy import tf, projector, pd
 
 """This module contains utility functions for neural knowledge graph embedding models.
 """
 
 DEFAULT_MODEL_NAMES = "{0}.model.pkl"
 
+# Default name of the directories of the models saved in the npy format
+DEFAULT_NPY_MODEL_NAMES = "{0}.model"
+
+# Default format of the saved models
+DEFAULT_MODEL_FORMAT = 'pickle'
+
+# Name of the JSON header of the models saved in the npy format
+NPY_HEADER_NAME = 'header.json'
+
+# Version of the npy format, increased when the layout of the directory changes
+NPY_FORMAT_VERSION = 2
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
-def save_model(model, model_name_path=None):
+def save_model(model, model_name_path=None, format=DEFAULT_MODEL_FORMAT, shard_size=None):
     """ Save a trained model to disk.
 
+        Two formats are supported:
+
+        - ``pickle`` (default): a single file holding the pickled model.
+        - ``npy``: a directory holding each parameter of the model as a raw ``.npy`` array, the entities and
+          relations as UTF-8 encoded arrays, and the class and hyperparameters of the model in a JSON header
+          (``header.json``). Parameters are written and read without serialization overhead, and
+          :meth:`restore_model` can memory-map them (``mmap=True``).
+
+        With ``shard_size``, the ``npy`` format splits the entities into shards of ``shard_size`` entities.
+        Each shard holds a sorted string table of its entities (UTF-8 encoded keys and their offsets) and their
+        embeddings, and the header holds the first entity of each shard. The restored model looks up entities
+        with a binary search over the first entities and then over the shard, and reads the shards on demand:
+        :meth:`EmbeddingModel.get_embeddings` and :meth:`EmbeddingModel.predict` (without ranks) only read
+        the shards of their entities. Ranking triples against corruptions reads all of them. The internal IDs
+        of the entities are renumbered in the sorted order of the entities.
+
         Examples
         --------
         >>> import numpy as np
@@ -49,12 +79,20 @@ def save_model(model, model_name_path=None):
             the model must be an instance of TransE,
             DistMult, ComplEx, or HolE.
         model_name_path: string
-            The name of the model to be saved.
+            The name of the model to be saved (the directory of the model with the ``npy`` format).
             If not specified, a default name model
             with current datetime is named
             and saved to the working directory
+        format: string
+            The format of the saved model: ``pickle`` (default) or ``npy``.
+        shard_size: int
+            The number of entities of each shard with the ``npy`` format (default: ``None``, no sharding).
 
     """
+    if format not in ['pickle', 'npy']:
+        msg = 'Unsupported model format {}. Choose one of pickle, npy.'.format(format)
+        logger.error(msg)
+        raise ValueError(msg)
 
     logger.debug('Saving model {}.'.format(model.__class__.__name__))
 
@@ -72,17 +110,164 @@ def save_model(model, model_name_path=None):
                  {}'.format(model.all_params, model.is_fitted))
 
     if model_name_path is None:
-        model_name_path = DEFAULT_MODEL_NAMES.format(strftime("%Y_%m_%d-%H_%M_%S", gmtime()))
+        default_names = DEFAULT_NPY_MODEL_NAMES if format == 'npy' else DEFAULT_MODEL_NAMES
+        model_name_path = default_names.format(strftime("%Y_%m_%d-%H_%M_%S", gmtime()))
+
+    if format == 'npy':
+        _save_model_npy(obj, model_name_path, shard_size)
+        return
 
     with open(model_name_path, 'wb') as fw:
         pickle.dump(obj, fw)
         # dump model tf
 
 
-def restore_model(model_name_path=None):
+def _write_vocabulary(path, name, mapping):
+    """Write the keys of a mapping to internal IDs as a UTF-8 encoded array and the offsets of each key in it.
+
+    Parameters
+    ----------
+    path : string
+        The directory of the model.
+    name : string
+        The name of the vocabulary (``entities`` or ``relations``).
+    mapping : dict
+        The mapping of the keys to dense internal IDs.
+    """
+    keys = sorted(mapping, key=mapping.get)
+    if [mapping[key] for key in keys] != list(range(len(keys))):
+        msg = 'The internal IDs of the {} are not dense.'.format(name)
+        logger.error(msg)
+        raise ValueError(msg)
+    if not all(isinstance(key, str) for key in keys):
+        msg = 'The npy format only supports string {}: use the pickle format.'.format(name)
+        logger.error(msg)
+        raise ValueError(msg)
+
+    encoded = [key.encode('utf-8') for key in keys]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(key) for key in encoded])
+    np.save(os.path.join(path, '{}.data.npy'.format(name)), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    np.save(os.path.join(path, '{}.offsets.npy'.format(name)), offsets)
+
+
+def _read_vocabulary(path, name):
+    """Read a vocabulary written by :func:`_write_vocabulary`.
+
+    Parameters
+    ----------
+    path : string
+        The directory of the model.
+    name : string
+        The name of the vocabulary (``entities`` or ``relations``).
+
+    Returns
+    -------
+    mapping : dict
+        The mapping of the keys to internal IDs.
+    """
+    data = np.load(os.path.join(path, '{}.data.npy'.format(name))).tobytes()
+    offsets = np.load(os.path.join(path, '{}.offsets.npy'.format(name))).tolist()
+    return {data[start:end].decode('utf-8'): idx for idx, (start, end) in enumerate(zip(offsets[:-1], offsets[1:]))}
+
+
+def _save_model_npy(obj, path, shard_size=None):
+    """Save a model in the npy format (see :meth:`save_model`).
+
+    Parameters
+    ----------
+    obj : dict
+        The saved attributes of the model.
+    path : string
+        The directory of the model.
+    shard_size : int
+        The number of entities of each shard (None not to shard the entities).
+    """
+    os.makedirs(path, exist_ok=True)
+    _write_vocabulary(path, 'relations', obj['rel_to_idx'])
+
+    params_files = []
+    entity_shards = None
+    for i, param in enumerate(obj['model_params']):
+        if i == 0 and shard_size is not None:
+            # the first parameter holds the entity embeddings
+            entity_shards = write_sharded_entities(path, obj['ent_to_idx'], np.asarray(param), shard_size)
+            params_files.append(None)
+            continue
+        params_files.append('model_params_{}.npy'.format(i))
+        np.save(os.path.join(path, params_files[-1]), np.asarray(param))
+    if entity_shards is None:
+        _write_vocabulary(path, 'entities', obj['ent_to_idx'])
+
+    header = {'format_version': 1 if entity_shards is None else NPY_FORMAT_VERSION,
+              'class_name': obj['class_name'],
+              'hyperparams': obj['hyperparams'],
+              'is_fitted': obj['is_fitted'],
+              'model_params': params_files,
+              'entity_shards': entity_shards}
+    try:
+        header = json.dumps(header, indent=4, sort_keys=True)
+    except TypeError as e:
+        msg = 'The hyperparameters of the model cannot be saved in the npy format: {}. ' \
+              'Use the pickle format.'.format(e)
+        logger.error(msg)
+        raise ValueError(msg)
+    # the header is written last: a directory without header holds an incomplete model
+    with open(os.path.join(path, NPY_HEADER_NAME), 'w') as f:
+        f.write(header)
+
+
+def _restore_model_npy(path, mmap):
+    """Restore the attributes of a model saved in the npy format.
+
+    Parameters
+    ----------
+    path : string
+        The directory of the model.
+    mmap : bool
+        Memory-map the parameters of the model rather than loading them.
+
+    Returns
+    -------
+    obj : dict
+        The saved attributes of the model.
+    """
+    header_path = os.path.join(path, NPY_HEADER_NAME)
+    if not os.path.exists(header_path):
+        msg = 'No model header found in {}: the model is missing or was not saved completely.'.format(path)
+        logger.error(msg)
+        raise ValueError(msg)
+    with open(header_path, 'r') as f:
+        header = json.load(f)
+    if header['format_version'] > NPY_FORMAT_VERSION:
+        msg = 'The model was saved with a more recent version of the npy format ({}).'.format(
+            header['format_version'])
+        logger.error(msg)
+        raise ValueError(msg)
+
+    entity_shards = header.get('entity_shards')
+    model_params = []
+    for name in header['model_params']:
+        if name is None:
+            # the entity embeddings are sharded
+            model_params.append(ShardedArray(path, entity_shards, mmap))
+        else:
+            model_params.append(np.load(os.path.join(path, name), mmap_mode='r' if mmap else None))
+
+    return {'class_name': header['class_name'],
+            'hyperparams': header['hyperparams'],
+            'is_fitted': header['is_fitted'],
+            'ent_to_idx': _read_vocabulary(path, 'entities') if entity_shards is None
+            else ShardedVocabulary(path, entity_shards, mmap),
+            'rel_to_idx': _read_vocabulary(path, 'relations'),
+            'model_params': model_params}
+
+
+def restore_model(model_name_path=None, mmap=False):
     """ Restore a saved model from disk.
 
-        See also :meth:`save_model`.
+        See also :meth:`save_model`. The format of the model is detected from ``model_name_path``:
+        a directory holds a model saved in the ``npy`` format.
 
         Examples
         --------
@@ -99,6 +284,13 @@ def restore_model(model_name_path=None):
         model_name_path: string
             The name of saved model to be restored. If not specified,
             the library will try to find the default model in the working directory.
+        mmap: bool
+            Memory-map the parameters of a model saved in the ``npy`` format rather than reading them
+            (default: ``False``). The model is restored without reading its embeddings, which are paged in on
+            demand, e.g. by :meth:`EmbeddingModel.get_embeddings`.
+            :meth:`EmbeddingModel.predict` still loads them to build its TensorFlow graph, unless the entities
+            are sharded (see :meth:`save_model`). The shards of a sharded model are always read on demand:
+            ``mmap`` tells whether they are memory-mapped or read at once.
 
         Returns
         -------
@@ -123,8 +315,11 @@ def restore_model(model_name_path=None):
     logger.info('Will load model {}.'.format(model_name_path))
     restored_obj = None
 
-    with open(model_name_path, 'rb') as fr:
-        restored_obj = pickle.load(fr)
+    if os.path.isdir(model_name_path):
+        restored_obj = _restore_model_npy(model_name_path, mmap)
+    else:
+        with open(model_name_path, 'rb') as fr:
+            restored_obj = pickle.load(fr)
 
     if restored_obj:
         logger.debug('Restoring model...')
@@ -0,0 +1,224 @@
+"""This module contains the sharded storage of the entities of large models saved in the npy format.
+
+Entities are sorted and split into shards of ``shard_size`` entities. The internal ID of an entity is its position
+in the sorted order, so that shard ``i`` holds both the keys and the embeddings of the entities
+``[i * shard_size, (i + 1) * shard_size)``. The first key of each shard is the index used to find the shard of
+an entity. Shards are read on demand.
+"""
+
+import os
+import bisect
+import logging
+from collections.abc import Mapping
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+def get_shard_path(path, name, shard):
+    """Return the path of a shard file.
+
+    Parameters
+    ----------
+    path : string
+        The directory of the model.
+    name : string
+        The name of the sharded array (e.g. ``entities.data``).
+    shard : int
+        The index of the shard.
+
+    Returns
+    -------
+    shard_path : string
+        The path of the ``.npy`` file of the shard.
+    """
+    return os.path.join(path, '{}-{:05d}.npy'.format(name, shard))
+
+
+def write_sharded_entities(path, ent_to_idx, ent_emb, shard_size):
+    """Write the entities of a model and their embeddings as shards of a sorted string table.
+
+        The entities are renumbered in the sorted order of their keys.
+
+    Parameters
+    ----------
+    path : string
+        The directory of the model.
+    ent_to_idx : dict
+        The mapping of the entities to internal IDs.
+    ent_emb : ndarray, shape [n, k]
+        The entity embeddings.
+    shard_size : int
+        The number of entities of each shard.
+
+    Returns
+    -------
+    index : dict
+        The index of the shards, saved in the header of the model: the number of entities (``'count'``), the
+        ``'shard_size'``, and the first key of each shard (``'first_keys'``).
+    """
+    if shard_size < 1:
+        msg = 'The shard size must be positive, got {}.'.format(shard_size)
+        logger.error(msg)
+        raise ValueError(msg)
+    if not all(isinstance(key, str) for key in ent_to_idx):
+        msg = 'Sharded models only support string entities: use the pickle format.'
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # code point order is the order of the UTF-8 encoded keys
+    keys = sorted(ent_to_idx)
+    first_keys = []
+    for shard, start in enumerate(range(0, len(keys), shard_size)):
+        shard_keys = keys[start:start + shard_size]
+        first_keys.append(shard_keys[0])
+        encoded = [key.encode('utf-8') for key in shard_keys]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(key) for key in encoded])
+        np.save(get_shard_path(path, 'entities.data', shard), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+        np.save(get_shard_path(path, 'entities.offsets', shard), offsets)
+        np.save(get_shard_path(path, 'entities.embeddings', shard),
+                ent_emb[[ent_to_idx[key] for key in shard_keys]])
+    logger.debug('Saved {} entities in {} shards.'.format(len(keys), len(first_keys)))
+    return {'count': len(keys), 'shard_size': shard_size, 'first_keys': first_keys}
+
+
+class ShardedVocabulary(Mapping):
+    """Read-only mapping of the entities of a sharded model to their internal IDs.
+
+        An entity is looked up by a binary search over the first keys of the shards, then by a binary search
+        over the sorted keys of its shard. Only the shards of the looked up entities are read.
+        Pickling the vocabulary reads all the shards: it is unpickled as a dict.
+    """
+
+    def __init__(self, path, index, mmap=True):
+        """Initialize the vocabulary.
+
+        Parameters
+        ----------
+        path : string
+            The directory of the model.
+        index : dict
+            The index of the shards (see :func:`write_sharded_entities`).
+        mmap : bool
+            Memory-map the shards rather than reading them (default: True).
+        """
+        self.path = path
+        self.count = index['count']
+        self.shard_size = index['shard_size']
+        self.first_keys = index['first_keys']
+        self.mmap = mmap
+        self.shards = {}
+
+    def __reduce__(self):
+        # a pickled vocabulary must not depend on the directory of the model: it is pickled as a dict
+        return dict, (dict(zip(self, range(self.count))),)
+
+    def _load_shard(self, shard):
+        if shard not in self.shards:
+            mmap_mode = 'r' if self.mmap else None
+            self.shards[shard] = (np.load(get_shard_path(self.path, 'entities.data', shard), mmap_mode=mmap_mode),
+                                  np.load(get_shard_path(self.path, 'entities.offsets', shard)))
+        return self.shards[shard]
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        shard = bisect.bisect_right(self.first_keys, key) - 1
+        if shard < 0:
+            raise KeyError(key)
+
+        data, offsets = self._load_shard(shard)
+        encoded = key.encode('utf-8')
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if data[offsets[mid]:offsets[mid + 1]].tobytes() < encoded:
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(offsets) - 1 or data[offsets[low]:offsets[low + 1]].tobytes() != encoded:
+            raise KeyError(key)
+        return shard * self.shard_size + low
+
+    def __iter__(self):
+        for shard in range(len(self.first_keys)):
+            data, offsets = self._load_shard(shard)
+            data = data.tobytes()
+            for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+                yield data[start:end].decode('utf-8')
+
+    def __len__(self):
+        return self.count
+
+
+class ShardedArray(object):
+    """Read-only array of the entity embeddings of a sharded model.
+
+        Rows are selected with integers, slices or arrays of integers: only the shards of the selected rows are
+        read. Converting the array with ``np.asarray`` reads all the shards, and so does pickling it: it is
+        unpickled as an ndarray.
+    """
+
+    def __init__(self, path, index, mmap=True):
+        """Initialize the array.
+
+        Parameters
+        ----------
+        path : string
+            The directory of the model.
+        index : dict
+            The index of the shards (see :func:`write_sharded_entities`).
+        mmap : bool
+            Memory-map the shards rather than reading them (default: True).
+        """
+        self.path = path
+        self.shard_size = index['shard_size']
+        self.num_shards = len(index['first_keys'])
+        self.mmap = mmap
+        self.shards = {}
+        first_shard = self._load_shard(0)
+        self.shape = (index['count'],) + first_shard.shape[1:]
+        self.dtype = first_shard.dtype
+        self.ndim = len(self.shape)
+
+    def __reduce__(self):
+        # a pickled array must not depend on the directory of the model: it is pickled as an ndarray
+        return np.array, (np.asarray(self),)
+
+    def _load_shard(self, shard):
+        if shard not in self.shards:
+            self.shards[shard] = np.load(get_shard_path(self.path, 'entities.embeddings', shard),
+                                         mmap_mode='r' if self.mmap else None)
+        return self.shards[shard]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            rows = self[item[0]]
+            dims = 1 if isinstance(item[0], slice) else np.ndim(item[0])
+            return rows[(slice(None),) * dims + item[1:]]
+        if isinstance(item, slice):
+            item = np.arange(self.shape[0])[item]
+        rows = np.asarray(item)
+        if not np.issubdtype(rows.dtype, np.integer):
+            raise IndexError('Only integers, slices and integer arrays are valid indices.')
+        rows = np.where(rows < 0, rows + self.shape[0], rows)
+        if np.any((rows < 0) | (rows >= self.shape[0])):
+            raise IndexError('Index out of bounds for axis 0 with size {}.'.format(self.shape[0]))
+
+        flat_rows = rows.ravel()
+        out = np.empty((len(flat_rows),) + self.shape[1:], dtype=self.dtype)
+        shards = flat_rows // self.shard_size
+        for shard in np.unique(shards):
+            mask = shards == shard
+            out[mask] = self._load_shard(shard)[flat_rows[mask] - shard * self.shard_size]
+        return out.reshape(rows.shape + self.shape[1:])
+
+    def __array__(self, dtype=None):
+        out = np.concatenate([self._load_shard(shard) for shard in range(self.num_shards)])
+        return out if dtype is None else out.astype(dtype)
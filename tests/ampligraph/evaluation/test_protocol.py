@@ -3,12 +3,14 @@ import pytest
 from ampligraph.latent_features import TransE, DistMult, ComplEx
 from ampligraph.evaluation import evaluate_performance, generate_corruptions_for_eval, \
     generate_corruptions_for_fit, to_idx, create_mappings, mrr_score, hits_at_n_score, select_best_model_ranking, \
-    filter_unseen_entities
+    filter_unseen_entities, create_positives_index, create_alias_table, compute_corrupt_subj_probs, \
+    extend_mappings
 
 from ampligraph.datasets import load_wn18, load_fb15k
 import tensorflow as tf
 
 from ampligraph.evaluation import train_test_split_no_unseen
+from ampligraph.evaluation.protocol import _sample_alias_table
 
 @pytest.mark.skip(reason="Speeding up jenkins")
 def test_select_best_model_ranking():
@@ -72,6 +74,235 @@ def test_select_best_model_ranking_inf_skip():
                                                                                               param_grid)
     assert(best_params["optimizer_params"]["lr"] == 0.1)
     
+def test_select_best_model_ranking_parallel():
+    X_train = np.array([['a', 'y', 'b'],
+                        ['b', 'y', 'a'],
+                        ['a', 'y', 'c'],
+                        ['c', 'y', 'a'],
+                        ['a', 'y', 'd'],
+                        ['c', 'y', 'd'],
+                        ['b', 'y', 'c'],
+                        ['f', 'y', 'e']])
+    X = {'train': X_train, 'valid': X_train[:2], 'test': X_train[2:4]}
+    param_grid = {
+        "batches_count": [1],
+        "seed": 0,
+        "epochs": [5],
+        "k": [5, 10],
+        "eta": [1],
+        "loss": ["pairwise"],
+        "loss_params": {},
+        "embedding_model_params": {},
+        "regularizer": [None],
+        "regularizer_params": {},
+        "optimizer": ["adagrad"],
+        "optimizer_params": {
+            "lr": [0.1, 0.01]
+        }
+    }
+    results = [select_best_model_ranking(TransE, X, param_grid, n_jobs=n_jobs) for n_jobs in [1, 2]]
+    assert results[0][1] == results[1][1]
+    np.testing.assert_allclose(results[0][2], results[1][2])
+    np.testing.assert_allclose(results[0][3], results[1][3])
+    assert results[1][0].is_fitted
+
+
+def test_select_best_model_ranking_halving():
+    X_train = np.array([['a', 'y', 'b'],
+                        ['b', 'y', 'a'],
+                        ['a', 'y', 'c'],
+                        ['c', 'y', 'a'],
+                        ['a', 'y', 'd'],
+                        ['c', 'y', 'd'],
+                        ['b', 'y', 'c'],
+                        ['f', 'y', 'e']])
+    X = {'train': X_train, 'valid': X_train[:2], 'test': X_train[2:6]}
+    param_grid = {
+        "batches_count": [2],
+        "seed": 0,
+        "epochs": [8],
+        "k": [5, 10],
+        "eta": [1],
+        "loss": ["pairwise"],
+        "loss_params": {},
+        "embedding_model_params": {},
+        "regularizer": [None],
+        "regularizer_params": {},
+        "optimizer": ["adam"],
+        "optimizer_params": {
+            "lr": [0.1, 0.01]
+        }
+    }
+    best_model, best_params, best_mrr_train, _, _ = select_best_model_ranking(
+        TransE, X, param_grid, search_strategy='halving', halving_params={'reduction_factor': 2, 'subsample': 2})
+    assert best_model.is_fitted
+    assert best_params['epochs'] == 8
+
+    # the training of the last candidate is resumed across rungs: it matches a training from scratch
+    grid = dict(param_grid, k=[best_params['k']], optimizer_params={'lr': [best_params['optimizer_params']['lr']]})
+    _, _, mrr_from_scratch, _, _ = select_best_model_ranking(TransE, X, grid)
+    np.testing.assert_allclose(best_mrr_train, mrr_from_scratch)
+
+    with pytest.raises(ValueError):
+        select_best_model_ranking(TransE, X, param_grid, search_strategy='random')
+
+
+def test_select_best_model_ranking_retrain(tmpdir):
+    X_train = np.array([['a', 'y', 'b'],
+                        ['b', 'y', 'a'],
+                        ['a', 'y', 'c'],
+                        ['c', 'y', 'a'],
+                        ['a', 'y', 'd'],
+                        ['c', 'y', 'd'],
+                        ['b', 'y', 'c'],
+                        ['f', 'y', 'e']])
+    X = {'train': X_train, 'valid': np.array([['a', 'y', 'g'], ['g', 'z', 'b']]), 'test': X_train[2:6]}
+    param_grid = {
+        "batches_count": [1],
+        "seed": 0,
+        "epochs": [20],
+        "k": [5, 10],
+        "eta": [1],
+        "loss": ["pairwise"],
+        "loss_params": {},
+        "embedding_model_params": {},
+        "regularizer": [None],
+        "regularizer_params": {},
+        "optimizer": ["adagrad"],
+        "optimizer_params": {
+            "lr": [0.1]
+        }
+    }
+    best_model, _, _, _, _ = select_best_model_ranking(TransE, X, param_grid, retrain='none')
+    assert best_model.retraining == {'strategy': 'none', 'epochs': 0}
+    assert 'g' not in best_model.ent_to_idx
+    expected_scores = best_model.predict(X_train)
+
+    # the models trained by worker processes are restored from their trained parameters
+    best_model, _, _, _, _ = select_best_model_ranking(TransE, X, param_grid, retrain='none', n_jobs=2)
+    assert best_model.retraining == {'strategy': 'none', 'epochs': 0}
+    np.testing.assert_allclose(best_model.predict(X_train), expected_scores, rtol=1e-5)
+
+    # the model of a trial recorded by a previous run is trained again
+    journal = str(tmpdir.join('journal.jsonl'))
+    select_best_model_ranking(TransE, X, param_grid, retrain='none', journal=journal)
+    best_model, _, _, _, _ = select_best_model_ranking(TransE, X, param_grid, retrain='none', journal=journal)
+    assert best_model.retraining == {'strategy': 'trial', 'epochs': 20}
+
+    best_model, _, _, ranks_test, _ = select_best_model_ranking(TransE, X, param_grid, retrain='warm_start')
+    assert best_model.retraining == {'strategy': 'warm_start', 'epochs': 2}
+    assert best_model.history.epoch == [1, 2]
+    assert 'g' in best_model.ent_to_idx and 'z' in best_model.rel_to_idx
+    assert len(ranks_test) == 4
+
+    best_model, _, _, _, _ = select_best_model_ranking(TransE, X, param_grid, retrain='warm_start',
+                                                       retrain_params={'epochs': 3}, n_jobs=2)
+    assert best_model.retraining == {'strategy': 'warm_start', 'epochs': 3}
+
+    best_model, _, _, _, _ = select_best_model_ranking(TransE, X, param_grid)
+    assert best_model.retraining == {'strategy': 'full', 'epochs': 20}
+    assert len(best_model.history.epoch) == 20
+
+    with pytest.raises(ValueError):
+        select_best_model_ranking(TransE, X, param_grid, retrain='partial')
+
+
+def test_select_best_model_ranking_shared_epochs(tmpdir):
+    import json
+    X_train = np.array([['a', 'y', 'b'],
+                        ['b', 'y', 'a'],
+                        ['a', 'y', 'c'],
+                        ['c', 'y', 'a'],
+                        ['a', 'y', 'd'],
+                        ['c', 'y', 'd'],
+                        ['b', 'y', 'c'],
+                        ['f', 'y', 'e']])
+    X = {'train': X_train, 'valid': X_train[:2], 'test': X_train[2:6]}
+    param_grid = {
+        "batches_count": [2],
+        "seed": 0,
+        "epochs": [1, 3, 6],
+        "k": [5, 10],
+        "eta": [1],
+        "loss": ["pairwise"],
+        "loss_params": {},
+        "embedding_model_params": {},
+        "regularizer": [None],
+        "regularizer_params": {},
+        "optimizer": ["adam"],
+        "optimizer_params": {
+            "lr": [0.1]
+        }
+    }
+
+    def journal_metrics(journal):
+        with open(journal) as f:
+            return {(record['params']['k'], record['params']['epochs']): record['metrics']['mrr']
+                    for record in map(json.loads, f)}
+
+    journal = str(tmpdir.join('shared.jsonl'))
+    select_best_model_ranking(TransE, X, param_grid, journal=journal)
+    shared = journal_metrics(journal)
+    assert len(shared) == 6
+
+    # each number of epochs is evaluated as if it was trained separately
+    for epochs in param_grid['epochs']:
+        journal = str(tmpdir.join('separate-{}.jsonl'.format(epochs)))
+        select_best_model_ranking(TransE, X, dict(param_grid, epochs=[epochs]), journal=journal)
+        for key, mrr in journal_metrics(journal).items():
+            np.testing.assert_allclose(shared[key], mrr)
+
+
+def test_select_best_model_ranking_journal(tmpdir):
+    import json
+    X_train = np.array([['a', 'y', 'b'],
+                        ['b', 'y', 'a'],
+                        ['a', 'y', 'c'],
+                        ['c', 'y', 'a'],
+                        ['a', 'y', 'd'],
+                        ['c', 'y', 'd'],
+                        ['b', 'y', 'c'],
+                        ['f', 'y', 'e']])
+    X = {'train': X_train, 'valid': X_train[:2], 'test': X_train[2:6]}
+    param_grid = {
+        "batches_count": [1],
+        "seed": 0,
+        "epochs": [5],
+        "k": [5, 10],
+        "eta": [1],
+        "loss": ["pairwise"],
+        "loss_params": {},
+        "embedding_model_params": {},
+        "regularizer": [None],
+        "regularizer_params": {},
+        "optimizer": ["adagrad", "unknown"],
+        "optimizer_params": {
+            "lr": [0.1]
+        }
+    }
+    journal = str(tmpdir.join('journal.jsonl'))
+    _, best_params, best_mrr_train, _, _ = select_best_model_ranking(TransE, X, param_grid, journal=journal)
+    with open(journal) as f:
+        records = [json.loads(line) for line in f]
+    assert [record['status'] for record in records] == ['completed', 'failed', 'completed', 'failed']
+    assert all(record['duration'] > 0 for record in records)
+    np.testing.assert_allclose(max(record['metrics']['mrr'] for record in records if record['metrics']),
+                               best_mrr_train)
+
+    # an interrupted search resumes from the recorded trials
+    with open(journal, 'w') as f:
+        f.write(''.join(json.dumps(record) + '\n' for record in records[:3]) + '{"truncated')
+    best_model, resumed_params, resumed_mrr_train, _, _ = select_best_model_ranking(TransE, X, param_grid,
+                                                                                    journal=journal)
+    with open(journal) as f:
+        lines = f.readlines()
+    assert len(lines) == 5
+    assert json.loads(lines[-1])['params'] == records[3]['params']
+    assert resumed_params == best_params
+    np.testing.assert_allclose(resumed_mrr_train, best_mrr_train)
+    assert best_model.is_fitted
+
+
 def test_evaluate_performance_default_protocol_without_filter():
     wn18 = load_wn18()
 
@@ -323,6 +554,36 @@ def test_to_idx():
     np.testing.assert_array_equal(X_idx, X_idx_expected)
 
 
+def test_extend_mappings():
+    # keys are not necessarily strings
+    rel_to_idx, ent_to_idx = extend_mappings(np.array([[1, 10, 2], [3, 10, 1], [4, 11, 1]]), {10: 0}, {1: 0, 2: 1})
+    assert rel_to_idx == {10: 0, 11: 1}
+    assert ent_to_idx == {1: 0, 2: 1, 3: 2, 4: 3}
+
+
+def test_evaluate_performance_from_idx():
+    from ampligraph.latent_features.models import create_filter_index
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    model = TransE(batches_count=1, seed=555, epochs=2, k=10)
+    model.fit(X)
+    ranks = evaluate_performance(X[:4], model=model, filter_triples=X)
+
+    X_idx = to_idx(X, ent_to_idx=model.ent_to_idx, rel_to_idx=model.rel_to_idx)
+    filter_index = create_filter_index(X_idx, len(model.ent_to_idx), len(model.rel_to_idx))
+    assert len(filter_index['filter_keys']) == len(X)
+    assert len(np.unique(filter_index['filter_keys'])) == len(X)
+    model.set_filter_for_eval(X_idx, filter_index)
+    ranks_idx = evaluate_performance(X_idx[:4], model=model, from_idx=True)
+    np.testing.assert_array_equal(ranks_idx, ranks)
+
+
 def test_filter_unseen_entities_with_strict_mode():
     from collections import namedtuple
     base_model = namedtuple('test_model', 'ent_to_idx')
@@ -372,11 +633,11 @@ def test_generate_corruptions_for_fit_corrupt_side_so():
         print(X_corr)
     # these values occur when seed=0
 
-    X_corr_exp = [[0, 0, 1],
-                  [2, 0, 3],
+    X_corr_exp = [[0, 0, 2],
+                  [2, 0, 4],
                   [3, 0, 5],
-                  [1, 1, 0],
-                  [0, 1, 3]]
+                  [1, 1, 2],
+                  [0, 1, 2]]
 
     np.testing.assert_array_equal(X_corr, X_corr_exp)
 
@@ -398,11 +659,11 @@ def test_generate_corruptions_for_fit_curropt_side_s():
 
     # these values occur when seed=0
 
-    X_corr_exp = [[1, 0, 1],
-                  [3, 0, 3],
+    X_corr_exp = [[2, 0, 1],
+                  [4, 0, 3],
                   [3, 0, 5],
-                  [0, 1, 6],
-                  [3, 1, 7]]
+                  [2, 1, 6],
+                  [2, 1, 7]]
 
     np.testing.assert_array_equal(X_corr, X_corr_exp)
 
@@ -423,14 +684,36 @@ def test_generate_corruptions_for_fit_curropt_side_o():
         print(X_corr)
     # these values occur when seed=0
 
-    X_corr_exp = [[0, 0, 1],
-                  [2, 0, 3],
+    X_corr_exp = [[0, 0, 2],
+                  [2, 0, 4],
                   [4, 0, 3],
-                  [1, 1, 0],
-                  [0, 1, 3]]
+                  [1, 1, 2],
+                  [0, 1, 2]]
     np.testing.assert_array_equal(X_corr, X_corr_exp)
 
 
+def test_generate_corruptions_for_fit_stateless_seed():
+    X = np.array([[0, 0, 1],
+                  [2, 0, 3],
+                  [4, 0, 5],
+                  [1, 1, 6],
+                  [0, 1, 7]])
+    with tf.Session() as sess:
+        dataset = tf.constant(X, dtype=tf.int32)
+        seed = tf.placeholder(tf.int64, shape=[2])
+        corruptions = generate_corruptions_for_fit(dataset, eta=3, corrupt_side='s+o', entities_size=8, rnd=seed)
+        X_corr_1 = sess.run(corruptions, feed_dict={seed: [0, 1]})
+        X_corr_2 = sess.run(corruptions, feed_dict={seed: [0, 1]})
+        X_corr_3 = sess.run(corruptions, feed_dict={seed: [0, 2]})
+
+    # the corruptions only depend on the seed
+    np.testing.assert_array_equal(X_corr_1, X_corr_2)
+    assert not np.array_equal(X_corr_1, X_corr_3)
+    assert X_corr_1.shape == (15, 3)
+    np.testing.assert_array_equal(X_corr_1[:, 1], np.tile(X[:, 1], 3))
+    assert np.all((X_corr_1[:, 0] == np.tile(X[:, 0], 3)) | (X_corr_1[:, 2] == np.tile(X[:, 2], 3)))
+    assert X_corr_1.min() >= 0 and X_corr_1.max() < 8
+
 
 def test_train_test_split():
 
@@ -455,4 +738,81 @@ def test_train_test_split():
     X_train, X_test = train_test_split_no_unseen(X, test_size = 2, seed = 0)
 
     np.testing.assert_array_equal(X_train, expected_X_train)
-    np.testing.assert_array_equal(X_test, expected_X_test)
\ No newline at end of file
+    np.testing.assert_array_equal(X_test, expected_X_test)
+
+def test_generate_corruptions_for_fit_filtered():
+    X = np.array([[0, 0, 1],
+                  [0, 0, 2],
+                  [1, 0, 0],
+                  [1, 0, 2],
+                  [2, 0, 0]])
+    positives_index = create_positives_index(X, 4, 1)
+    np.testing.assert_array_equal(positives_index['keys'], [1, 2, 4, 6, 8])
+    with tf.Session() as sess:
+        dataset = tf.constant(X, dtype=tf.int32)
+        X_corr, rejected, unresolved = sess.run(generate_corruptions_for_fit(dataset, eta=10, corrupt_side='o',
+                                                                             entities_size=4, rnd=0,
+                                                                             positives_index=positives_index,
+                                                                             resample_rounds=10))
+    assert rejected > 0
+    X_keys = X_corr[:, 0] * 4 + X_corr[:, 2]
+    assert np.sum(np.isin(X_keys, positives_index['keys'])) == unresolved
+    assert unresolved < rejected
+
+
+def test_create_alias_table():
+    weights = np.array([1.0, 0.0, 3.0, 4.0])
+    prob, alias = create_alias_table(weights)
+    # probability of each outcome, summed over the columns of the table
+    outcome_prob = np.zeros(len(weights))
+    for column in range(len(weights)):
+        outcome_prob[column] += prob[column] / len(weights)
+        outcome_prob[alias[column]] += (1 - prob[column]) / len(weights)
+    np.testing.assert_allclose(outcome_prob, weights / np.sum(weights))
+
+    with pytest.raises(ValueError):
+        create_alias_table(np.array([1.0, -1.0]))
+
+
+def test_generate_corruptions_for_fit_alias_table():
+    X = np.array([[0, 0, 1]] * 1000)
+    alias_table = create_alias_table(np.array([0.0, 0.0, 1.0, 3.0]))
+    with tf.Session() as sess:
+        dataset = tf.constant(X, dtype=tf.int32)
+        X_corr = sess.run(generate_corruptions_for_fit(dataset, eta=10, corrupt_side='o', entities_size=4, rnd=0,
+                                                       alias_table=alias_table))
+    assert set(np.unique(X_corr[:, 2])) == {2, 3}
+    np.testing.assert_allclose(np.mean(X_corr[:, 2] == 3), 0.75, atol=0.02)
+
+
+def test_sample_alias_table_stateless_seed():
+    weights = np.array([1, 2, 3, 4, 10, 1, 1, 50, 5, 3], dtype=np.float64)
+    alias_table = create_alias_table(weights)
+    with tf.Session() as sess:
+        seed = tf.constant([0, 1], dtype=tf.int64)
+        samples, X_corr = sess.run([_sample_alias_table(alias_table, [100000], seed, offset=1),
+                                    generate_corruptions_for_fit(tf.constant([[0, 0, 1]] * 10000, dtype=tf.int32),
+                                                                 eta=10, corrupt_side='o', entities_size=10,
+                                                                 rnd=seed, alias_table=alias_table)])
+    for draws in [samples, X_corr[:, 2]]:
+        np.testing.assert_allclose(np.bincount(draws, minlength=10) / len(draws), weights / np.sum(weights),
+                                   atol=0.01)
+
+
+def test_compute_corrupt_subj_probs():
+    # relation 0 is one-to-many, relation 1 is many-to-one
+    X = np.array([[0, 0, 1],
+                  [0, 0, 2],
+                  [0, 0, 3],
+                  [1, 1, 0],
+                  [2, 1, 0],
+                  [0, 0, 1]])
+    probs = compute_corrupt_subj_probs(X, 3)
+    np.testing.assert_allclose(probs, [0.75, 1 / 3, 0.5])
+
+    with tf.Session() as sess:
+        dataset = tf.constant(np.array([[0, 0, 1]] * 1000), dtype=tf.int32)
+        X_corr = sess.run(generate_corruptions_for_fit(dataset, entities_list=tf.constant([2, 3]), eta=1,
+                                                       corrupt_side='s+o', rnd=0, corrupt_subj_probs=probs))
+    # the object is kept when the subject is corrupted
+    np.testing.assert_allclose(np.mean(X_corr[:, 2] == 1), 0.75, atol=0.05)
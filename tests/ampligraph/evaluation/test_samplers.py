@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from ampligraph.evaluation import GridSampler, RandomSampler, TPESampler, Uniform, LogUniform, \
+    select_best_model_ranking
+from ampligraph.evaluation.protocol import gridsearch_next_hyperparam
+from ampligraph.latent_features import TransE
+
+
+def get_param_grid(lr=[0.1, 0.01], lambda_=[1e-4, 1e-5]):
+    return {
+        "batches_count": [1],
+        "seed": 0,
+        "epochs": [5],
+        "k": [5, 10],
+        "eta": [1],
+        "loss": ["pairwise", "nll"],
+        "loss_params": {
+            "margin": [1, 2]
+        },
+        "embedding_model_params": {},
+        "regularizer": ["LP", None],
+        "regularizer_params": {
+            "p": [2],
+            "lambda": lambda_
+        },
+        "optimizer": ["adagrad"],
+        "optimizer_params": {
+            "lr": lr
+        }
+    }
+
+
+def test_grid_sampler():
+    param_grid = get_param_grid()
+    sampler = GridSampler('TransE', param_grid)
+    assert list(iter(sampler.ask, None)) == list(gridsearch_next_hyperparam('TransE', param_grid))
+
+    with pytest.raises(ValueError):
+        GridSampler('TransE', get_param_grid(lr=LogUniform(1e-4, 1e-1)))
+
+
+def test_random_sampler():
+    param_grid = get_param_grid(lr=LogUniform(1e-4, 1e-1), lambda_=Uniform(0, 1e-3))
+    configurations = list(iter(RandomSampler('TransE', param_grid, {'n_trials': 30, 'seed': 0}).ask, None))
+    assert len(configurations) == 30
+    assert configurations == list(iter(RandomSampler('TransE', param_grid, {'n_trials': 30, 'seed': 0}).ask, None))
+
+    for params in configurations:
+        assert 1e-4 <= params['optimizer_params']['lr'] <= 1e-1
+        assert params['seed'] == 0
+        if params['loss'] == 'pairwise':
+            assert params['loss_params']['margin'] in [1, 2]
+        else:
+            assert params['loss_params'] == {}
+        if params['regularizer'] == 'LP':
+            assert 0 <= params['regularizer_params']['lambda'] <= 1e-3
+        else:
+            assert params['regularizer_params'] == {}
+
+
+def test_tpe_sampler():
+    param_grid = get_param_grid(lr=LogUniform(1e-5, 1))
+    sampler = TPESampler('TransE', param_grid, {'n_trials': 60, 'seed': 0, 'n_startup_trials': 10})
+    distances = []
+    for trial in range(60):
+        params = sampler.ask()
+        # the score peaks at lr=1e-2 and k=10
+        distance = np.abs(np.log10(params['optimizer_params']['lr']) + 2)
+        sampler.tell(trial, -distance + (params['k'] == 10))
+        distances.append(distance)
+    assert sampler.ask() is None
+    # the model-based configurations get closer to the optimum than the random ones
+    assert np.mean(distances[-20:]) < np.mean(distances[:10]) / 2
+
+
+def test_select_best_model_ranking_samplers():
+    X_train = np.array([['a', 'y', 'b'],
+                        ['b', 'y', 'a'],
+                        ['a', 'y', 'c'],
+                        ['c', 'y', 'a'],
+                        ['a', 'y', 'd'],
+                        ['c', 'y', 'd'],
+                        ['b', 'y', 'c'],
+                        ['f', 'y', 'e']])
+    X = {'train': X_train, 'valid': X_train[:2], 'test': X_train[2:6]}
+    param_grid = get_param_grid(lr=LogUniform(1e-3, 1e-1))
+    for sampler in ['random', 'tpe']:
+        best_model, best_params, _, _, _ = select_best_model_ranking(TransE, X, param_grid, sampler=sampler,
+                                                                     sampler_params={'n_trials': 3})
+        assert best_model.is_fitted
+        assert 1e-3 <= best_params['optimizer_params']['lr'] <= 1e-1
+
+    with pytest.raises(ValueError):
+        select_best_model_ranking(TransE, X, param_grid, sampler='bayesian')
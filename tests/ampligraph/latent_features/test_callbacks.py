@@ -0,0 +1,140 @@
+import os
+import glob
+import numpy as np
+import pytest
+from ampligraph.latent_features import TransE, Callback, ModelCheckpoint, ModelSnapshot
+
+
+class RecordingCallback(Callback):
+
+    def __init__(self, stop_at=None):
+        self.events = []
+        self.stop_at = stop_at
+
+    def on_epoch_begin(self, model, epoch):
+        self.events.append(('epoch_begin', epoch))
+
+    def on_epoch_end(self, model, epoch, logs):
+        self.events.append(('epoch_end', epoch))
+        if epoch == self.stop_at:
+            model.stop_training = True
+
+    def on_batch_end(self, model, batch, logs):
+        self.events.append(('batch_end', batch, logs['steps']))
+
+    def on_early_stopping_check(self, model, epoch, logs):
+        self.events.append(('early_stopping_check', epoch, logs['stop']))
+
+
+X = np.array([['a', 'y', 'b'],
+              ['b', 'y', 'a'],
+              ['a', 'y', 'c'],
+              ['c', 'y', 'a'],
+              ['a', 'y', 'd'],
+              ['c', 'y', 'd'],
+              ['b', 'y', 'c'],
+              ['f', 'y', 'e']])
+
+
+def test_fit_callbacks():
+    callback = RecordingCallback()
+    model = TransE(batches_count=2, seed=555, epochs=2, k=10, loss='pairwise', loss_params={'margin': 5},
+                   optimizer='adagrad', optimizer_params={'lr': 0.1})
+    model.fit(X, callbacks=[callback])
+    assert callback.events == [('epoch_begin', 1), ('batch_end', 1, 1), ('batch_end', 2, 1), ('epoch_end', 1),
+                               ('epoch_begin', 2), ('batch_end', 1, 1), ('batch_end', 2, 1), ('epoch_end', 2)]
+
+    assert model.history.epoch == [1, 2]
+    for key in ['loss', 'steps_per_sec', 'triples_per_sec', 'time_epoch', 'time_session_run',
+                'time_normalization', 'time_early_stopping', 'time_callbacks']:
+        assert len(model.history.get(key)) == 2
+    assert all(np.array(model.history.get('time_session_run')) <= np.array(model.history.get('time_epoch')))
+
+
+def test_fit_callbacks_steps_per_run():
+    callback = RecordingCallback()
+    model = TransE(batches_count=4, seed=555, epochs=1, k=10, loss='pairwise', loss_params={'margin': 5},
+                   embedding_model_params={'steps_per_run': 3},
+                   optimizer='adagrad', optimizer_params={'lr': 0.1})
+    model.fit(X, callbacks=[callback])
+    assert callback.events == [('epoch_begin', 1), ('batch_end', 3, 3), ('batch_end', 4, 1), ('epoch_end', 1)]
+
+
+def test_fit_callbacks_stop_training():
+    callback = RecordingCallback(stop_at=2)
+    model = TransE(batches_count=1, seed=555, epochs=5, k=10, loss='pairwise', loss_params={'margin': 5},
+                   optimizer='adagrad', optimizer_params={'lr': 0.1})
+    model.fit(X, callbacks=[callback])
+    assert model.history.epoch == [1, 2]
+    assert model.is_fitted
+
+
+def test_fit_callbacks_early_stopping():
+    callback = RecordingCallback()
+    model = TransE(batches_count=1, seed=555, epochs=6, k=10, loss='pairwise', loss_params={'margin': 5},
+                   optimizer='adagrad', optimizer_params={'lr': 0.1})
+    model.fit(X, early_stopping=True, early_stopping_params={'x_valid': X[:2], 'burn_in': 0, 'check_interval': 2,
+                                                             'stop_interval': 10},
+              callbacks=[callback])
+    checks = [event for event in callback.events if event[0] == 'early_stopping_check']
+    assert checks == [('early_stopping_check', 2, False), ('early_stopping_check', 4, False),
+                      ('early_stopping_check', 6, False)]
+    assert [check['epoch'] for check in model.history.early_stopping_checks] == [2, 4, 6]
+    assert all(t > 0 for t in model.history.get('time_early_stopping')[1::2])
+
+
+def test_fit_resume_from_checkpoint(tmpdir):
+    checkpoint_dir = str(tmpdir.join('checkpoints'))
+    params = {'batches_count': 2, 'seed': 555, 'k': 10, 'loss': 'pairwise', 'loss_params': {'margin': 5},
+              'optimizer': 'adam', 'optimizer_params': {'lr': 0.1}}
+
+    model = TransE(epochs=4, **params)
+    model.fit(X)
+    expected = model.trained_model_params
+
+    model = TransE(epochs=2, **params)
+    model.fit(X, callbacks=[ModelCheckpoint(checkpoint_dir, max_to_keep=1)])
+    assert sorted(os.path.basename(path) for path in glob.glob(os.path.join(checkpoint_dir, 'model-*'))) == \
+        ['model-2.data-00000-of-00001', 'model-2.index', 'model-2.meta', 'model-2.state.pkl']
+
+    callback = RecordingCallback()
+    model = TransE(epochs=4, **params)
+    model.fit(X, callbacks=[callback], resume_from=checkpoint_dir)
+    assert [event[1] for event in callback.events if event[0] == 'epoch_begin'] == [3, 4]
+    assert model.history.epoch == [1, 2, 3, 4]
+    np.testing.assert_allclose(model.trained_model_params[0], expected[0], rtol=1e-5)
+    np.testing.assert_allclose(model.trained_model_params[1], expected[1], rtol=1e-5)
+
+
+def test_fit_resume_from_checkpoint_other_graph(tmpdir):
+    checkpoint_dir = str(tmpdir.join('checkpoints'))
+    model = TransE(batches_count=1, seed=555, epochs=1, k=10)
+    model.fit(X, callbacks=[ModelCheckpoint(checkpoint_dir)])
+
+    model = TransE(batches_count=1, seed=555, epochs=2, k=10)
+    with pytest.raises(ValueError):
+        model.fit(X[:-1], resume_from=checkpoint_dir)
+
+
+def test_model_snapshot():
+    params = {'batches_count': 2, 'seed': 555, 'k': 10, 'loss': 'pairwise', 'loss_params': {'margin': 5},
+              'optimizer': 'adam', 'optimizer_params': {'lr': 0.1}}
+    model = TransE(epochs=2, **params)
+    model.fit(X)
+    expected = model.trained_model_params
+
+    snapshot = ModelSnapshot([2, 10])
+    model = TransE(epochs=4, **params)
+    model.fit(X, callbacks=[snapshot])
+    assert list(snapshot.snapshots) == [2]
+    np.testing.assert_allclose(snapshot.snapshots[2][0], expected[0], rtol=1e-5)
+    np.testing.assert_allclose(snapshot.snapshots[2][1], expected[1], rtol=1e-5)
+    assert not np.allclose(model.trained_model_params[0], expected[0])
+
+    # no snapshot once early stopping ends the training
+    snapshot = ModelSnapshot([2, 4])
+    model = TransE(epochs=6, **params)
+    model.fit(X, early_stopping=True, early_stopping_params={'x_valid': X[:2], 'burn_in': 0, 'check_interval': 1,
+                                                             'stop_interval': 1},
+              callbacks=[snapshot])
+    assert all(epoch < model.history.epoch[-1] for epoch in snapshot.snapshots)
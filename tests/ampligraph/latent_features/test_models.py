@@ -1,8 +1,12 @@
 import numpy as np
 import pytest
+import tensorflow as tf
 
-from ampligraph.latent_features import TransE, DistMult, ComplEx, HolE
+from ampligraph.latent_features import EmbeddingModel, TransE, DistMult, ComplEx, HolE
+from ampligraph.latent_features import ModelCheckpoint
+from ampligraph.latent_features.models import ROW_SPARSE_OPTIMIZERS
 from ampligraph.datasets import load_wn18
+from ampligraph.evaluation import to_idx
 
 
 def test_fit_predict_TransE_early_stopping_with_filter():
@@ -182,3 +186,375 @@ def test_lookup_embeddings():
     model.fit(X)
     model.get_embeddings(['a', 'b'], embedding_type='entity')
 
+
+
+def test_fit_predict_DistMult_lazy_adam():
+    model = DistMult(batches_count=2, seed=555, epochs=20, k=10, loss='pairwise', loss_params={'margin': 5},
+                     optimizer='lazy_adam', optimizer_params={'lr': 0.1})
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    model.fit(X)
+    y_pred, _ = model.predict(np.array([['f', 'y', 'e'], ['b', 'y', 'd']]), get_ranks=True)
+    print(y_pred)
+    assert y_pred[0] > y_pred[1]
+
+
+def test_fit_TransE_normalize_batch_entities():
+    model = TransE(batches_count=2, seed=555, epochs=20, k=10, loss='pairwise', loss_params={'margin': 5},
+                   embedding_model_params={'normalize_ent_emb': True},
+                   optimizer='sgd', optimizer_params={'lr': 1.0})
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    model.fit(X)
+    norms = np.linalg.norm(model.trained_model_params[0], axis=1)
+    assert np.all(norms <= 1 + 1e-5)
+
+
+def test_fit_predict_ComplEx_batch_local_regularizer():
+    model = ComplEx(batches_count=1, seed=555, epochs=20, k=10,
+                    loss='pairwise', loss_params={'margin': 1}, regularizer='LP',
+                    regularizer_params={'lambda': 0.1, 'p': 3, 'batch_local': True},
+                    optimizer='adagrad', optimizer_params={'lr': 0.1})
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    model.fit(X)
+    y_pred, _ = model.predict(np.array([['f', 'y', 'e'], ['b', 'y', 'd']]), get_ranks=True)
+    print(y_pred)
+    assert y_pred[0] > y_pred[1]
+
+
+def test_fit_steps_per_run():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    # the optimizer steps and their slot variables are created in the body of the in-graph loop
+    for optimizer in ROW_SPARSE_OPTIMIZERS + ['adam']:
+        params = []
+        for steps_per_run in [1, 3]:
+            model = TransE(batches_count=4, seed=555, epochs=5, k=10, loss='pairwise', loss_params={'margin': 5},
+                           embedding_model_params={'normalize_ent_emb': True, 'steps_per_run': steps_per_run},
+                           optimizer=optimizer, optimizer_params={'lr': 0.1})
+            model.fit(X)
+            assert len(model.history.get('steps_per_sec')) == 5
+            params.append(model.trained_model_params)
+        np.testing.assert_allclose(params[0][0], params[1][0], rtol=1e-5, err_msg=optimizer)
+        np.testing.assert_allclose(params[0][1], params[1][1], rtol=1e-5, err_msg=optimizer)
+
+
+def test_fit_batch_size():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    params = []
+    # 3 batches of 3, 3 and 2 triples in both cases
+    for batches_count, batch_size in [(3, None), (3, None), (100, 3)]:
+        model = DistMult(batches_count=batches_count, batch_size=batch_size, seed=555, epochs=5, k=10,
+                         loss='nll', optimizer='adagrad', optimizer_params={'lr': 0.1})
+        model.fit(X)
+        params.append(model.trained_model_params[0])
+    # training is reproducible, even if batches are prepared in parallel
+    np.testing.assert_array_equal(params[0], params[1])
+    np.testing.assert_allclose(params[0], params[2], rtol=1e-5)
+
+
+def test_fit_filter_corruptions():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    model = TransE(batches_count=2, seed=555, epochs=5, k=10, eta=5, loss='pairwise', loss_params={'margin': 5},
+                   embedding_model_params={'filter_corruptions': True, 'filter_resample_rounds': 5},
+                   optimizer='adagrad', optimizer_params={'lr': 0.1})
+    model.fit(X)
+    assert len(model.filter_stats) == 5
+    for epoch_stats in model.filter_stats:
+        assert 0 < epoch_stats['reject_rate'] < 1
+        assert epoch_stats['unresolved_rate'] < epoch_stats['reject_rate']
+    # the overhead is only measured when it is reported
+    assert model.filter_overhead_per_batch is None
+
+    model = TransE(batches_count=2, seed=555, epochs=1, k=10, eta=5, verbose=True,
+                   embedding_model_params={'filter_corruptions': True})
+    model.fit(X)
+    assert model.filter_overhead_per_batch >= 0
+
+
+def test_fit_degree_corruptions():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    for negative_corruption_entities in ['degree', {'a': 1.0, 'b': 2.0, 'e': 0.5}]:
+        model = DistMult(batches_count=2, seed=555, epochs=5, k=10, loss='nll',
+                         embedding_model_params={'negative_corruption_entities': negative_corruption_entities,
+                                                 'degree_alpha': 0.5},
+                         optimizer='adagrad', optimizer_params={'lr': 0.1})
+        model.fit(X)
+        assert model.corruption_alias_table is not None
+        y_pred, _ = model.predict(np.array([['f', 'y', 'e'], ['b', 'y', 'd']]), get_ranks=True)
+        assert np.all(np.isfinite(y_pred))
+
+
+def test_fit_bernoulli_corruptions():
+    X = np.array([['a', 'y', 'b'],
+                  ['a', 'y', 'c'],
+                  ['a', 'y', 'd'],
+                  ['b', 'z', 'a'],
+                  ['c', 'z', 'a']])
+    model = TransE(batches_count=1, seed=555, epochs=5, k=10, loss='pairwise', loss_params={'margin': 5},
+                   embedding_model_params={'bernoulli': True},
+                   optimizer='adagrad', optimizer_params={'lr': 0.1})
+    model.fit(X)
+    np.testing.assert_allclose(model.corrupt_subj_probs[[model.rel_to_idx['y'], model.rel_to_idx['z']]],
+                               [0.75, 1 / 3])
+
+
+def test_fn_candidates():
+    rng = np.random.RandomState(0)
+    for model in [DistMult(k=4), ComplEx(k=4), HolE(k=4)]:
+        dim = 4 if isinstance(model, DistMult) else 8
+        e_s, e_p, e_o = [tf.constant(rng.randn(3, dim)) for _ in range(3)]
+        e_cand = tf.constant(rng.randn(5, dim))
+        with tf.Session() as sess:
+            for corrupt_subj in [True, False]:
+                scores, scores_expected = sess.run([
+                    model._fn_candidates(e_s, e_p, e_o, e_cand, corrupt_subj),
+                    EmbeddingModel._fn_candidates(model, e_s, e_p, e_o, e_cand, corrupt_subj)])
+                np.testing.assert_allclose(scores, scores_expected)
+
+
+def test_fit_shared_negatives():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    for model_class, loss in [(ComplEx, 'multiclass_nll'), (TransE, 'pairwise')]:
+        model = model_class(batches_count=2, seed=555, epochs=5, k=10, loss=loss,
+                            embedding_model_params={'shared_negatives': 4, 'corrupt_sides': ['s+o', 'o']},
+                            optimizer='adagrad', optimizer_params={'lr': 0.1})
+        model.fit(X)
+        y_pred, _ = model.predict(np.array([['f', 'y', 'e'], ['b', 'y', 'd']]), get_ranks=True)
+        assert np.all(np.isfinite(y_pred))
+
+    with pytest.raises(ValueError):
+        DistMult(embedding_model_params={'shared_negatives': 4, 'filter_corruptions': True})
+
+
+def test_fit_nscaching(tmpdir):
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    params = []
+    for steps_per_run in [1, 2, 2]:
+        model = ComplEx(batches_count=2, seed=555, epochs=6, k=10, eta=3, loss='pairwise',
+                        embedding_model_params={'nscaching': True, 'cache_size': 4, 'cache_candidates': 3,
+                                                'cache_refresh_interval': 2, 'steps_per_run': steps_per_run},
+                        optimizer='adagrad', optimizer_params={'lr': 0.1})
+        model.fit(X)
+        # one cache row for each distinct (p, o) and (s, p) pair
+        assert model.negative_cache['s'].get_shape().as_list() == [5, 4]
+        assert model.negative_cache['o'].get_shape().as_list() == [4, 4]
+        y_pred, _ = model.predict(np.array([['f', 'y', 'e'], ['b', 'y', 'd']]), get_ranks=True)
+        assert np.all(np.isfinite(y_pred))
+        params.append(model.trained_model_params[0])
+    # cache draws are stateless: training does not depend on the number of steps per session call
+    np.testing.assert_allclose(params[0], params[1], rtol=1e-5)
+    np.testing.assert_array_equal(params[1], params[2])
+
+    # nor on the resumption of the training from a checkpoint
+    checkpoint_dir = str(tmpdir.join('checkpoints'))
+    model_params = {'batches_count': 2, 'seed': 555, 'k': 10, 'eta': 3, 'loss': 'pairwise',
+                    'embedding_model_params': {'nscaching': True, 'cache_size': 4, 'cache_candidates': 3,
+                                               'cache_refresh_interval': 2},
+                    'optimizer': 'adagrad', 'optimizer_params': {'lr': 0.1}}
+    model = ComplEx(epochs=3, **model_params)
+    model.fit(X, callbacks=[ModelCheckpoint(checkpoint_dir)])
+    model = ComplEx(epochs=6, **model_params)
+    model.fit(X, resume_from=checkpoint_dir)
+    np.testing.assert_allclose(model.trained_model_params[0], params[0], rtol=1e-5)
+
+    with pytest.raises(ValueError):
+        DistMult(embedding_model_params={'nscaching': True, 'shared_negatives': 4})
+
+
+def test_fit_one_to_n(tmpdir):
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'e']])
+    for model_class, loss, block in [(ComplEx, 'multiclass_nll', 0), (DistMult, 'nll', 3), (HolE, 'nll', 0)]:
+        model = model_class(batches_count=2, seed=555, epochs=50, k=10, loss=loss,
+                            embedding_model_params={'one_to_n': True, 'one_to_n_block': block},
+                            optimizer='adagrad', optimizer_params={'lr': 0.1})
+        model.fit(X)
+        y_pred, _ = model.predict(np.array([['a', 'y', 'b'], ['f', 'y', 'a']]), get_ranks=True)
+        assert y_pred[0] > y_pred[1]
+
+    # the targets of the queries, without the duplicate triples
+    X_idx = np.array([[0, 0, 1], [0, 0, 2], [1, 0, 2], [0, 0, 1]])
+    queries, corrupt_subj, offsets, targets = model._get_one_to_n_queries(X_idx)
+    np.testing.assert_array_equal(queries, [[0, 0, 1], [0, 0, 2], [0, 0, 1], [1, 0, 2]])
+    np.testing.assert_array_equal(corrupt_subj, [True, True, False, False])
+    assert [sorted(targets[offsets[i]:offsets[i + 1]]) for i in range(len(queries))] == [[0], [0, 1], [1, 2], [2]]
+
+    # the blocks of entities are drawn with stateless seeds: a training resumed from a checkpoint is the same
+    checkpoint_dir = str(tmpdir.join('checkpoints'))
+    model_params = {'batches_count': 2, 'seed': 555, 'k': 10, 'loss': 'nll',
+                    'embedding_model_params': {'one_to_n': True, 'one_to_n_block': 3},
+                    'optimizer': 'adagrad', 'optimizer_params': {'lr': 0.1}}
+    model = DistMult(epochs=6, **model_params)
+    model.fit(X)
+    params = model.trained_model_params[0]
+    model = DistMult(epochs=3, **model_params)
+    model.fit(X, callbacks=[ModelCheckpoint(checkpoint_dir)])
+    model = DistMult(epochs=6, **model_params)
+    model.fit(X, resume_from=checkpoint_dir)
+    np.testing.assert_allclose(model.trained_model_params[0], params, rtol=1e-5)
+
+    with pytest.raises(ValueError):
+        TransE(embedding_model_params={'one_to_n': True})
+    with pytest.raises(ValueError):
+        DistMult(loss='pairwise', embedding_model_params={'one_to_n': True})
+
+
+def test_fit_from_idx():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd']])
+    model = TransE(batches_count=1, seed=555, epochs=5, k=10)
+    model.fit(X, early_stopping=True, early_stopping_params={'x_valid': X[:2], 'burn_in': 0, 'check_interval': 2})
+
+    model_idx = TransE(batches_count=1, seed=555, epochs=5, k=10)
+    with pytest.raises(ValueError):
+        model_idx.fit(X, from_idx=True)
+    model_idx.rel_to_idx, model_idx.ent_to_idx = model.rel_to_idx, model.ent_to_idx
+    X_idx = to_idx(X, ent_to_idx=model.ent_to_idx, rel_to_idx=model.rel_to_idx)
+    model_idx.fit(X_idx, early_stopping=True, from_idx=True,
+                  early_stopping_params={'x_valid': X_idx[:2], 'burn_in': 0, 'check_interval': 2})
+    np.testing.assert_allclose(model_idx.trained_model_params[0], model.trained_model_params[0], rtol=1e-5)
+    np.testing.assert_array_equal(model_idx.predict(X[:2]), model.predict(X[:2]))
+
+
+def test_partial_fit():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd']])
+    X_new = np.array([['b', 'y', 'e'],
+                      ['e', 'z', 'a']])
+    model = ComplEx(batches_count=1, seed=555, epochs=5, k=10, optimizer='adam', optimizer_params={'lr': 0.1})
+    model.fit(X)
+    ent_to_idx = model.ent_to_idx
+    ent_emb, rel_emb = model.trained_model_params
+    slots = {name: value for name, value in model.optimizer_state.items() if np.ndim(value) > 0}
+
+    model.partial_fit(X_new, X_replay=X, epochs=0)
+    assert model.ent_to_idx == dict(ent_to_idx, e=4)
+    assert model.rel_to_idx == {'y': 0, 'z': 1}
+    assert model.trained_model_params[0].shape == (5, 20)
+    assert model.trained_model_params[1].shape == (2, 20)
+    np.testing.assert_array_equal(model.trained_model_params[0][:4], ent_emb)
+    np.testing.assert_array_equal(model.trained_model_params[1][:1], rel_emb)
+    for name, value in slots.items():
+        np.testing.assert_array_equal(model.optimizer_state[name][:len(value)], value)
+        assert len(model.optimizer_state[name]) > len(value)
+
+    model.partial_fit(X_new, X_replay=X, replay_ratio=None, epochs=2)
+    assert model.history.epoch == [1, 2]
+    assert not np.allclose(model.trained_model_params[0][:4], ent_emb)
+    model.predict(np.array([['e', 'z', 'b']]))
+
+
+def test_estimate_embeddings():
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd']])
+    X_unseen = np.array([['e', 'y', 'a'],
+                         ['b', 'y', 'e'],
+                         ['f', 'y', 'c'],
+                         ['e', 'z', 'a'],
+                         ['e', 'y', 'g']])
+    model = TransE(batches_count=1, seed=555, epochs=2, k=10)
+    model.fit(X)
+    emb = dict(zip(['a', 'b', 'c', 'y'], model.get_embeddings(['a', 'b', 'c'], 'entity').tolist() +
+                   model.get_embeddings(['y'], 'relation').tolist()))
+    emb = {key: np.array(value) for key, value in emb.items()}
+    embeddings = model.estimate_embeddings(['e', 'f'], X_unseen, pooling='avg')
+    np.testing.assert_allclose(embeddings[0], ((emb['a'] - emb['y']) + (emb['b'] + emb['y'])) / 2, rtol=1e-5)
+    np.testing.assert_allclose(embeddings[1], emb['c'] - emb['y'], rtol=1e-5)
+    embeddings = model.estimate_embeddings(['e', 'f'], X_unseen, pooling='max')
+    np.testing.assert_allclose(embeddings[0], np.maximum(emb['a'] - emb['y'], emb['b'] + emb['y']), rtol=1e-5)
+
+    with pytest.raises(ValueError):
+        model.estimate_embeddings(['e', 'h'], X_unseen)
+
+    model = ComplEx(batches_count=1, seed=555, epochs=2, k=10)
+    model.fit(X)
+    embeddings = model.estimate_embeddings(['e'], X_unseen[1:2], pooling='sum', add_to_model=True)
+    # the estimated object is the one which maximises the score of the triple, for its norm
+    score = model.predict(np.array([['b', 'y', 'e']]))
+    np.testing.assert_allclose(score, np.sum(embeddings[0] ** 2), rtol=1e-4)
+    assert model.ent_to_idx['e'] == 4
+
+    # entities are not necessarily strings
+    model = TransE(batches_count=1, seed=555, epochs=2, k=10)
+    model.fit(np.array([[1, 0, 2], [2, 0, 1], [1, 0, 3]]))
+    model.estimate_embeddings([4], np.array([[4, 0, 1]]), add_to_model=True)
+    assert model.ent_to_idx[4] == 3
@@ -35,3 +35,21 @@ def test_l2_regularizer():
         np.testing.assert_array_equal(out, 15.0)
         out = sess.run(l2_obj2.apply([p1, p2]))
         np.testing.assert_array_equal(out, 42.0)
+
+
+def test_batch_local_regularizer():
+    lp_class = REGULARIZER_REGISTRY['LP']
+    assert not lp_class({'lambda': 1.0, 'p': 3}).is_batch_local()
+
+    lp_obj = lp_class({'lambda': 1.0, 'p': 3, 'batch_local': True})
+    assert lp_obj.is_batch_local()
+
+    emb = tf.Variable([[1, -1], [2, 2], [3, 0]], dtype=tf.float32)
+    loss = lp_obj.apply([tf.nn.embedding_lookup(emb, [0, 2])])
+    grad = tf.gradients(loss, emb)[0]
+    # the gradient of a batch-local penalty only touches the looked up rows
+    assert isinstance(grad, tf.IndexedSlices)
+
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        np.testing.assert_array_equal(sess.run(loss), 29.0)
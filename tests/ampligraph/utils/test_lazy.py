@@ -0,0 +1,21 @@
+import sys
+import subprocess
+from ampligraph.utils.lazy import LazyModule
+
+
+def test_lazy_module():
+    json = LazyModule('json')
+    assert json._module is None
+    assert json.loads('[1, 2]') == [1, 2]
+    assert json._module is sys.modules['json']
+    assert 'dumps' in dir(json)
+
+
+def test_import_without_backends():
+    # importing the library must not import TensorFlow nor the other heavy backends
+    code = 'import sys\n' \
+           'import ampligraph.datasets, ampligraph.evaluation.metrics, ampligraph.evaluation, ' \
+           'ampligraph.latent_features, ampligraph.utils\n' \
+           'print(" ".join(name for name in ["tensorflow", "sklearn", "pandas"] if name in sys.modules))\n'
+    output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).splitlines()
+    assert output[-1] == ''
@@ -1,7 +1,9 @@
 import os
+import shutil
 import importlib
 import numpy as np
 import numpy.testing as npt
+import pytest
 from ampligraph.utils import save_model, restore_model, create_tensorboard_visualizations, write_metadata_tsv
 
 
@@ -54,6 +56,102 @@ def test_save_and_restore_model():
         os.remove(example_name)
 
 
+def test_save_and_restore_model_npy(tmpdir):
+    from ampligraph.latent_features import ComplEx
+    model = ComplEx(batches_count=2, seed=555, epochs=20, k=10, optimizer='adagrad', optimizer_params={'lr': 0.1})
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'é']])
+    model.fit(X)
+    model_path = str(tmpdir.join('model'))
+    save_model(model, model_name_path=model_path, format='npy')
+    assert os.path.exists(os.path.join(model_path, 'header.json'))
+
+    for mmap in [False, True]:
+        loaded_model = restore_model(model_name_path=model_path, mmap=mmap)
+        assert loaded_model.all_params == model.all_params
+        assert loaded_model.is_fitted == model.is_fitted
+        assert loaded_model.ent_to_idx == model.ent_to_idx
+        assert loaded_model.rel_to_idx == model.rel_to_idx
+        assert isinstance(loaded_model.trained_model_params[0], np.memmap) == mmap
+        for i in range(len(loaded_model.trained_model_params)):
+            npt.assert_array_equal(loaded_model.trained_model_params[i], model.trained_model_params[i])
+
+        npt.assert_array_equal(loaded_model.get_embeddings(['a', 'é'], embedding_type='entity'),
+                               model.get_embeddings(['a', 'é'], embedding_type='entity'))
+        npt.assert_array_equal(loaded_model.predict(np.array([['f', 'y', 'é'], ['b', 'y', 'd']])),
+                               model.predict(np.array([['f', 'y', 'é'], ['b', 'y', 'd']])))
+
+    os.remove(os.path.join(model_path, 'header.json'))
+    with pytest.raises(ValueError):
+        restore_model(model_name_path=model_path)
+    with pytest.raises(ValueError):
+        save_model(model, model_name_path=model_path, format='hdf5')
+
+
+def test_save_and_restore_model_sharded(tmpdir):
+    from ampligraph.latent_features import TransE
+    model = TransE(batches_count=2, seed=555, epochs=20, k=10, optimizer='adagrad', optimizer_params={'lr': 0.1})
+    X = np.array([['a', 'y', 'b'],
+                  ['b', 'y', 'a'],
+                  ['a', 'y', 'c'],
+                  ['c', 'y', 'a'],
+                  ['a', 'y', 'd'],
+                  ['c', 'y', 'd'],
+                  ['b', 'y', 'c'],
+                  ['f', 'y', 'é']])
+    model.fit(X)
+    model_path = str(tmpdir.join('model'))
+    save_model(model, model_name_path=model_path, format='npy', shard_size=3)
+
+    for mmap in [False, True]:
+        loaded_model = restore_model(model_name_path=model_path, mmap=mmap)
+        assert loaded_model.all_params == model.all_params
+        assert sorted(loaded_model.ent_to_idx) == sorted(model.ent_to_idx)
+        assert [loaded_model.ent_to_idx[e] for e in ['a', 'b', 'c', 'd', 'f', 'é']] == list(range(6))
+        with pytest.raises(KeyError):
+            loaded_model.ent_to_idx['e']
+        assert loaded_model.rel_to_idx == model.rel_to_idx
+
+        # 'a' and 'b' are in the first shard, 'f' and 'é' in the second one
+        npt.assert_array_equal(loaded_model.get_embeddings(['b', 'a'], embedding_type='entity'),
+                               model.get_embeddings(['b', 'a'], embedding_type='entity'))
+        assert list(loaded_model.trained_model_params[0].shards) == [0]
+        npt.assert_allclose(loaded_model.predict(np.array([['f', 'y', 'é'], ['b', 'y', 'a']])),
+                            model.predict(np.array([['f', 'y', 'é'], ['b', 'y', 'a']])), rtol=1e-6)
+        npt.assert_allclose(loaded_model.predict(np.array(['f', 'y', 'é'])),
+                            model.predict(np.array([['f', 'y', 'é']]))[0], rtol=1e-6)
+        assert sorted(loaded_model.trained_model_params[0].shards) == [0, 1]
+        npt.assert_array_equal(loaded_model.trained_model_params[0][-1], model.get_embeddings(['é'])[0])
+        # the prediction graph is built once
+        sess = loaded_model.sess_shards_predict
+        loaded_model.predict(np.array([['a', 'y', 'c']]))
+        assert loaded_model.sess_shards_predict is sess
+
+        # ranking reads all the shards
+        _, ranks = loaded_model.predict(np.array([['f', 'y', 'é']]), get_ranks=True)
+        _, expected_ranks = model.predict(np.array([['f', 'y', 'é']]), get_ranks=True)
+        assert ranks == expected_ranks
+
+    # a pickled model does not depend on the shards
+    pickle_path = str(tmpdir.join('model.pkl'))
+    save_model(restore_model(model_name_path=model_path), model_name_path=pickle_path)
+    shutil.rmtree(model_path)
+    loaded_model = restore_model(model_name_path=pickle_path)
+    assert isinstance(loaded_model.ent_to_idx, dict)
+    assert isinstance(loaded_model.trained_model_params[0], np.ndarray)
+    npt.assert_array_equal(loaded_model.get_embeddings(['b', 'é'], embedding_type='entity'),
+                           model.get_embeddings(['b', 'é'], embedding_type='entity'))
+
+    with pytest.raises(ValueError):
+        save_model(model, model_name_path=str(tmpdir.join('other')), format='npy', shard_size=0)
+
+
 def test_create_tensorboard_visualizations():
     # TODO: This
     pass